@@ -0,0 +1,347 @@
+"""
+Automatic level balancer for teams_config.json.
+
+Adjusts the levels of every trainer's Pokémon (within level bounds and a
+total-level budget per team) so that all trainers have the same chance of
+winning the round-robin tournament. Candidates are scored with the batched
+deterministic engine, and team-vs-team odds are cached per pair of rosters
+so a move only re-evaluates the battles of the team it changed.
+
+The search is simulated annealing over single-team moves: each step takes
+one team, scores a batch of neighbouring level vectors in one engine call,
+and moves to the best one (or a worse one with falling probability).
+
+Example:
+    python main/balancer.py --budget 200 --out balanced.json --report report.json
+"""
+
+import argparse
+import copy
+import json
+import math
+import random
+import sys
+import time
+
+import numpy as np
+
+import batch_engine
+import scoring
+
+DEFAULT_MIN_LEVEL = 1
+DEFAULT_MAX_LEVEL = 50
+DEFAULT_ITERATIONS = 1000
+DEFAULT_CANDIDATES = 24
+MAX_STEP = 6  # largest level change per move
+PAIR_WEIGHT = 1.0  # weight of head-to-head closeness vs title odds
+START_TEMPERATURE = 0.02
+END_TEMPERATURE = 0.0005
+TOLERANCE = 1e-9  # stop once the field is this close to perfectly even
+
+
+class Balancer:
+    def __init__(
+        self,
+        field,
+        profile=None,
+        budget=None,
+        min_level=DEFAULT_MIN_LEVEL,
+        max_level=DEFAULT_MAX_LEVEL,
+        seed=0,
+    ):
+        self.field = field
+        self.profile = profile or scoring.DEFAULT_PROFILE
+        self.min_level = min_level
+        self.max_level = max_level
+        self.rng = random.Random(seed)
+        self.num_teams = len(field.trainers)
+        levels = [field.levels[e].astype(int).tolist() for e in field.team_entries]
+        self.initial_levels = [list(lv) for lv in levels]
+        if budget is None:
+            budget = int(round(sum(sum(lv) for lv in levels) / self.num_teams))
+        self.budget = budget
+        self.levels = [tuple(self._repair(lv)) for lv in levels]
+        self._cache = {}  # (i, levels_i, j, levels_j) -> P(i beats j), i < j
+        self._lanes = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.evaluations = 0
+
+    # --- Constraints ---
+    def _valid(self, lv):
+        return (
+            all(self.min_level <= x <= self.max_level for x in lv)
+            and sum(lv) <= self.budget
+        )
+
+    def _repair(self, lv):
+        lv = [min(max(x, self.min_level), self.max_level) for x in lv]
+        # Take levels from the strongest entries until the budget fits
+        while sum(lv) > self.budget:
+            i = max(range(len(lv)), key=lambda k: lv[k])
+            if lv[i] <= self.min_level:
+                raise ValueError(
+                    f"Budget {self.budget} is below {len(lv)} x min level {self.min_level}"
+                )
+            lv[i] -= 1
+        return lv
+
+    def _neighbours(self, lv, count):
+        found = set()
+        for _ in range(count * 10):
+            if len(found) >= count:
+                break
+            cand = list(lv)
+            i = self.rng.randrange(len(cand))
+            step = self.rng.randint(1, MAX_STEP)
+            if self.rng.random() < 0.5 and len(cand) > 1:
+                # Transfer levels between two entries (total unchanged)
+                j = self.rng.randrange(len(cand) - 1)
+                j += j >= i
+                cand[i] -= step
+                cand[j] += step
+            else:
+                cand[i] += self.rng.choice([-step, step])
+            cand = tuple(cand)
+            if cand != lv and self._valid(cand):
+                found.add(cand)
+        return sorted(found)
+
+    # --- Evaluation ---
+    def _profile_lanes(self, n):
+        if n not in self._lanes:
+            self._lanes[n] = batch_engine.ProfileArrays([self.profile] * n)
+        return self._lanes[n]
+
+    def _pair_odds(self, team, candidates):
+        """
+        (K, T, T) pairwise odds with team's levels replaced by each candidate.
+        Only battles involving team are computed; the rest come from the cache.
+        """
+        k = len(candidates)
+        odds = np.full((k, self.num_teams, self.num_teams), 0.5)
+        for i in range(self.num_teams):
+            for j in range(i + 1, self.num_teams):
+                if team not in (i, j):
+                    p = self._cached_pair(i, self.levels[i], j, self.levels[j])
+                    odds[:, i, j] = p
+                    odds[:, j, i] = 1 - p
+        for other in range(self.num_teams):
+            if other == team:
+                continue
+            i, j = min(team, other), max(team, other)
+            keys = [
+                (i, cand if i == team else self.levels[i])
+                + (j, cand if j == team else self.levels[j])
+                for cand in candidates
+            ]
+            missing = [n for n, key in enumerate(keys) if key not in self._cache]
+            self.cache_hits += k - len(missing)
+            if missing:
+                self._compute(team, [candidates[n] for n in missing], i, j)
+            p = np.array([self._cache[key] for key in keys])
+            odds[:, i, j] = p
+            odds[:, j, i] = 1 - p
+        return odds
+
+    def _cached_pair(self, i, li, j, lj):
+        key = (i, li, j, lj)
+        if key not in self._cache:
+            self._compute(i, [li], i, j)
+        else:
+            self.cache_hits += 1
+        return self._cache[key]
+
+    def _compute(self, team, candidates, i, j):
+        # One batched engine call: a lane per candidate level vector
+        levels = np.empty((len(candidates), len(self.field.levels)))
+        for t, entries in enumerate(self.field.team_entries):
+            levels[:, entries] = self.levels[t]
+        levels[:, self.field.team_entries[team]] = candidates
+        p = batch_engine.team_battle_odds(
+            self.field, i, j, self._profile_lanes(len(candidates)), levels=levels
+        )
+        for cand, value in zip(candidates, p):
+            li = cand if i == team else self.levels[i]
+            lj = cand if j == team else self.levels[j]
+            self._cache[(i, li, j, lj)] = float(value)
+        self.cache_misses += len(candidates)
+        self.evaluations += len(candidates)
+
+    def objective(self, pair_odds):
+        """
+        (K,) imbalance: squared distance of title odds from 1/T plus the
+        mean squared distance of head-to-head odds from 50/50.
+        """
+        title = batch_engine.round_robin_odds(pair_odds)
+        title_term = ((title - 1.0 / self.num_teams) ** 2).sum(axis=1)
+        upper = np.triu_indices(self.num_teams, 1)
+        pair_term = ((pair_odds[:, upper[0], upper[1]] - 0.5) ** 2).mean(axis=1)
+        return title_term + PAIR_WEIGHT * pair_term, title
+
+    def state(self, levels=None):
+        if levels is not None:
+            saved, self.levels = self.levels, [tuple(lv) for lv in levels]
+        odds = self._pair_odds(0, [self.levels[0]])
+        score, title = self.objective(odds)
+        if levels is not None:
+            self.levels = saved
+        return float(score[0]), title[0], odds[0]
+
+    # --- Search ---
+    def run(self, iterations=DEFAULT_ITERATIONS, candidates=DEFAULT_CANDIDATES):
+        current, _, _ = self.state()
+        best, best_levels = current, list(self.levels)
+        for step in range(iterations):
+            if best <= TOLERANCE:
+                break
+            frac = step / max(iterations - 1, 1)
+            temp = START_TEMPERATURE * (END_TEMPERATURE / START_TEMPERATURE) ** frac
+            team = step % self.num_teams
+            cands = self._neighbours(self.levels[team], candidates)
+            if not cands:
+                continue
+            scores, _ = self.objective(self._pair_odds(team, cands))
+            k = int(np.argmin(scores))
+            delta = scores[k] - current
+            if delta <= 0 or self.rng.random() < math.exp(-delta / temp):
+                self.levels[team] = cands[k]
+                current = float(scores[k])
+                if current < best:
+                    best, best_levels = current, list(self.levels)
+        self.levels = best_levels
+        return best
+
+
+def balanced_config(teams_config, levels):
+    """
+    Copy of teams_config with new levels for the entries that take part.
+    """
+    config = copy.deepcopy(teams_config)
+    for team, team_levels in zip(config, levels):
+        active = [poke for poke in team["pokemon"] if poke.get("level", 0) > 0]
+        for poke, level in zip(active, team_levels):
+            poke["level"] = int(level)
+    return config
+
+
+def dump_teams_config(config, f):
+    # Same layout as teams_config.json: one Pokémon per line
+    f.write("[\n")
+    for t, team in enumerate(config):
+        f.write("  {\n")
+        for key, value in team.items():
+            if key == "pokemon":
+                continue
+            f.write(
+                f"    {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)},\n"
+            )
+        f.write('    "pokemon": [\n')
+        rows = [
+            "      " + json.dumps(poke, ensure_ascii=False) for poke in team["pokemon"]
+        ]
+        f.write(",\n".join(rows) + "\n")
+        f.write("    ]\n")
+        f.write("  }" + ("," if t < len(config) - 1 else "") + "\n")
+    f.write("]\n")
+
+
+def build_report(balancer, before, after, elapsed):
+    field = balancer.field
+
+    def describe(levels, summary):
+        score, title, odds = summary
+        return {
+            "objective": round(score, 6),
+            "title_odds": dict(zip(field.trainers, title.round(4).tolist())),
+            "head_to_head": {
+                f"{field.trainers[i]} vs {field.trainers[j]}": round(
+                    float(odds[i, j]), 4
+                )
+                for i in range(len(field.trainers))
+                for j in range(i + 1, len(field.trainers))
+            },
+            "teams": {
+                trainer: {
+                    "total_level": int(sum(lv)),
+                    "levels": {
+                        field.names[e]: int(x)
+                        for e, x in zip(field.team_entries[t], lv)
+                    },
+                }
+                for t, (trainer, lv) in enumerate(zip(field.trainers, levels))
+            },
+        }
+
+    return {
+        "budget": balancer.budget,
+        "level_bounds": [balancer.min_level, balancer.max_level],
+        "elapsed_seconds": round(elapsed, 3),
+        "evaluations": balancer.evaluations,
+        "cache_hits": balancer.cache_hits,
+        "cache_misses": balancer.cache_misses,
+        "before": describe(balancer.initial_levels, before),
+        "after": describe(balancer.levels, after),
+    }
+
+
+def format_report(report):
+    lines = [
+        f"Budget {report['budget']} per team, levels {report['level_bounds'][0]}-"
+        f"{report['level_bounds'][1]}, {report['evaluations']} battles evaluated "
+        f"({report['cache_hits']} cache hits) in {report['elapsed_seconds']}s",
+        f"{'trainer':<12} {'before':>8} {'after':>8} {'levels':>8}",
+    ]
+    for trainer, after in report["after"]["title_odds"].items():
+        before = report["before"]["title_odds"][trainer]
+        total = report["after"]["teams"][trainer]["total_level"]
+        lines.append(f"{trainer:<12} {before:>8.1%} {after:>8.1%} {total:>8}")
+    lines.append(
+        f"Objective: {report['before']['objective']:.4f} -> "
+        f"{report['after']['objective']:.4f}"
+    )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--config", default=batch_engine.CONFIG_PATH)
+    parser.add_argument("--out", help="write the balanced config here")
+    parser.add_argument("--report", help="write the JSON report here")
+    parser.add_argument("--profile", help="ScoringProfile JSON file")
+    parser.add_argument("--budget", type=int, help="max total level per team")
+    parser.add_argument("--min-level", type=int, default=DEFAULT_MIN_LEVEL)
+    parser.add_argument("--max-level", type=int, default=DEFAULT_MAX_LEVEL)
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--candidates", type=int, default=DEFAULT_CANDIDATES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    teams_config = batch_engine.load_json(args.config)
+    profile = scoring.ScoringProfile.load(args.profile) if args.profile else None
+    start = time.perf_counter()
+    balancer = Balancer(
+        batch_engine.Field(teams_config),
+        profile,
+        budget=args.budget,
+        min_level=args.min_level,
+        max_level=args.max_level,
+        seed=args.seed,
+    )
+    before = balancer.state(balancer.initial_levels)
+    balancer.run(args.iterations, args.candidates)
+    after = balancer.state()
+    report = build_report(balancer, before, after, time.perf_counter() - start)
+
+    print(format_report(report))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            dump_teams_config(balanced_config(teams_config, balancer.levels), f)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""
+Batched deterministic engine for analysis tools.
+
+Evaluates the deterministic model (see deterministic_battle) for many scoring
+profiles at once with NumPy: single matchups between every pair of roster
+entries, full team battles with roster-order substitutions, and round-robin
+tournaments. Ties are resolved exactly by splitting a battle into both
+outcomes with half the weight each, so results are probabilities rather than
+samples.
+"""
+
+import itertools
+import json
+import os
+
+import numpy as np
+
+import scoring
+import species_db
+import type_charts
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(BASE_DIR, "teams_config.json")
+STAGES_PATH = os.path.join(BASE_DIR, "pokemon_stages.json")
+
+# Above this many round-robin pairings, tournament odds are sampled
+# instead of enumerated (2 ** pairs outcomes)
+MAX_EXACT_PAIRS = 12
+TOURNAMENT_SAMPLES = 4096
+TINY = 1e-300
+
+
+def load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Field:
+    """
+    Rosters of all trainers compiled to flat entry arrays.
+    Only Pokémon with level > 0 take part, in roster order.
+    type_chart is a type_charts name (None: type_effectiveness.csv).
+    """
+
+    def __init__(self, teams_config=None, pokemon_stages=None, type_chart=None):
+        self.teams_config = teams_config or load_json(CONFIG_PATH)
+        self.pokemon_stages = pokemon_stages or species_db.load_stages()
+        self.trainers = [team["trainer"] for team in self.teams_config]
+        names, levels, stages, bonus, types, team_entries = [], [], [], [], [], []
+        for team in self.teams_config:
+            idx = []
+            for poke in team["pokemon"]:
+                if poke.get("level", 0) <= 0:
+                    continue
+                info = self.pokemon_stages[poke["name"]][str(poke["stage"])]
+                stage, bonus_stages = scoring.stage_and_bonus(
+                    info["name"], poke["stage"]
+                )
+                idx.append(len(names))
+                names.append(info["name"])
+                levels.append(poke["level"])
+                stages.append(stage)
+                bonus.append(bonus_stages)
+                types.append(info.get("type", ["Normal"]))
+            team_entries.append(np.array(idx, dtype=np.intp))
+        self.names = names
+        self.types = types
+        self.levels = np.array(levels, dtype=np.float64)
+        self.stages = np.array(stages, dtype=np.float64)
+        self.bonus = np.array(bonus, dtype=np.float64)
+        self.team_entries = team_entries
+        self.chart = type_charts.get(type_chart)
+        # type_mult[i, j]: multiplier of entry i attacking entry j
+        self.type_mult = self.chart.cross(types, types)
+
+    def with_levels(self, team_idx, levels):
+        """
+        Returns a copy of the field with new levels for one team's entries.
+        """
+        field = object.__new__(Field)
+        field.__dict__.update(self.__dict__)
+        field.levels = self.levels.copy()
+        field.levels[self.team_entries[team_idx]] = levels
+        return field
+
+    def with_chart(self, type_chart):
+        """
+        Returns a copy of the field under another type chart.
+        """
+        field = object.__new__(Field)
+        field.__dict__.update(self.__dict__)
+        field.chart = type_charts.get(type_chart)
+        field.type_mult = field.chart.cross(self.types, self.types)
+        return field
+
+
+class ProfileArrays:
+    """
+    Column view of a list of ScoringProfiles: one (P,) array per parameter.
+    """
+
+    def __init__(self, profiles):
+        self.profiles = list(profiles)
+        for name in scoring.ScoringProfile.FIELDS:
+            values = [getattr(p, name) for p in self.profiles]
+            setattr(self, name, np.array(values, dtype=np.float64))
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def max_hp(self, field, levels=None):
+        # (P, E) starting HP of every entry under every profile
+        levels = field.levels[None, :] if levels is None else levels
+        return (
+            self.base_hp[:, None]
+            + levels * self.level_mult[:, None]
+            + field.stages[None, :] * self.stage_mult[:, None]
+            + field.bonus[None, :] * self.stage_mult[:, None]
+            + self.hp_boost[:, None]
+        )
+
+
+def _as_profile_arrays(profiles):
+    if isinstance(profiles, ProfileArrays):
+        return profiles
+    if isinstance(profiles, scoring.ScoringProfile):
+        profiles = [profiles]
+    return ProfileArrays(profiles or [scoring.DEFAULT_PROFILE])
+
+
+def matchup_matrix(field, profiles=None):
+    """
+    (P, E, E) probability that entry i beats entry j at full HP.
+    """
+    pa = _as_profile_arrays(profiles)
+    hp = pa.max_hp(field)
+    score = (
+        (pa.level_weight[:, None] * field.levels[None, :])[:, :, None]
+        + (pa.hp_weight[:, None] * hp)[:, :, None]
+        + pa.type_weight[:, None, None] * field.type_mult[None]
+        + (pa.stage_weight[:, None] * field.stages[None, :])[:, :, None]
+    )
+    diff = score - np.swapaxes(score, 1, 2)
+    tie = np.abs(diff) <= pa.tie_margin[:, None, None]
+    return np.where(tie, 0.5, (diff > 0).astype(np.float64))
+
+
+def team_battle_odds(field, team_a, team_b, profiles=None, start_hp=None, levels=None):
+    """
+    (P,) probability that trainer team_a beats team_b, with both teams
+    substituting in roster order. A draw (both teams running out in the
+    same exchange) counts as half a win for each side. start_hp and levels optionally override
+    the starting HP and levels per lane as (P, E) arrays.
+    """
+    pa = _as_profile_arrays(profiles)
+    ea = field.team_entries[team_a]
+    eb = field.team_entries[team_b]
+    na, nb = len(ea), len(eb)
+    hp = pa.max_hp(field, levels) if start_hp is None else start_hp
+    if levels is None:
+        levels = np.broadcast_to(field.levels, (len(pa), len(field.levels)))
+    result = np.zeros(len(pa), dtype=np.float64)
+    if na == 0 or nb == 0:
+        result[:] = 1.0 if na else 0.0
+        return result
+
+    # One lane per (profile, tie branch); finished lanes are dropped
+    lane_p = np.arange(len(pa))
+    weight = np.ones(len(pa))
+    hp_a = hp[:, ea].copy()
+    hp_b = hp[:, eb].copy()
+    ia = np.zeros(len(pa), dtype=np.intp)
+    ib = np.zeros(len(pa), dtype=np.intp)
+    while len(lane_p):
+        rows = np.arange(len(lane_p))
+        la, lb = ea[ia], eb[ib]
+        cur_a, cur_b = hp_a[rows, ia], hp_b[rows, ib]
+        a_score = (
+            pa.level_weight[lane_p] * levels[lane_p, la]
+            + pa.hp_weight[lane_p] * cur_a
+            + pa.type_weight[lane_p] * field.type_mult[la, lb]
+            + pa.stage_weight[lane_p] * field.stages[la]
+        )
+        b_score = (
+            pa.level_weight[lane_p] * levels[lane_p, lb]
+            + pa.hp_weight[lane_p] * cur_b
+            + pa.type_weight[lane_p] * field.type_mult[lb, la]
+            + pa.stage_weight[lane_p] * field.stages[lb]
+        )
+        diff = a_score - b_score
+        factor = pa.margin_hp_factor[lane_p]
+        a_wins = diff > 0
+        win_hp = np.trunc(
+            np.where(
+                a_wins,
+                np.minimum(cur_a, diff * factor),
+                np.minimum(cur_b, -diff * factor),
+            )
+        )
+        tie = np.abs(diff) <= pa.tie_margin[lane_p]
+        if tie.any():
+            # Split tied lanes: the originals go to A, the copies to B
+            t = np.flatnonzero(tie)
+            a_wins[t] = True
+            win_hp[t] = 1
+            weight[t] *= 0.5
+            lane_p = np.concatenate([lane_p, lane_p[t]])
+            weight = np.concatenate([weight, weight[t]])
+            hp_a = np.concatenate([hp_a, hp_a[t]])
+            hp_b = np.concatenate([hp_b, hp_b[t]])
+            ia = np.concatenate([ia, ia[t]])
+            ib = np.concatenate([ib, ib[t]])
+            a_wins = np.concatenate([a_wins, np.zeros(len(t), dtype=bool)])
+            win_hp = np.concatenate([win_hp, np.ones(len(t))])
+            rows = np.arange(len(lane_p))
+
+        hp_a[rows, ia] = np.where(a_wins, win_hp, 0)
+        hp_b[rows, ib] = np.where(a_wins, 0, win_hp)
+        # Later roster members are untouched, so the next alive is the next
+        # one. A narrow win can leave the winner on 0 HP, so it faints too.
+        ia = ia + (hp_a[rows, ia] <= 0)
+        ib = ib + (hp_b[rows, ib] <= 0)
+
+        b_out, a_out = ib >= nb, ia >= na
+        done = b_out | a_out
+        if done.any():
+            credit = np.where(a_out, 0.5, 1.0) * weight
+            np.add.at(result, lane_p[b_out], credit[b_out])
+            keep = ~done
+            lane_p, weight = lane_p[keep], weight[keep]
+            hp_a, hp_b = hp_a[keep], hp_b[keep]
+            ia, ib = ia[keep], ib[keep]
+    return result
+
+
+def pairwise_odds(field, profiles=None, teams=None, levels=None):
+    """
+    (P, T, T) probability that trainer i beats trainer j in a team battle.
+    teams restricts the computation to the listed trainer indices, and
+    levels optionally gives (P, E) levels per lane.
+    """
+    pa = _as_profile_arrays(profiles)
+    n = len(field.trainers)
+    teams = range(n) if teams is None else teams
+    odds = np.full((len(pa), n, n), 0.5)
+    for i, j in itertools.combinations(teams, 2):
+        p = team_battle_odds(field, i, j, pa, levels=levels)
+        odds[:, i, j] = p
+        odds[:, j, i] = 1 - p
+    return odds
+
+
+def round_robin_odds(pair_odds, samples=TOURNAMENT_SAMPLES, seed=0):
+    """
+    (P, T) probability that each trainer wins a round robin, given (P, T, T)
+    pairwise odds. Trainers tied on points share the title equally.
+    """
+    num_p, n, _ = pair_odds.shape
+    pairs = list(itertools.combinations(range(n), 2))
+    if not pairs:
+        return np.ones((num_p, n))
+    p_first = np.stack([pair_odds[:, i, j] for i, j in pairs], axis=1)  # (P, K)
+    # Points per outcome: first[k] tells whether pair k's first trainer won
+    credit_first = np.zeros((len(pairs), n))
+    credit_second = np.zeros((len(pairs), n))
+    for k, (i, j) in enumerate(pairs):
+        credit_first[k, i] = 1
+        credit_second[k, j] = 1
+
+    if len(pairs) <= MAX_EXACT_PAIRS:
+        first = (
+            np.arange(2 ** len(pairs))[:, None] >> np.arange(len(pairs))[None, :]
+        ) & 1
+        first = first.astype(bool)  # (O, K)
+        points = first @ credit_first + (~first) @ credit_second  # (O, T)
+        share = points == points.max(axis=1, keepdims=True)
+        share = share / share.sum(axis=1, keepdims=True)
+        # log-probability of every outcome under every profile
+        log_p = np.log(np.maximum(p_first, TINY))
+        log_q = np.log(np.maximum(1 - p_first, TINY))
+        prob = np.exp(first @ log_p.T + (~first) @ log_q.T).T  # (P, O)
+        return prob @ share
+
+    rng = np.random.default_rng(seed)
+    draws = rng.random((samples, len(pairs)))
+    result = np.zeros((num_p, n))
+    for p in range(num_p):
+        first = draws < p_first[p][None, :]
+        points = first @ credit_first + (~first) @ credit_second
+        share = points == points.max(axis=1, keepdims=True)
+        result[p] = (share / share.sum(axis=1, keepdims=True)).mean(axis=0)
+    return result
+
+
+def tournament_odds(field, profiles=None):
+    """
+    (P, T) probability that each trainer wins the round-robin tournament.
+    """
+    return round_robin_odds(pairwise_odds(field, profiles))
@@ -0,0 +1,685 @@
+"""
+Local battle service shared by several GUIs.
+
+One process owns the tournament state and resolves battles; every
+pokemon_gui.py instance connects to it as a thin client. Plain asyncio,
+standard library only:
+
+    GET  /state      full state snapshot
+    POST /battle     {"a": i, "b": j} resolve a pending pairing automatically
+    POST /result     {"a": i, "b": j, "winner": i | j | null} report a result
+    POST /simulate   resolve every remaining match
+    GET  /ws         WebSocket pushing a snapshot, then one delta per result
+
+Battle requests arriving within BATCH_WINDOW seconds of each other are
+coalesced into a single engine call.
+
+Example:
+    python main/battle_service.py serve --format swiss
+    python main/pokemon_gui.py http://127.0.0.1:8765
+    python main/battle_service.py watch
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import http.client
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import urllib.parse
+
+import scoring
+import species_db
+import tournament_formats
+import type_charts
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(BASE_DIR, "teams_config.json")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+BATCH_WINDOW = 0.005  # seconds to wait for more battle requests
+MAX_BODY = 1 << 20
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    500: "Internal Server Error",
+}
+
+
+class ServiceError(Exception):
+    pass
+
+
+def load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def body_int(body, name, optional=False):
+    """
+    An integer field of a request body (None if optional and missing or
+    null); ServiceError naming the field if it is missing or not an integer.
+    """
+    value = body.get(name)
+    if value is None:
+        if optional:
+            return None
+        raise ServiceError(f"missing field {name!r}")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ServiceError(f"field {name!r} must be an integer, got {value!r}")
+
+
+# --- WebSocket framing (RFC 6455, text frames only) ---
+
+
+def encode_frame(payload, opcode=0x1, mask=False):
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    n = len(payload)
+    if n < 126:
+        header.append(mask_bit | n)
+    elif n < 1 << 16:
+        header.append(mask_bit | 126)
+        header += struct.pack("!H", n)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack("!Q", n)
+    if mask:
+        key = os.urandom(4)
+        header += key
+        payload = _unmask(payload, key)
+    return bytes(header) + payload
+
+
+def _unmask(payload, key):
+    return bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+
+
+def _frame_length(second, extra):
+    n = second & 0x7F
+    if n == 126:
+        return struct.unpack("!H", extra)[0]
+    if n == 127:
+        return struct.unpack("!Q", extra)[0]
+    return n
+
+
+def _extra_length(second):
+    return {126: 2, 127: 8}.get(second & 0x7F, 0)
+
+
+async def read_frame(reader):
+    """
+    Returns (opcode, payload) of the next frame from an asyncio reader.
+    """
+    first, second = await reader.readexactly(2)
+    n = _frame_length(second, await reader.readexactly(_extra_length(second)))
+    key = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(n)
+    return first & 0x0F, _unmask(payload, key) if key else payload
+
+
+def recv_frame(stream):
+    """
+    Blocking counterpart of read_frame for a socket file.
+    """
+    head = stream.read(2)
+    if len(head) < 2:
+        raise ConnectionError("connection closed")
+    first, second = head
+    n = _frame_length(second, stream.read(_extra_length(second)))
+    key = stream.read(4) if second & 0x80 else None
+    payload = stream.read(n)
+    return first & 0x0F, _unmask(payload, key) if key else payload
+
+
+def accept_key(key):
+    digest = hashlib.sha1((key + WS_GUID).encode("ascii")).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+# --- Server ---
+
+
+class BattleService:
+    def __init__(
+        self,
+        teams_config,
+        pokemon_stages,
+        tournament_format="round_robin",
+        profile=None,
+        seed=0,
+        type_chart=None,
+    ):
+        self.teams_config = teams_config
+        self.trainers = [team["trainer"] for team in teams_config]
+        self.format = tournament_format
+        self.tournament = tournament_formats.make_tournament(
+            tournament_format, self.trainers
+        )
+        self.engine = tournament_formats.MatchEngine(
+            teams_config, pokemon_stages, profile, seed, type_chart
+        )
+        self.version = 0
+        self.requests = 0
+        self.batches = 0
+        self._queue = []  # (a, b, future) waiting for the next batch
+        self._flush_handle = None
+        self._lock = None  # created on first use, in the running loop
+        self._subscribers = set()
+        self._sent_rows = self._rows()
+
+    def _rows(self):
+        s = self.tournament.standings
+        return [
+            [s.points[p], s.wins[p], s.draws[p], s.losses[p]]
+            for p in range(len(self.trainers))
+        ]
+
+    def _progress(self):
+        champion = self.tournament.champion()
+        return {
+            "round": self.tournament.round,
+            "pending": self.tournament.pending(),
+            "finished": self.tournament.finished,
+            "champion": champion,
+            "ranking": self.tournament.standings.ranking(),
+        }
+
+    def snapshot(self):
+        state = {
+            "type": "snapshot",
+            "version": self.version,
+            "format": self.format,
+            "trainers": self.trainers,
+            "teams_config": self.teams_config,
+            "standings": self._rows(),
+            "stats": {"requests": self.requests, "batches": self.batches},
+        }
+        state.update(self._progress())
+        return state
+
+    def _record(self, a, b, winner):
+        """
+        Applies one result and broadcasts the delta: only standings rows that
+        changed since the previous delta are included.
+        """
+        self.tournament.record(a, b, winner)
+        self.version += 1
+        progress = self._progress()  # may open a round (and hand out byes)
+        rows = self._rows()
+        changed = {p: row for p, row in enumerate(rows) if row != self._sent_rows[p]}
+        self._sent_rows = rows
+        delta = {
+            "type": "result",
+            "version": self.version,
+            "a": a,
+            "b": b,
+            "winner": winner,
+            "standings": changed,
+        }
+        delta.update(progress)
+        message = json.dumps(delta)
+        for queue in self._subscribers:
+            queue.put_nowait(message)
+        return delta
+
+    def _locked(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _check_pairing(self, a, b):
+        if (a, b) not in self.tournament.pending():
+            raise ServiceError(f"{a} vs {b} is not a pending pairing")
+
+    # --- Batched battle resolution ---
+
+    async def request_battle(self, a, b):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.requests += 1
+        self._queue.append((a, b, future))
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(
+                BATCH_WINDOW, lambda: asyncio.ensure_future(self._flush())
+            )
+        return await future
+
+    async def _flush(self):
+        async with self._locked():
+            self._flush_handle = None
+            batch, self._queue = self._queue, []
+            # Requests for the same pairing share one battle
+            waiting = {}
+            for a, b, future in batch:
+                try:
+                    self._check_pairing(a, b)
+                except ServiceError as e:
+                    future.set_exception(e)
+                    continue
+                waiting.setdefault((a, b), []).append(future)
+            if not waiting:
+                return
+            try:
+                deltas = await self._resolve(list(waiting))
+            except Exception as e:
+                # Nobody awaits this task: the requests get the error instead
+                for futures in waiting.values():
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+                return
+            for pair, delta in zip(waiting, deltas):
+                for future in waiting[pair]:
+                    if not future.done():
+                        future.set_result(delta)
+
+    async def _resolve(self, pairings):
+        # One engine call for the whole batch, off the event loop
+        matches = [(a, b, self.tournament.match_key(a, b)) for a, b in pairings]
+        loop = asyncio.get_running_loop()
+        winners = await loop.run_in_executor(None, self.engine.play_many, matches)
+        self.batches += 1
+        return [self._record(a, b, w) for (a, b), w in zip(pairings, winners)]
+
+    async def report_result(self, a, b, winner):
+        async with self._locked():
+            self._check_pairing(a, b)
+            if winner not in (a, b, None):
+                raise ServiceError(f"winner must be {a}, {b} or null")
+            return self._record(a, b, winner)
+
+    async def simulate(self):
+        async with self._locked():
+            while True:
+                pairings = self.tournament.pending()
+                if not pairings:
+                    break
+                await self._resolve(pairings)
+        return self.snapshot()
+
+    # --- HTTP / WebSocket ---
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """
+        Starts listening and returns the asyncio server.
+        """
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await reader.readline()
+            method, target, _ = request.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            path = urllib.parse.urlsplit(target).path
+            if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self._websocket(reader, writer, headers)
+                return
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY:
+                raise ServiceError("request body too large")
+            body = json.loads(await reader.readexactly(length)) if length else {}
+            status, payload = 200, await self._route(method, path, body)
+        except ServiceError as e:
+            status, payload = 400, {"error": str(e)}
+        except LookupError:
+            status, payload = 404, {"error": "not found"}
+        except (ValueError, TypeError) as e:
+            status, payload = 400, {"error": f"bad request: {e}"}
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+            return
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        data = json.dumps(payload).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+        writer.close()
+
+    async def _route(self, method, path, body):
+        if not isinstance(body, dict):
+            raise ServiceError("request body must be a JSON object")
+        if (method, path) == ("GET", "/state"):
+            return self.snapshot()
+        if (method, path) == ("POST", "/battle"):
+            a, b = body_int(body, "a"), body_int(body, "b")
+            return await self.request_battle(a, b)
+        if (method, path) == ("POST", "/result"):
+            a, b = body_int(body, "a"), body_int(body, "b")
+            winner = body_int(body, "winner", optional=True)
+            return await self.report_result(a, b, winner)
+        if (method, path) == ("POST", "/simulate"):
+            return await self.simulate()
+        raise LookupError(path)
+
+    async def _websocket(self, reader, writer, headers):
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept_key(headers['sec-websocket-key'])}"
+            "\r\n\r\n".encode("latin-1")
+        )
+        queue = asyncio.Queue()
+        queue.put_nowait(json.dumps(self.snapshot()))
+        self._subscribers.add(queue)
+        incoming = asyncio.ensure_future(self._ws_incoming(reader, writer))
+        try:
+            while not incoming.done():
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait(
+                    [getter, incoming], return_when=asyncio.FIRST_COMPLETED
+                )
+                if not getter.done():
+                    getter.cancel()
+                    break
+                writer.write(encode_frame(getter.result().encode("utf-8")))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._subscribers.discard(queue)
+            incoming.cancel()
+            writer.close()
+
+    async def _ws_incoming(self, reader, writer):
+        # Clients only send control frames: answer pings, stop on close
+        try:
+            while True:
+                opcode, payload = await read_frame(reader)
+                if opcode == 0x8:
+                    writer.write(encode_frame(payload[:2], opcode=0x8))
+                    return
+                if opcode == 0x9:
+                    writer.write(encode_frame(payload, opcode=0xA))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            return
+
+
+# --- Client ---
+
+
+class BattleClient:
+    """
+    Blocking client for BattleService.
+    """
+
+    def __init__(self, url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout=30):
+        parts = urllib.parse.urlsplit(url)
+        self.host = parts.hostname or DEFAULT_HOST
+        self.port = parts.port or DEFAULT_PORT
+        self.timeout = timeout
+
+    def _request(self, method, path, body=None):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            data = json.dumps(body).encode("utf-8") if body is not None else None
+            conn.request(
+                method, path, body=data, headers={"Content-Type": "application/json"}
+            )
+            response = conn.getresponse()
+            payload = json.loads(response.read())
+        finally:
+            conn.close()
+        if response.status != 200:
+            raise ServiceError(payload.get("error", response.reason))
+        return payload
+
+    def state(self):
+        return self._request("GET", "/state")
+
+    def battle(self, a, b):
+        return self._request("POST", "/battle", {"a": a, "b": b})
+
+    def record(self, a, b, winner):
+        return self._request("POST", "/result", {"a": a, "b": b, "winner": winner})
+
+    def simulate(self):
+        return self._request("POST", "/simulate", {})
+
+    def subscribe(self):
+        """
+        Yields the snapshot and then every delta pushed by the service.
+        """
+        sock = socket.create_connection((self.host, self.port))
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        sock.sendall(
+            "GET /ws HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n".encode("latin-1")
+        )
+        stream = sock.makefile("rb")
+        try:
+            status = stream.readline()
+            if b" 101 " not in status:
+                raise ServiceError(f"WebSocket upgrade failed: {status!r}")
+            while stream.readline().strip():
+                pass
+            while True:
+                opcode, payload = recv_frame(stream)
+                if opcode == 0x8:
+                    return
+                if opcode == 0x1:
+                    yield json.loads(payload)
+        finally:
+            try:
+                sock.sendall(encode_frame(b"", opcode=0x8, mask=True))
+            except OSError:
+                pass
+            stream.close()
+            sock.close()
+
+
+class RemoteStandings:
+    """
+    Standings mirror with the parts of Standings the GUI reads.
+    """
+
+    def __init__(self, trainers):
+        self.trainers = trainers
+        self.points = [0.0] * len(trainers)
+        self.wins = [0] * len(trainers)
+        self.draws = [0] * len(trainers)
+        self.losses = [0] * len(trainers)
+        self.order = list(range(len(trainers)))
+
+    def update(self, rows, ranking):
+        for p, (points, wins, draws, losses) in rows:
+            p = int(p)
+            self.points[p] = points
+            self.wins[p] = wins
+            self.draws[p] = draws
+            self.losses[p] = losses
+        self.order = ranking
+
+    def ranking(self, players=None):
+        if players is None:
+            return list(self.order)
+        players = set(players)
+        return [p for p in self.order if p in players]
+
+    def rows(self, players=None):
+        return [
+            (
+                self.trainers[p],
+                self.points[p],
+                self.wins[p],
+                self.draws[p],
+                self.losses[p],
+            )
+            for p in self.ranking(players)
+        ]
+
+
+class RemoteTournament:
+    """
+    Tournament-like view of the service state, kept current by a background
+    WebSocket listener, so TournamentWindow can drive a shared tournament.
+    `version` changes whenever a delta has been applied. A delta only holds
+    the standings rows its own result changed, so one that skips a version
+    (e.g. an HTTP response overtaking the WebSocket) is replaced by a fresh
+    snapshot, and the deltas it overtook are then dropped as stale.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._lock = threading.Lock()
+        state = client.state()
+        self.teams_config = state["teams_config"]
+        self.trainers = state["trainers"]
+        self.standings = RemoteStandings(self.trainers)
+        self.version = -1
+        self._apply(state)
+        self._listener = threading.Thread(target=self._listen, daemon=True)
+        self._listener.start()
+
+    def _apply(self, message):
+        with self._lock:
+            if message["type"] != "snapshot":
+                if message["version"] <= self.version:
+                    return  # already applied, or covered by a snapshot
+                if message["version"] > self.version + 1:
+                    message = self.client.state()
+            if message["version"] < self.version:
+                return  # a snapshot older than what was applied
+            if message["type"] == "snapshot":
+                rows = enumerate(message["standings"])
+            else:
+                rows = message["standings"].items()
+            self.standings.update(rows, message["ranking"])
+            self.version = message["version"]
+            self.round = message["round"]
+            self._pending = [tuple(pair) for pair in message["pending"]]
+            self.finished = message["finished"]
+            self._champion = message["champion"]
+
+    def _listen(self):
+        try:
+            for message in self.client.subscribe():
+                self._apply(message)
+        except (OSError, ServiceError):
+            pass  # service gone; the window keeps its last state
+
+    def pending(self):
+        with self._lock:
+            return list(self._pending)
+
+    def champion(self):
+        return self._champion
+
+    def record(self, a, b, winner):
+        self._apply(self.client.record(a, b, winner))
+
+    def simulate(self):
+        self._apply(self.client.simulate())
+
+
+# --- CLI ---
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="run the service")
+    serve.add_argument("--host", default=DEFAULT_HOST)
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument(
+        "--format", default="round_robin", choices=list(tournament_formats.FORMATS)
+    )
+    serve.add_argument(
+        "--config", help="teams config JSON (default: teams_config.json)"
+    )
+    serve.add_argument(
+        "--species", help="species store or stages JSON (default: species.db)"
+    )
+    serve.add_argument("--profile", help="ScoringProfile JSON file")
+    serve.add_argument(
+        "--type-chart",
+        choices=list(type_charts.CHARTS),
+        help="type chart (default: type_effectiveness.csv)",
+    )
+    serve.add_argument("--seed", type=int, default=0)
+    for name, text in (
+        ("state", "print the current state"),
+        ("battle", "resolve a pending pairing"),
+        ("simulate", "resolve every remaining match"),
+        ("watch", "print deltas as they are pushed"),
+    ):
+        cmd = sub.add_parser(name, help=text)
+        cmd.add_argument("--url", default=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+        if name == "battle":
+            cmd.add_argument("a", type=int)
+            cmd.add_argument("b", type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        config = load_json(args.config or CONFIG_PATH)
+        profile = scoring.ScoringProfile.load(args.profile) if args.profile else None
+        service = BattleService(
+            config,
+            species_db.load_stages(args.species),
+            args.format,
+            profile,
+            args.seed,
+            args.type_chart,
+        )
+
+        async def run():
+            server = await service.serve(args.host, args.port)
+            print(f"Battle service on http://{args.host}:{args.port} ({args.format})")
+            async with server:
+                await server.serve_forever()
+
+        try:
+            asyncio.run(run())
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    client = BattleClient(args.url)
+    try:
+        if args.command == "watch":
+            for message in client.subscribe():
+                print(json.dumps(message), flush=True)
+            return 0
+        if args.command == "state":
+            result = client.state()
+        elif args.command == "battle":
+            result = client.battle(args.a, args.b)
+        else:
+            result = client.simulate()
+    except ServiceError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,17 +2,55 @@ import poke_battle_sim as pb
 import csv
 import os
 
+import kernels
+import move_ai
+import scoring
+import type_charts
+
 # --- Load type effectiveness chart from CSV ---
-TYPE_EFFECTIVENESS = {}
-type_chart_path = os.path.join(os.path.dirname(__file__), "type_effectiveness.csv")
-with open(type_chart_path, newline="", encoding="utf-8") as csvfile:
-    reader = csv.reader(csvfile)
-    header = next(reader)[1:]  # skip first empty cell
-    for row in reader:
-        atk_type = row[0].lower()
-        TYPE_EFFECTIVENESS[atk_type] = {
-            def_type.lower(): float(mult) for def_type, mult in zip(header, row[1:])
-        }
+TYPE_CHART_PATH = os.path.join(os.path.dirname(__file__), "type_effectiveness.csv")
+
+
+def load_type_chart(path=TYPE_CHART_PATH):
+    """
+    Attacking type -> {defending type: multiplier}, all lowercase.
+    """
+    chart = {}
+    with open(path, newline="", encoding="utf-8") as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader)[1:]  # skip first empty cell
+        for row in reader:
+            chart[row[0].lower()] = {
+                def_type.lower(): float(mult) for def_type, mult in zip(header, row[1:])
+            }
+    return chart
+
+
+TYPE_EFFECTIVENESS = load_type_chart()
+
+
+def get_type_multiplier(attacker, defender, chart=None):
+    # attacker, defender: string or list of strings (types)
+    # chart: a type_charts name, or None for type_effectiveness.csv
+    if chart is not None:
+        return type_charts.get(chart).multiplier(attacker, defender)
+    if not attacker or not defender:
+        return 1.0
+    if isinstance(attacker, str):
+        attacker = [attacker]
+    if isinstance(defender, str):
+        defender = [defender]
+    # For each attacker's type, calculate the best multiplier against all defender's types
+    best = 1.0
+    for atk in attacker:
+        atk = atk.lower()
+        mult = 1.0
+        for dft in defender:
+            dft = dft.lower()
+            mult *= TYPE_EFFECTIVENESS.get(atk, {}).get(dft, 1.0)
+        if mult > best:
+            best = mult
+    return best
 
 
 def simulate_battle(
@@ -28,7 +66,10 @@ def simulate_battle(
     poke_b_cur_hp,
     hp_boost=10,
     verbose=False,
+    move_budget=move_ai.TIME_BUDGET,
 ):
+    # Each side picks its move every turn with move_ai; move_budget is the
+    # search time per move in seconds, None for a fixed, reproducible depth
     # Create Pokémon with calculated stats, then boost only HP
     poke_a = pb.Pokemon(
         poke_a_id,
@@ -68,8 +109,8 @@ def simulate_battle(
             f"Turn 0: {poke_a_id} HP: {poke_a.cur_hp}, {poke_b_id} HP: {poke_b.cur_hp}"
         )
     while not battle.is_finished():
-        t1_action = ["move", poke_a_moves[0]]
-        t2_action = ["move", poke_b_moves[0]]
+        t1_action = ["move", move_ai.pick(poke_a, poke_b, move_budget)]
+        t2_action = ["move", move_ai.pick(poke_b, poke_a, move_budget)]
         battle.turn(t1_action, t2_action)
         if verbose:
             battle_log.append(
@@ -149,49 +190,26 @@ def deterministic_battle(
     poke_a_stage=1,
     poke_b_stage=1,
     verbose=False,
+    profile=None,
+    chart=None,
 ):
     """
     Deterministic battle simulation based on level, HP, type, and evolution stage.
     poke_a_type and poke_b_type should be a string (e.g., 'Fire') or a list of types.
     poke_a_stage and poke_b_stage: 1=base, 2=stage1, 3=stage2, etc.
+    profile: ScoringProfile with the weights to use (defaults to DEFAULT_PROFILE).
+    chart: type_charts name (None: type_effectiveness.csv).
     """
+    params = (profile or scoring.DEFAULT_PROFILE).params()
 
-    def get_type_multiplier(attacker, defender):
-        # attacker, defender: string or list of strings (types)
-        if not attacker or not defender:
-            return 1.0
-        if isinstance(attacker, str):
-            attacker = [attacker]
-        if isinstance(defender, str):
-            defender = [defender]
-        # For each attacker's type, calculate the best multiplier against all defender's types
-        best = 1.0
-        for atk in attacker:
-            atk = atk.lower()
-            mult = 1.0
-            for dft in defender:
-                dft = dft.lower()
-                mult *= TYPE_EFFECTIVENESS.get(atk, {}).get(dft, 1.0)
-            if mult > best:
-                best = mult
-        return best
-
-    # Calculate scores
-    a_type_mult = get_type_multiplier(poke_a_type, poke_b_type)
-    b_type_mult = get_type_multiplier(poke_b_type, poke_a_type)
-    TYPE_WEIGHT = 45
-    STAGE_WEIGHT = 14
-    a_score = (
-        poke_a_level * 2
-        + poke_a_cur_hp * 1.5
-        + a_type_mult * TYPE_WEIGHT
-        + poke_a_stage * STAGE_WEIGHT
+    # Calculate scores (see ScoringProfile for the formula and its weights)
+    a_type_mult = get_type_multiplier(poke_a_type, poke_b_type, chart)
+    b_type_mult = get_type_multiplier(poke_b_type, poke_a_type, chart)
+    a_score = kernels.score(
+        poke_a_level, poke_a_cur_hp, a_type_mult, poke_a_stage, params
     )
-    b_score = (
-        poke_b_level * 2
-        + poke_b_cur_hp * 1.5
-        + b_type_mult * TYPE_WEIGHT
-        + poke_b_stage * STAGE_WEIGHT
+    b_score = kernels.score(
+        poke_b_level, poke_b_cur_hp, b_type_mult, poke_b_stage, params
     )
     battle_log = []
     if verbose:
@@ -199,44 +217,32 @@ def deterministic_battle(
             f"{poke_a_id} (Lv {poke_a_level}, HP {poke_a_cur_hp}, Type {poke_a_type}, Stage {poke_a_stage}) vs {poke_b_id} (Lv {poke_b_level}, HP {poke_b_cur_hp}, Type {poke_b_type}, Stage {poke_b_stage})"
         )
         battle_log.append(f"A score: {a_score:.1f}, B score: {b_score:.1f}")
-    # If scores are exactly equal, randomly pick a winner with 1 HP
+    # If scores are (nearly) equal, randomly pick a winner with 1 HP
     import random
 
-    if abs(a_score - b_score) <= 1:
-        if random.choice([True, False]):
-            winner = "A"
-            winner_name = poke_a_id
-            loser_name = poke_b_id
-            winner_hp = 1
-            loser_hp = 0
-        else:
-            winner = "B"
-            winner_name = poke_b_id
-            loser_name = poke_a_id
-            winner_hp = 1
-            loser_hp = 0
-        if verbose:
-            battle_log.append(
-                f"Tie! Randomly selected {winner_name} as winner with 1 HP."
-            )
-    elif a_score > b_score:
+    tie = kernels.is_tie(a_score, b_score, params)
+    coin = random.choice([True, False]) if tie else False
+    result, winner_hp = kernels.resolve(
+        a_score, b_score, poke_a_cur_hp, poke_b_cur_hp, coin, params
+    )
+    loser_hp = 0
+    if result == kernels.A_WINS:
         winner = "A"
         winner_name = poke_a_id
         loser_name = poke_b_id
-        margin = a_score - b_score
-        winner_hp = int(min(poke_a_cur_hp, margin * 0.7))
-        loser_hp = 0
-        if verbose:
-            battle_log.append(f"Winner: {poke_a_id} (A) with {winner_hp} HP left.")
     else:
         winner = "B"
         winner_name = poke_b_id
         loser_name = poke_a_id
-        margin = b_score - a_score
-        winner_hp = int(min(poke_b_cur_hp, margin * 0.7))
-        loser_hp = 0
-        if verbose:
-            battle_log.append(f"Winner: {poke_b_id} (B) with {winner_hp} HP left.")
+    if verbose:
+        if tie:
+            battle_log.append(
+                f"Tie! Randomly selected {winner_name} as winner with 1 HP."
+            )
+        else:
+            battle_log.append(
+                f"Winner: {winner_name} ({winner}) with {winner_hp} HP left."
+            )
     return {
         "winner": winner,
         "winner_name": winner_name,
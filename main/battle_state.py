@@ -0,0 +1,61 @@
+"""
+Immutable battle state with structural sharing.
+
+A BattleState holds the HP of every Pokémon of both sides and the index of
+each side's active Pokémon, as nested tuples. Transitions never change a
+state: they return a new one that shares every side's HP tuple they do not
+touch, so a transition costs at most one copy of a team's HP (O(team size))
+and keeping earlier states costs next to nothing. TeamBattleManager keeps
+its current state here, with an undo/redo history of earlier ones.
+
+Example:
+    state = BattleState.initial([[30, 28], [35, 0]])
+    state = state.with_active(0, 1).with_active(1, 0)
+    after = state.exchange((1, 0), (12, 0))  # state is unchanged
+"""
+
+from collections import namedtuple
+
+SIDES = (0, 1)
+
+
+class BattleState(namedtuple("BattleState", "hp active")):
+    """
+    hp: per side, a tuple with the HP of every Pokémon of the team.
+    active: per side, the index of the active Pokémon, or None before the
+    starters are chosen.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def initial(cls, hp, active=(None, None)):
+        return cls(tuple(tuple(side) for side in hp), tuple(active))
+
+    def to_dict(self):
+        return {"hp": [list(side) for side in self.hp], "active": list(self.active)}
+
+    # --- Transitions ---
+
+    def with_active(self, side, idx):
+        active = list(self.active)
+        active[side] = idx
+        return self._replace(active=tuple(active))
+
+    def with_hp(self, side, idx, hp):
+        team = self.hp[side]
+        if team[idx] == hp:
+            return self
+        hps = list(self.hp)
+        hps[side] = team[:idx] + (hp,) + team[idx + 1 :]
+        return self._replace(hp=tuple(hps))
+
+    def exchange(self, active, hp):
+        """
+        Outcome of one exchange: the active Pokémon of both sides and the HP
+        each has left.
+        """
+        state = self._replace(active=tuple(active))
+        for side in SIDES:
+            state = state.with_hp(side, active[side], hp[side])
+        return state
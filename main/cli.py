@@ -0,0 +1,392 @@
+"""
+Batch matchup evaluation from the command line.
+
+Reads one matchup per JSONL line or CSV row, evaluates it with the chosen
+engine and streams one result per input row, in input order. Input is read
+lazily and only a bounded number of chunks is in flight at a time, so
+memory use does not grow with the input size.
+
+Input fields (CSV header / JSON keys):
+    a, b                 species names, e.g. Charmander
+    a_level, b_level     levels (default 10)
+    a_hp, b_hp           current HP (default: full HP)
+    a_stage, b_stage     evolution stage (default: from the species store)
+    a_type, b_type       types, e.g. Fire/Flying (default: from the species store)
+    a_move, b_move       moves for the sim engines, comma-separated, picked each
+                         turn by move_ai (default: from the species store)
+    id                   optional, copied to the output
+
+Engines:
+    deterministic   one deterministic battle, ties decided by a coin
+    exact           deterministic model without the coin: p_a is 1, 0 or 0.5
+    sim             one full poke_battle_sim battle
+    montecarlo      --samples poke_battle_sim battles, p_a is A's win rate
+
+Example:
+    python main/cli.py matchups.csv --engine exact --workers 4 > results.jsonl
+"""
+
+import argparse
+import collections
+import csv
+import io
+import itertools
+import json
+import multiprocessing
+import sys
+
+import battle_simulator
+import kernels
+import scoring
+import species_db
+
+ENGINES = ("deterministic", "exact", "sim", "montecarlo")
+OUTPUT_FIELDS = (
+    "row",
+    "id",
+    "engine",
+    "winner",
+    "winner_name",
+    "p_a",
+    "winner_hp",
+    "error",
+)
+DEFAULT_LEVEL = 10
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_SAMPLES = 100
+
+
+def load_species(path=None):
+    """
+    Display name -> stage info (with its stage number) from the species store
+    (see species_db.load_stages).
+    """
+    stages = species_db.load_stages(path)
+    species = {}
+    for line in stages.values():
+        for stage, info in line.items():
+            species[info["name"].lower()] = dict(info, stage=int(stage))
+    return species
+
+
+# --- Input ---
+
+
+def read_records(stream, input_format):
+    """
+    Returns (fieldnames, records) for a JSONL or CSV text stream. Records are
+    raw JSON lines or CSV value lists, read lazily; the workers parse them.
+    """
+    if input_format == "csv":
+        reader = csv.reader(stream)
+        return next(reader, []), reader
+    return None, (line for line in stream if line.strip())
+
+
+def parse_record(record, fieldnames=None):
+    if fieldnames is None:
+        return json.loads(record)
+    return dict(zip(fieldnames, record))
+
+
+def chunked(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# --- Evaluation ---
+
+
+class Side:
+    """
+    One Pokémon of a matchup, filled in from the row and the species data.
+    """
+
+    def __init__(self, row, prefix, species, profile):
+        self.name = str(row[prefix]).strip()
+        info = species.get(self.name.lower(), {})
+        self.level = int(float(row.get(f"{prefix}_level") or DEFAULT_LEVEL))
+        types = row.get(f"{prefix}_type") or info.get("type")
+        if isinstance(types, str):
+            types = [t for t in types.split("/") if t]
+        self.type = types
+        moves = row.get(f"{prefix}_move") or info.get("moves") or info.get("move")
+        if isinstance(moves, str):
+            moves = [m.strip() for m in moves.split(",") if m.strip()]
+        self.moves = moves
+        self.gender = row.get(f"{prefix}_gender") or info.get("gender", "male")
+        stage = row.get(f"{prefix}_stage")
+        if stage:
+            self.stage, bonus = int(float(stage)), 0
+        else:
+            self.stage, bonus = scoring.stage_and_bonus(self.name, info.get("stage", 1))
+        hp = row.get(f"{prefix}_hp")
+        self.hp = float(hp) if hp not in (None, "") else None
+        self.full_hp = profile.max_hp(self.level, self.stage, bonus)
+
+    def require(self, *fields):
+        for field in fields:
+            if not getattr(self, field):
+                raise ValueError(f"{self.name}: unknown species, give its {field}")
+
+
+def _exact(a, b, profile):
+    params = profile.params()
+    a_hp = a.full_hp if a.hp is None else a.hp
+    b_hp = b.full_hp if b.hp is None else b.hp
+    a_score = kernels.score(
+        a.level,
+        a_hp,
+        battle_simulator.get_type_multiplier(a.type, b.type),
+        a.stage,
+        params,
+    )
+    b_score = kernels.score(
+        b.level,
+        b_hp,
+        battle_simulator.get_type_multiplier(b.type, a.type),
+        b.stage,
+        params,
+    )
+    if kernels.is_tie(a_score, b_score, params):
+        return {"winner": None, "winner_name": None, "p_a": 0.5, "winner_hp": 1}
+    winner, hp = kernels.resolve(a_score, b_score, a_hp, b_hp, False, params)
+    a_wins = winner == kernels.A_WINS
+    return {
+        "winner": "A" if a_wins else "B",
+        "winner_name": a.name if a_wins else b.name,
+        "p_a": 1.0 if a_wins else 0.0,
+        "winner_hp": hp,
+    }
+
+
+def _sim(a, b, profile):
+    a.require("moves")
+    b.require("moves")
+    return battle_simulator.simulate_battle(
+        a.name,
+        b.name,
+        a.moves,
+        b.moves,
+        a.gender,
+        b.gender,
+        a.level,
+        b.level,
+        a.hp,
+        b.hp,
+        hp_boost=profile.hp_boost,
+    )
+
+
+def evaluate(row, engine, species, profile, samples=DEFAULT_SAMPLES):
+    a = Side(row, "a", species, profile)
+    b = Side(row, "b", species, profile)
+    if engine in ("deterministic", "exact"):
+        a.require("type")
+        b.require("type")
+    if engine == "exact":
+        return _exact(a, b, profile)
+    if engine == "deterministic":
+        result = battle_simulator.deterministic_battle(
+            a.name,
+            b.name,
+            a.moves,
+            b.moves,
+            a.gender,
+            b.gender,
+            a.level,
+            b.level,
+            a.full_hp if a.hp is None else a.hp,
+            b.full_hp if b.hp is None else b.hp,
+            a.type,
+            b.type,
+            a.stage,
+            b.stage,
+            profile=profile,
+        )
+    elif engine == "sim":
+        result = _sim(a, b, profile)
+    else:
+        wins, hp_total = 0, 0
+        for _ in range(samples):
+            result = _sim(a, b, profile)
+            wins += result["winner"] == "A"
+            hp_total += result["winner_hp"]
+        p_a = wins / samples
+        return {
+            "winner": "A" if p_a >= 0.5 else "B",
+            "winner_name": a.name if p_a >= 0.5 else b.name,
+            "p_a": p_a,
+            "winner_hp": round(hp_total / samples, 2),
+        }
+    return {
+        "winner": result["winner"],
+        "winner_name": result["winner_name"],
+        "p_a": 1.0 if result["winner"] == "A" else 0.0,
+        "winner_hp": result["winner_hp"],
+    }
+
+
+_worker = {}
+
+
+def _init_worker(engine, profile, samples, fieldnames, output_format):
+    _worker.update(
+        engine=engine,
+        profile=profile,
+        samples=samples,
+        fieldnames=fieldnames,
+        output_format=output_format,
+        species=load_species(),
+    )
+
+
+def evaluate_records(records, first_row=1):
+    """
+    Evaluates raw records with the worker settings. Bad rows produce an
+    error result instead of stopping the run.
+    """
+    w = _worker
+    results = []
+    for row_no, record in enumerate(records, first_row):
+        result = {"row": row_no, "id": None, "engine": w["engine"]}
+        try:
+            row = parse_record(record, w["fieldnames"])
+            result["id"] = row.get("id")
+            result.update(
+                evaluate(row, w["engine"], w["species"], w["profile"], w["samples"])
+            )
+        except Exception as e:  # report and keep streaming
+            result["error"] = f"{type(e).__name__}: {e}"
+        results.append(result)
+    return results
+
+
+def format_results(results, output_format):
+    if output_format == "csv":
+        buf = io.StringIO()
+        csv.DictWriter(buf, OUTPUT_FIELDS, extrasaction="ignore").writerows(results)
+        return buf.getvalue()
+    return "".join(json.dumps(result) + "\n" for result in results)
+
+
+def evaluate_chunk(chunk):
+    # Parsing and formatting happen here so the parent only moves text
+    first_row, records = chunk
+    return format_results(
+        evaluate_records(records, first_row), _worker["output_format"]
+    )
+
+
+def stream_output(
+    records,
+    engine,
+    fieldnames=None,
+    profile=None,
+    workers=1,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    samples=DEFAULT_SAMPLES,
+    output_format="jsonl",
+):
+    """
+    Yields formatted output, one block per chunk, in input order. With
+    workers > 1 at most 2 * workers chunks are queued or being evaluated
+    at any time.
+    """
+    profile = profile or scoring.DEFAULT_PROFILE
+    settings = (engine, profile, samples, fieldnames, output_format)
+    chunks = (
+        (k * chunk_size + 1, chunk)
+        for k, chunk in enumerate(chunked(records, chunk_size))
+    )
+    if workers <= 1:
+        _init_worker(*settings)
+        for chunk in chunks:
+            yield evaluate_chunk(chunk)
+        return
+    with multiprocessing.Pool(
+        workers, initializer=_init_worker, initargs=settings
+    ) as pool:
+        # Pool.imap would read the whole input up front; keep a window instead
+        in_flight = collections.deque()
+        for chunk in chunks:
+            in_flight.append(pool.apply_async(evaluate_chunk, (chunk,)))
+            if len(in_flight) >= 2 * workers:
+                yield in_flight.popleft().get()
+        while in_flight:
+            yield in_flight.popleft().get()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("\n\n", 1)[1],
+    )
+    parser.add_argument(
+        "input", nargs="?", default="-", help="input file (default: stdin)"
+    )
+    parser.add_argument("--engine", choices=ENGINES, default="deterministic")
+    parser.add_argument(
+        "--input-format",
+        choices=("jsonl", "csv"),
+        help="default: from the file extension, else jsonl",
+    )
+    parser.add_argument("--output-format", choices=("jsonl", "csv"), default="jsonl")
+    parser.add_argument(
+        "-o", "--output", default="-", help="output file (default: stdout)"
+    )
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=DEFAULT_SAMPLES,
+        help="battles per row for --engine montecarlo",
+    )
+    parser.add_argument("--profile", help="ScoringProfile JSON file")
+    args = parser.parse_args(argv)
+
+    input_format = args.input_format or (
+        "csv" if args.input.lower().endswith(".csv") else "jsonl"
+    )
+    profile = scoring.ScoringProfile.load(args.profile) if args.profile else None
+    if args.input == "-":
+        source = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    else:
+        source = open(args.input, "r", encoding="utf-8", newline="")
+    out = (
+        sys.stdout
+        if args.output == "-"
+        else open(args.output, "w", encoding="utf-8", newline="")
+    )
+    try:
+        fieldnames, records = read_records(source, input_format)
+        if args.output_format == "csv":
+            csv.writer(out).writerow(OUTPUT_FIELDS)
+        for block in stream_output(
+            records,
+            args.engine,
+            fieldnames,
+            profile,
+            args.workers,
+            args.chunk_size,
+            args.samples,
+            args.output_format,
+        ):
+            out.write(block)
+    except BrokenPipeError:
+        pass  # e.g. piped into head
+    finally:
+        source.close()
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
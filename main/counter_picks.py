@@ -0,0 +1,118 @@
+"""
+Counter-pick index used for substitution hints.
+
+For every opponent Pokémon, keeps our candidates sorted by how they would
+fare against it under the deterministic model. The index is built once when
+a battle starts; afterwards only HP changes need to be reported:
+
+- When one of our Pokémon changes HP, only its entry in each opponent's
+  list moves (bisect remove/insert).
+- When an opponent Pokémon changes HP, every margin against it shifts by
+  the same amount, so its list keeps its order and nothing moves.
+"""
+
+import bisect
+
+import scoring
+from battle_simulator import get_type_multiplier
+
+WIN = "win"
+TIE = "tie"
+LOSS = "loss"
+
+
+class CounterPickIndex:
+    def __init__(self, our_pokemon, their_pokemon, profile=None, chart=None):
+        """
+        our_pokemon / their_pokemon: lists of PokemonWrapper-like objects
+        (name, level, type, stage, cur_hp). Indices refer to these lists.
+        chart: type_charts name (None: type_effectiveness.csv).
+        """
+        self.profile = profile or scoring.DEFAULT_PROFILE
+        self.ours = list(our_pokemon)
+        self.theirs = list(their_pokemon)
+        p = self.profile
+        # Everything but the HP terms is fixed for the whole battle
+        self._own_static = [
+            [
+                pw.level * p.level_weight
+                + get_type_multiplier(pw.type, opp.type, chart) * p.type_weight
+                + pw.stage * p.stage_weight
+                for opp in self.theirs
+            ]
+            for pw in self.ours
+        ]
+        self._opp_static = [
+            [
+                opp.level * p.level_weight
+                + get_type_multiplier(opp.type, pw.type, chart) * p.type_weight
+                + opp.stage * p.stage_weight
+                for pw in self.ours
+            ]
+            for opp in self.theirs
+        ]
+        self._our_hp = [pw.cur_hp for pw in self.ours]
+        self._their_hp = [opp.cur_hp for opp in self.theirs]
+        # _ranked[j]: sorted (-(margin without their HP term), our idx)
+        self._ranked = []
+        for j in range(len(self.theirs)):
+            keys = [self._key(i, j) for i in range(len(self.ours)) if self._alive(i)]
+            self._ranked.append(sorted(keys))
+
+    def _alive(self, i):
+        return self.ours[i].level > 0 and self._our_hp[i] > 0
+
+    def _key(self, i, j):
+        own = self._own_static[i][j] + self._our_hp[i] * self.profile.hp_weight
+        return (-(own - self._opp_static[j][i]), i)
+
+    def update_our_hp(self, i, hp):
+        if hp == self._our_hp[i]:
+            return
+        was_alive = self._alive(i)
+        old = [self._key(i, j) for j in range(len(self.theirs))]
+        self._our_hp[i] = hp
+        for j, ranked in enumerate(self._ranked):
+            if was_alive:
+                del ranked[bisect.bisect_left(ranked, old[j])]
+            if self._alive(i):
+                bisect.insort(ranked, self._key(i, j))
+
+    def update_their_hp(self, j, hp):
+        # Shifts every margin against j equally; order is unchanged
+        self._their_hp[j] = hp
+
+    def sync(self):
+        """
+        Picks up HP changes made directly on the wrappers.
+        """
+        for i, pw in enumerate(self.ours):
+            self.update_our_hp(i, pw.cur_hp)
+        for j, opp in enumerate(self.theirs):
+            self.update_their_hp(j, opp.cur_hp)
+
+    def outcome(self, i, j):
+        """
+        (result, margin, hp_left) for our i against their j at current HP.
+        """
+        p = self.profile
+        margin = -self._key(i, j)[0] - self._their_hp[j] * p.hp_weight
+        if abs(margin) <= p.tie_margin:
+            return TIE, margin, 1
+        if margin > 0:
+            return WIN, margin, int(min(self._our_hp[i], margin * p.margin_hp_factor))
+        return LOSS, margin, 0
+
+    def recommend(self, j, exclude=(), limit=None):
+        """
+        Our alive candidates against their j, best first:
+        a list of (our idx, result, margin, hp_left).
+        """
+        picks = []
+        for _, i in self._ranked[j]:
+            if i in exclude:
+                continue
+            picks.append((i,) + self.outcome(i, j))
+            if limit is not None and len(picks) >= limit:
+                break
+        return picks
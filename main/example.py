@@ -1,11 +1,31 @@
+import contextlib
+import random
+
 import poke_battle_sim as pb
 
+import move_ai
+import results_store
+
 # Fair simulation: only species and level provided, average IVs, no EVs, neutral nature
 NUM_SIMULATIONS = 100
 pikachu_wins = 0
 starmie_wins = 0
 
 
+@contextlib.contextmanager
+def seeded(seed):
+    """
+    Seeds the global random module, which poke_battle_sim draws from, for one
+    block and then restores the caller's random state.
+    """
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        yield
+    finally:
+        random.setstate(state)
+
+
 def simulate_battle(
     poke_a_id="Pikachu",
     poke_b_id="Starmie",
@@ -16,7 +36,10 @@ def simulate_battle(
     poke_a_level=10,
     poke_b_level=10,
     verbose=False,
+    move_budget=move_ai.TIME_BUDGET,
 ):
+    # Each side picks its move every turn with move_ai; move_budget is the
+    # search time per move in seconds, None for a fixed, reproducible depth
     if poke_a_moves is None:
         poke_a_moves = ["thunderbolt"]
     if poke_b_moves is None:
@@ -56,8 +79,8 @@ def simulate_battle(
         )
     turn_num = 1
     while not battle.is_finished():
-        t1_action = ["move", poke_a_moves[0]]
-        t2_action = ["move", poke_b_moves[0]]
+        t1_action = ["move", move_ai.pick(poke_a, poke_b, move_budget)]
+        t2_action = ["move", move_ai.pick(poke_b, poke_a, move_budget)]
         battle.turn(t1_action, t2_action)
         if verbose:
             print(
@@ -77,6 +100,19 @@ def simulate_battle(
         return (poke_b_id, poke_b.cur_hp)
 
 
+def species_types(poke_id, level, moves):
+    poke = pb.Pokemon(
+        poke_id,
+        level,
+        moves,
+        "genderless",
+        ivs=[15, 15, 15, 15, 15, 15],
+        evs=[0, 0, 0, 0, 0, 0],
+        nature="hardy",
+    )
+    return poke.types
+
+
 def run_many_battles(
     num_simulations=100,
     poke_a_id="Pikachu",
@@ -87,46 +123,107 @@ def run_many_battles(
     poke_b_gender="genderless",
     poke_a_level=10,
     poke_b_level=10,
+    store=None,
+    seed=None,
 ):
+    """
+    Runs num_simulations battles and prints the most frequent winner. With a
+    results store, battles already stored for this exact setup are reused and
+    only the missing ones are simulated and written. Each simulation is seeded
+    (seed + i when a seed is given) and moves are picked at a fixed search
+    depth, so stored battles are reproducible.
+    """
     if poke_a_moves is None:
         poke_a_moves = ["thunderbolt"]
     if poke_b_moves is None:
         poke_b_moves = ["water-gun"]
     a_win_hp = []
     b_win_hp = []
-    for _ in range(num_simulations):
-        result = simulate_battle(
-            poke_a_id=poke_a_id,
-            poke_b_id=poke_b_id,
-            poke_a_moves=poke_a_moves,
-            poke_b_moves=poke_b_moves,
-            poke_a_gender=poke_a_gender,
-            poke_b_gender=poke_b_gender,
-            poke_a_level=poke_a_level,
-            poke_b_level=poke_b_level,
-            verbose=False,
+    cached = []
+    if store is not None:
+        settings = dict(
+            moves=[poke_a_moves, poke_b_moves],
+            genders=[poke_a_gender, poke_b_gender],
+            hp_boost=10,
         )
-        if result[0] == poke_a_id:
+        if len(poke_a_moves) > 1 or len(poke_b_moves) > 1:
+            settings["move_depth"] = move_ai.FIXED_DEPTH
+        setup = dict(
+            species_a=poke_a_id,
+            level_a=poke_a_level,
+            species_b=poke_b_id,
+            level_b=poke_b_level,
+            engine="sim",
+            config=results_store.config_hash(**settings),
+        )
+        cached = store.outcomes(**setup)[:num_simulations]
+        for a_won, hp, _ in cached:
+            (a_win_hp if a_won else b_win_hp).append(hp)
+        if len(cached) < num_simulations:
+            types_a = species_types(poke_a_id, poke_a_level, poke_a_moves)
+            types_b = species_types(poke_b_id, poke_b_level, poke_b_moves)
+    for i in range(len(cached), num_simulations):
+        sim_seed = seed + i if seed is not None else random.randrange(2**31)
+        with seeded(sim_seed):
+            result = simulate_battle(
+                poke_a_id=poke_a_id,
+                poke_b_id=poke_b_id,
+                poke_a_moves=poke_a_moves,
+                poke_b_moves=poke_b_moves,
+                poke_a_gender=poke_a_gender,
+                poke_b_gender=poke_b_gender,
+                poke_a_level=poke_a_level,
+                poke_b_level=poke_b_level,
+                verbose=False,
+                move_budget=None,
+            )
+        a_won = result[0] == poke_a_id
+        if a_won:
             a_win_hp.append(result[1])
         else:
             b_win_hp.append(result[1])
+        if store is not None:
+            store.add(
+                results_store.record(
+                    poke_a_id,
+                    poke_a_level,
+                    poke_b_id,
+                    poke_b_level,
+                    setup["engine"],
+                    setup["config"],
+                    sim_seed,
+                    a_won,
+                    result[1],
+                    types_a,
+                    types_b,
+                )
+            )
+    if store is not None:
+        store.flush()
     if len(a_win_hp) >= len(b_win_hp):
         avg = round(sum(a_win_hp) / len(a_win_hp)) if a_win_hp else 0
         print(f"{poke_a_id} is the most frequent winner. Avg HP left: {avg}")
     else:
         avg = round(sum(b_win_hp) / len(b_win_hp)) if b_win_hp else 0
         print(f"{poke_b_id} is the most frequent winner. Avg HP left: {avg}")
+    return {
+        "a_wins": len(a_win_hp),
+        "b_wins": len(b_win_hp),
+        "cached": len(cached),
+        "simulated": num_simulations - len(cached),
+    }
 
 
-# Run many simulations and print average result
-run_many_battles(
-    num_simulations=1000,
-    poke_a_id="Charmander",
-    poke_b_id="Charizard",
-    poke_a_moves=["flamethrower"],
-    poke_b_moves=["flamethrower"],
-    poke_a_gender="genderless",
-    poke_b_gender="genderless",
-    poke_a_level=30,
-    poke_b_level=15,
-)
+if __name__ == "__main__":
+    # Run many simulations and print average result
+    run_many_battles(
+        num_simulations=1000,
+        poke_a_id="Charmander",
+        poke_b_id="Charizard",
+        poke_a_moves=["flamethrower"],
+        poke_b_moves=["flamethrower"],
+        poke_a_gender="genderless",
+        poke_b_gender="genderless",
+        poke_a_level=30,
+        poke_b_level=15,
+    )
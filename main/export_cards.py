@@ -0,0 +1,506 @@
+"""
+Headless export of tournament posters and result cards.
+
+Renders a poster (standings, plus the bracket of knockout formats), one card
+per team and one summary card per battle with QPainter on offscreen QImages
+and writes them as PNG files. Everything a card shows is gathered up front
+as plain data; Pokémon icons come from the GUI's icon cache and are
+converted to QImages in the main thread, since QPixmaps may only be used
+there. Painting and saving then run on a thread pool: QImage painting is
+thread-safe, so hundreds of cards come out in seconds.
+
+Results come from a tournament journal (with the HP left after every
+battle), or from a tournament played on the spot with MatchEngine.
+
+Runs offscreen unless QT_QPA_PLATFORM is set.
+
+Example:
+    python main/export_cards.py --journal tournament.jsonl --out cards
+    python main/export_cards.py single_elim --random-teams 128 --out cards
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QRect, QRectF, Qt
+from PyQt5.QtGui import QColor, QFont, QFontDatabase, QImage, QPainter, QPen
+from PyQt5.QtWidgets import QApplication
+
+import journal as event_journal
+import pokemon_gui
+import species_db
+import tournament_formats
+
+ICON_SIZE = 64
+CARD_WIDTH = 720
+TEAM_CARD_HEIGHT = 420
+BATTLE_ROW_HEIGHT = ICON_SIZE + 8
+HEADER_HEIGHT = 72
+ROW_HEIGHT = 28
+MATCH_BOX = (220, 52)  # bracket match size
+BRACKET_GAP = 36
+MARGIN = 24
+BACKGROUND = "#fafafa"
+INK = "#212121"
+MUTED = "#757575"
+WIN_COLOR = "#2e7d32"
+# Knockout formats get a bracket on the poster
+BRACKET_FORMATS = ("single_elim", "double_elim")
+
+
+# --- Card data ---
+
+
+def team_color(team, k):
+    # Random teams have no color: spread hues around the wheel
+    if team.get("color"):
+        return team["color"]
+    return QColor.fromHsv(k * 137 % 360, 170, 190).name()
+
+
+def card_teams(teams_config, pokemon_stages):
+    """
+    Per trainer: name, color and the Pokémon with level > 0 (battle indices).
+    """
+    teams = []
+    for k, team in enumerate(teams_config):
+        pokemon = []
+        for poke in team["pokemon"]:
+            if poke.get("level", 0) <= 0:
+                continue
+            info = pokemon_stages[poke["name"]][str(poke["stage"])]
+            pokemon.append(
+                {
+                    "name": info["name"],
+                    "level": poke["level"],
+                    "type": info.get("type", ["Normal"]),
+                    "img": pokemon_gui.species_image(info),
+                }
+            )
+        teams.append(
+            {
+                "trainer": team["trainer"],
+                "color": team_color(team, k),
+                "pokemon": pokemon,
+            }
+        )
+    return teams
+
+
+def journal_battles(path, history):
+    """
+    Every battle of a journal with the HP each Pokémon started and ended
+    with; rounds come from the tournament history (drawn knockout games
+    that were replayed take the round of their replay).
+    """
+    battles, current, played = [], None, 0
+    for event in event_journal.read_events(path):
+        kind = event["type"]
+        if kind == "tournament":
+            battles, current, played = [], None, 0
+        elif kind == "battle_start":
+            current = {
+                "max_hp": [list(hp) for hp in event["hp"]],
+                "hp": [list(hp) for hp in event["hp"]],
+            }
+        elif kind == "exchange" and current is not None:
+            for side, hp in enumerate(event["hp"]):
+                current["hp"][side][event["active"][side]] = hp
+        elif kind in ("undo", "redo") and current is not None:
+            current["hp"] = [list(hp) for hp in event["hp"]]
+        elif kind == "battle_end":
+            a, b, winner = event["a"], event["b"], event["winner"]
+            entry = history[min(played, len(history) - 1)] if history else None
+            if entry is not None and entry[1:] == (a, b, winner):
+                played += 1
+            battles.append(
+                dict(
+                    current or {},
+                    round=entry[0] if entry else 0,
+                    a=a,
+                    b=b,
+                    winner=winner,
+                )
+            )
+            current = None
+    return battles
+
+
+def history_battles(tournament):
+    """
+    Battles of a tournament played without a journal: results only.
+    """
+    return [
+        {"round": rnd, "a": a, "b": b, "winner": winner}
+        for rnd, a, b, winner in tournament.history
+    ]
+
+
+def load_icons(teams, size=ICON_SIZE):
+    """
+    img path -> QImage, from the GUI's icon cache. Main thread only.
+    """
+    icons = {}
+    for team in teams:
+        for poke in team["pokemon"]:
+            if poke["img"] not in icons:
+                pixmap = pokemon_gui.get_square_icon(poke["img"], size=size)
+                icons[poke["img"]] = pixmap.toImage()
+    return icons
+
+
+# --- Painting ---
+
+
+def _image(width, height):
+    image = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+    image.fill(QColor(BACKGROUND))
+    return image
+
+
+def _font(painter, px, bold=False):
+    font = QFont()
+    font.setPixelSize(px)
+    font.setBold(bold)
+    painter.setFont(font)
+
+
+def _text_on(color):
+    # Dark text on light team colors, white otherwise
+    c = QColor(color)
+    luma = 0.299 * c.red() + 0.587 * c.green() + 0.114 * c.blue()
+    return QColor(INK) if luma > 160 else QColor("#fff")
+
+
+def _header(painter, width, color, title, subtitle=""):
+    painter.fillRect(0, 0, width, HEADER_HEIGHT, QColor(color))
+    painter.setPen(_text_on(color))
+    _font(painter, 28, bold=True)
+    painter.drawText(
+        QRect(MARGIN, 0, width - 2 * MARGIN, HEADER_HEIGHT),
+        Qt.AlignLeft | Qt.AlignVCenter,
+        title,
+    )
+    if subtitle:
+        _font(painter, 18)
+        painter.drawText(
+            QRect(MARGIN, 0, width - 2 * MARGIN, HEADER_HEIGHT),
+            Qt.AlignRight | Qt.AlignVCenter,
+            subtitle,
+        )
+
+
+def _hp_bar(painter, rect, hp, max_hp):
+    ratio = max(0.0, min(1.0, hp / max_hp)) if max_hp else 0.0
+    bands = pokemon_gui.HP_BANDS
+    color = next((c for threshold, c in bands if ratio > threshold), bands[-1][1])
+    painter.setPen(Qt.NoPen)
+    painter.setBrush(QColor("#e0e0e0"))
+    painter.drawRoundedRect(QRectF(rect), 3, 3)
+    if ratio > 0:
+        fill = QRectF(rect.x(), rect.y(), rect.width() * ratio, rect.height())
+        painter.setBrush(QColor(color))
+        painter.drawRoundedRect(fill, 3, 3)
+
+
+def _pokemon(painter, x, y, width, poke, icons, hp=None, max_hp=None):
+    # One roster row: icon, name and level, types, and the HP left
+    painter.setOpacity(0.35 if hp == 0 else 1.0)
+    painter.drawImage(x, y, icons[poke["img"]])
+    text_x = x + ICON_SIZE + 10
+    painter.setPen(QColor(INK))
+    _font(painter, 17, bold=True)
+    painter.drawText(text_x, y + 22, f"{poke['name']}  Lv. {poke['level']}")
+    painter.setPen(QColor(MUTED))
+    _font(painter, 14)
+    painter.drawText(text_x, y + 42, " / ".join(poke["type"]))
+    if hp is not None:
+        bar = QRect(text_x, y + 50, width - ICON_SIZE - 10, 10)
+        _hp_bar(painter, bar, hp, max_hp)
+    painter.setOpacity(1.0)
+
+
+def draw_team_card(team, row, rank, icons):
+    """
+    Trainer, final rank and record, and the roster.
+    """
+    trainer, points, wins, draws, losses = row
+    image = _image(CARD_WIDTH, TEAM_CARD_HEIGHT)
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setRenderHint(QPainter.TextAntialiasing)
+    _header(painter, CARD_WIDTH, team["color"], trainer, f"#{rank}")
+    painter.setPen(QColor(INK))
+    _font(painter, 18)
+    painter.drawText(
+        MARGIN,
+        HEADER_HEIGHT + 32,
+        f"{points:g} points   {wins} W   {draws} D   {losses} L",
+    )
+    column = (CARD_WIDTH - 2 * MARGIN) // 2
+    for k, poke in enumerate(team["pokemon"]):
+        x = MARGIN + (k % 2) * column
+        y = HEADER_HEIGHT + 52 + (k // 2) * (ICON_SIZE + 12)
+        _pokemon(painter, x, y, column - 16, poke, icons)
+    painter.end()
+    return image
+
+
+def draw_battle_card(battle, teams, icons):
+    """
+    Both rosters side by side with the HP they ended with, winner marked.
+    """
+    a, b, winner = battle["a"], battle["b"], battle["winner"]
+    # Tall enough for every Pokémon of the longer roster
+    rows = max(len(teams[t]["pokemon"]) for t in (a, b))
+    image = _image(CARD_WIDTH, HEADER_HEIGHT + 80 + rows * BATTLE_ROW_HEIGHT)
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setRenderHint(QPainter.TextAntialiasing)
+    result = "Draw" if winner is None else f"{teams[winner]['trainer']} wins"
+    half = CARD_WIDTH // 2
+    for side, t in enumerate((a, b)):
+        painter.fillRect(side * half, 0, half, HEADER_HEIGHT, QColor(teams[t]["color"]))
+    _font(painter, 22, bold=True)
+    for side, t in enumerate((a, b)):
+        painter.setPen(_text_on(teams[t]["color"]))
+        align = Qt.AlignLeft if side == 0 else Qt.AlignRight
+        painter.drawText(
+            QRect(side * half + MARGIN, 0, half - 2 * MARGIN, HEADER_HEIGHT),
+            align | Qt.AlignVCenter,
+            teams[t]["trainer"],
+        )
+    painter.setPen(QColor(WIN_COLOR if winner is not None else MUTED))
+    _font(painter, 18, bold=True)
+    painter.drawText(
+        QRect(0, HEADER_HEIGHT, CARD_WIDTH, 40),
+        Qt.AlignCenter,
+        f"Round {battle['round']}: {result}",
+    )
+    for side, t in enumerate((a, b)):
+        x = side * half + MARGIN
+        for k, poke in enumerate(teams[t]["pokemon"]):
+            hp = battle["hp"][side][k] if "hp" in battle else None
+            max_hp = battle["max_hp"][side][k] if "hp" in battle else None
+            y = HEADER_HEIGHT + 48 + k * BATTLE_ROW_HEIGHT
+            _pokemon(painter, x, y, half - 2 * MARGIN, poke, icons, hp, max_hp)
+    painter.end()
+    return image
+
+
+def _bracket_rounds(battles):
+    rounds = {}
+    for battle in battles:
+        rounds.setdefault(battle["round"], []).append(battle)
+    return [rounds[r] for r in sorted(rounds)]
+
+
+def draw_poster(title, rows, teams, battles, bracket):
+    """
+    Standings table, and the knockout bracket round by round.
+    """
+    index = {team["trainer"]: k for k, team in enumerate(teams)}
+    table_width = 460
+    rounds = _bracket_rounds(battles) if bracket else []
+    box_w, box_h = MATCH_BOX
+    tallest = max((len(r) for r in rounds), default=0)
+    width = MARGIN * 2 + table_width
+    if rounds:
+        width += len(rounds) * (box_w + BRACKET_GAP)
+    height = (
+        HEADER_HEIGHT
+        + MARGIN * 2
+        + max((len(rows) + 1) * ROW_HEIGHT, tallest * (box_h + 12) + ROW_HEIGHT)
+    )
+    image = _image(width, height)
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setRenderHint(QPainter.TextAntialiasing)
+    champion = teams[index[rows[0][0]]]["color"] if rows else INK
+    _header(painter, width, champion, title, f"Champion: {rows[0][0]}" if rows else "")
+
+    # Standings
+    top = HEADER_HEIGHT + MARGIN
+    painter.setPen(QColor(MUTED))
+    _font(painter, 14, bold=True)
+    painter.drawText(MARGIN, top + 18, "#   Trainer")
+    painter.drawText(MARGIN + 300, top + 18, "Pts    W   D   L")
+    for k, (trainer, points, wins, draws, losses) in enumerate(rows, 1):
+        y = top + k * ROW_HEIGHT
+        if k % 2:
+            painter.fillRect(MARGIN, y, table_width, ROW_HEIGHT, QColor("#eeeeee"))
+        painter.fillRect(
+            MARGIN, y + 4, 6, ROW_HEIGHT - 8, QColor(teams[index[trainer]]["color"])
+        )
+        painter.setPen(QColor(INK))
+        _font(painter, 15, bold=k == 1)
+        painter.drawText(MARGIN + 12, y + 19, f"{k:<3} {trainer}")
+        painter.drawText(
+            MARGIN + 300, y + 19, f"{points:<6g} {wins:<3} {draws:<3} {losses}"
+        )
+
+    # Bracket: one column per round, winners in bold
+    for r, matches in enumerate(rounds):
+        x = MARGIN + table_width + BRACKET_GAP + r * (box_w + BRACKET_GAP)
+        painter.setPen(QColor(MUTED))
+        _font(painter, 14, bold=True)
+        painter.drawText(x, top + 18, f"Round {matches[0]['round']}")
+        slot = (height - top - ROW_HEIGHT - MARGIN) / max(1, len(matches))
+        for m, battle in enumerate(matches):
+            y = int(top + ROW_HEIGHT + m * slot + (slot - box_h) / 2)
+            painter.setPen(QPen(QColor("#bdbdbd"), 1))
+            painter.setBrush(QColor("#fff"))
+            painter.drawRoundedRect(QRectF(x, y, box_w, box_h), 6, 6)
+            for side, t in enumerate((battle["a"], battle["b"])):
+                won = battle["winner"] == t
+                painter.fillRect(
+                    x + 1,
+                    y + 1 + side * box_h // 2,
+                    5,
+                    box_h // 2 - 2,
+                    QColor(teams[t]["color"]),
+                )
+                painter.setPen(QColor(INK if won else MUTED))
+                _font(painter, 14, bold=won)
+                painter.drawText(
+                    QRect(x + 12, y + side * box_h // 2, box_w - 16, box_h // 2),
+                    Qt.AlignLeft | Qt.AlignVCenter,
+                    teams[t]["trainer"],
+                )
+    painter.end()
+    return image
+
+
+# --- Export ---
+
+
+def _render(job):
+    path, draw, args = job
+    if not draw(*args).save(path):
+        raise OSError(f"Could not write {path}")
+    return path
+
+
+def export(
+    out_dir, tournament, teams, battles, title=None, workers=None, battle_cards=True
+):
+    """
+    Writes poster.png, team_<k>.png and battle_<n>.png to out_dir from a
+    finished tournament. Returns the written paths.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    icons = load_icons(teams)
+    rows = tournament.standings.rows(tournament.players)
+    ranks = {row[0]: k for k, row in enumerate(rows, 1)}
+    title = title or f"{tournament.name.replace('_', ' ').title()} tournament"
+    jobs = [
+        (
+            os.path.join(out_dir, "poster.png"),
+            draw_poster,
+            (title, rows, teams, battles, tournament.name in BRACKET_FORMATS),
+        )
+    ]
+    for k, team in enumerate(teams):
+        row = next(r for r in rows if r[0] == team["trainer"])
+        jobs.append(
+            (
+                os.path.join(out_dir, f"team_{k + 1:03d}.png"),
+                draw_team_card,
+                (team, row, ranks[team["trainer"]], icons),
+            )
+        )
+    if battle_cards:
+        for n, battle in enumerate(battles, 1):
+            jobs.append(
+                (
+                    os.path.join(out_dir, f"battle_{n:04d}.png"),
+                    draw_battle_card,
+                    (battle, teams, icons),
+                )
+            )
+    if not QFontDatabase.supportsThreadedFontRendering():
+        workers = 1  # text can only be drawn in the main thread here
+    if workers == 1:
+        return [_render(job) for job in jobs]
+    with ThreadPoolExecutor(workers) as pool:
+        return list(pool.map(_render, jobs))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "format",
+        nargs="?",
+        choices=list(tournament_formats.FORMATS),
+        help="play a tournament of this format instead of reading a journal",
+    )
+    parser.add_argument("--journal", help="finished tournament journal")
+    parser.add_argument(
+        "--config", help="teams config JSON (default: teams_config.json)"
+    )
+    parser.add_argument("--random-teams", type=int, help="play this many random teams")
+    parser.add_argument("--species", help="species store or stages JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="cards", help="output directory")
+    parser.add_argument(
+        "--workers", type=int, help="render threads (default: all cores)"
+    )
+    parser.add_argument("--no-battles", action="store_true", help="skip battle cards")
+    parser.add_argument("--title", help="poster title")
+    args = parser.parse_args(argv)
+    if bool(args.journal) == bool(args.format):
+        parser.error("Give either a format to play or --journal")
+
+    app = QApplication.instance() or QApplication(sys.argv)  # noqa: F841, kept alive
+    pokemon_stages = species_db.load_stages(args.species)
+    if args.journal:
+        state = event_journal.load(args.journal)
+        if state.teams_config is None:
+            parser.error(f"{args.journal} has no tournament")
+        config = state.teams_config
+        tournament = state.build_tournament()
+        battles = journal_battles(args.journal, tournament.history)
+    else:
+        import batch_engine
+
+        if args.random_teams:
+            config = tournament_formats.random_teams_config(
+                args.random_teams, pokemon_stages, seed=args.seed
+            )
+        else:
+            config = batch_engine.load_json(args.config or batch_engine.CONFIG_PATH)
+        trainers = [team["trainer"] for team in config]
+        tournament = tournament_formats.make_tournament(args.format, trainers)
+        engine = tournament_formats.MatchEngine(config, pokemon_stages, seed=args.seed)
+        tournament_formats.run(tournament, engine)
+        battles = history_battles(tournament)
+    if not tournament.finished:
+        print(
+            "Tournament not finished: exporting the standings so far", file=sys.stderr
+        )
+
+    teams = card_teams(config, pokemon_stages)
+    start = time.perf_counter()
+    paths = export(
+        args.out,
+        tournament,
+        teams,
+        battles,
+        args.title,
+        args.workers,
+        not args.no_battles,
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"{len(paths)} images in {elapsed:.2f}s written to {os.path.abspath(args.out)}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Memory benchmark for the tournament GUI.
+
+Plays hundreds of battles through one TournamentWindow with auto-play, so
+the battle view, HP bars, roster tiles and refreshes are all exercised, and
+samples the resident set size after every battle. The battle view is reused
+and torn down between battles, so RSS should stay flat once the icon cache
+and the first battles have warmed up.
+
+Runs offscreen unless QT_QPA_PLATFORM is set.
+
+Example:
+    python main/gui_benchmark.py --battles 300
+"""
+
+import argparse
+import os
+import resource
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+
+import pokemon_gui
+import tournament_formats
+
+WARMUP = 0.1  # share of the battles before the baseline sample
+
+
+def rss_bytes():
+    """
+    Current resident set size; the peak where /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run(battles, interval_ms=1, tournament_format="round_robin", policy="counter"):
+    """
+    Plays `battles` battles; returns [(battles played, RSS bytes)].
+    """
+    app = QApplication.instance() or QApplication(sys.argv)
+    teams_config = list(pokemon_gui.TEAMS_CONFIG)
+    window = pokemon_gui.TournamentWindow(
+        teams_config, pokemon_gui.POKEMON_STAGES, tournament_format
+    )
+    samples = []
+    finished = [0]  # battles of the tournaments played to the end
+
+    def played():
+        return finished[0] + len(window.tournament.history)
+
+    def poll():
+        count = played()
+        if not samples or count != samples[-1][0]:
+            samples.append((count, rss_bytes()))
+        if count >= battles:
+            app.quit()
+        elif window.auto_interval is None:
+            # Tournament over: start another one in the same window
+            finished[0] = count
+            window.tournament = tournament_formats.make_tournament(
+                tournament_format, window.trainers
+            )
+            window.auto_play(interval_ms, policy)
+
+    timer = QTimer()
+    timer.timeout.connect(poll)
+    timer.start(5)
+    window.auto_play(interval_ms, policy)
+    app.exec_()
+    timer.stop()
+    window.close_battle()
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--battles", type=int, default=300)
+    parser.add_argument("--interval", type=int, default=1, help="ms between exchanges")
+    parser.add_argument("--format", default="round_robin")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    samples = run(args.battles, args.interval, args.format)
+    elapsed = time.perf_counter() - start
+    step = max(1, len(samples) // 10)
+    rows = samples[::step]
+    if rows[-1] is not samples[-1]:
+        rows.append(samples[-1])
+    for count, rss in rows:
+        print(f"{count:>6} battles  {rss / 2**20:8.1f} MiB")
+    base = next(rss for count, rss in samples if count >= args.battles * WARMUP)
+    growth = samples[-1][1] - base
+    per_battle = growth / max(1, samples[-1][0] - args.battles * WARMUP)
+    print(
+        f"{samples[-1][0]} battles in {elapsed:.1f}s, RSS after warm-up "
+        f"{growth / 2**20:+.1f} MiB ({per_battle / 1024:+.1f} KiB per battle)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+"""
+Incremental recomputation of the roster analyses.
+
+Every input is fingerprinted at a fine grain: each roster entry of
+teams_config.json, each species stage of the species store (species_db),
+each attacking row of type_effectiveness.csv and the scoring profile. Every
+derived result (single matchups, team-vs-team odds, tournament odds) is
+stored together with the fingerprints of the inputs it read, so after an
+edit only the results whose inputs changed are recomputed. Derived results
+are fingerprinted too: if re-evaluating a team pair gives the same odds,
+the tournament odds are not touched.
+
+Result keys:
+    matchup:<trainer>:<slot>|<trainer>:<slot>   P(first entry beats second)
+    pair:<trainer>|<trainer>                    P(first team beats second)
+    tournament                                  {trainer: P(wins round robin)}
+
+Example:
+    python main/incremental.py --watch --cache .analyses.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import batch_engine
+import battle_simulator
+import kernels
+import scoring
+import species_db
+import type_charts
+
+INPUT_PATHS = (
+    batch_engine.CONFIG_PATH,
+    batch_engine.STAGES_PATH,
+    species_db.DB_PATH,
+    battle_simulator.TYPE_CHART_PATH,
+)
+POLL_INTERVAL = 1.0
+
+
+def fingerprint(value):
+    text = json.dumps(value, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def load_inputs():
+    return {
+        "teams_config": batch_engine.load_json(batch_engine.CONFIG_PATH),
+        # Rebuilds species.db first when pokemon_stages.json changed
+        "pokemon_stages": species_db.load_stages(),
+        "type_chart": battle_simulator.load_type_chart(),
+    }
+
+
+def input_fingerprints(inputs, profile):
+    fps = {"profile": fingerprint(profile.to_dict())}
+    for team in inputs["teams_config"]:
+        for slot, poke in enumerate(team["pokemon"]):
+            fps[f"entry:{team['trainer']}:{slot}"] = fingerprint(poke)
+    for line, stages in inputs["pokemon_stages"].items():
+        for stage, info in stages.items():
+            fps[f"species:{line}:{stage}"] = fingerprint(info)
+    for atk, row in inputs["type_chart"].items():
+        fps[f"type:{atk}"] = fingerprint(row)
+    return fps
+
+
+class Entry:
+    """
+    One fielded roster entry and the input keys it depends on.
+    """
+
+    def __init__(self, team, slot, poke, pokemon_stages, profile):
+        self.trainer = team["trainer"]
+        self.key = f"{self.trainer}:{slot}"
+        info = pokemon_stages[poke["name"]][str(poke["stage"])]
+        self.name = info["name"]
+        self.level = poke["level"]
+        self.types = info.get("type", ["Normal"])
+        self.stage, bonus = scoring.stage_and_bonus(self.name, poke["stage"])
+        self.hp = profile.max_hp(self.level, self.stage, bonus)
+        self.deps = [
+            f"entry:{self.key}",
+            f"species:{poke['name']}:{poke['stage']}",
+            "profile",
+        ] + [f"type:{t.lower()}" for t in self.types]
+
+
+def matchup_odds(a, b, params):
+    a_score = kernels.score(
+        a.level,
+        a.hp,
+        battle_simulator.get_type_multiplier(a.types, b.types),
+        a.stage,
+        params,
+    )
+    b_score = kernels.score(
+        b.level,
+        b.hp,
+        battle_simulator.get_type_multiplier(b.types, a.types),
+        b.stage,
+        params,
+    )
+    if kernels.is_tie(a_score, b_score, params):
+        return 0.5
+    return 1.0 if a_score > b_score else 0.0
+
+
+class Analyses:
+    """
+    Cached analyses of one teams config under one scoring profile.
+    refresh() brings them up to date with new inputs.
+    """
+
+    def __init__(self, profile=None):
+        self.profile = profile or scoring.DEFAULT_PROFILE
+        self.values = {}
+        self.stamps = {}  # result key -> {dependency key: fingerprint}
+        self.trainers = []
+
+    def refresh(self, inputs):
+        """
+        Recomputes the results whose inputs changed. Returns their keys.
+        """
+        fps = input_fingerprints(inputs, self.profile)
+        chart = inputs["type_chart"]
+        if chart != battle_simulator.TYPE_EFFECTIVENESS:
+            # The engines read the module-level chart
+            battle_simulator.TYPE_EFFECTIVENESS.clear()
+            battle_simulator.TYPE_EFFECTIVENESS.update(chart)
+            type_charts.reload_file_chart()
+        teams = inputs["teams_config"]
+        stages = inputs["pokemon_stages"]
+        params = self.profile.params()
+        self.trainers = [team["trainer"] for team in teams]
+        recomputed = []
+        wanted = set()
+
+        def need(key, deps, compute):
+            wanted.add(key)
+            stamp = {dep: fps.get(dep) for dep in deps}
+            if key not in self.values or self.stamps.get(key) != stamp:
+                self.values[key] = compute()
+                self.stamps[key] = stamp
+                recomputed.append(key)
+            fps[key] = fingerprint(self.values[key])
+
+        entries = [
+            [
+                Entry(team, slot, poke, stages, self.profile)
+                for slot, poke in enumerate(team["pokemon"])
+                if poke.get("level", 0) > 0
+            ]
+            for team in teams
+        ]
+        for t, team_a in enumerate(entries):
+            for team_b in entries[t + 1 :]:
+                for a in team_a:
+                    for b in team_b:
+                        need(
+                            f"matchup:{a.key}|{b.key}",
+                            a.deps + b.deps,
+                            lambda a=a, b=b: matchup_odds(a, b, params),
+                        )
+
+        pair_keys = {}
+        for i in range(len(teams)):
+            for j in range(i + 1, len(teams)):
+                key = f"pair:{self.trainers[i]}|{self.trainers[j]}"
+                pair_keys[i, j] = key
+                deps = [dep for e in entries[i] + entries[j] for dep in e.deps]
+                need(key, deps, lambda i=i, j=j: self._pair_odds(teams, stages, i, j))
+
+        need(
+            "tournament",
+            list(pair_keys.values()),
+            lambda: self._tournament_odds(pair_keys),
+        )
+        for key in set(self.values) - wanted:
+            del self.values[key]
+            del self.stamps[key]
+        return recomputed
+
+    def _pair_odds(self, teams, stages, i, j):
+        field = batch_engine.Field([teams[i], teams[j]], stages)
+        return float(batch_engine.team_battle_odds(field, 0, 1, self.profile)[0])
+
+    def _tournament_odds(self, pair_keys):
+        n = len(self.trainers)
+        odds = np.full((1, n, n), 0.5)
+        for (i, j), key in pair_keys.items():
+            odds[0, i, j] = self.values[key]
+            odds[0, j, i] = 1 - self.values[key]
+        wins = batch_engine.round_robin_odds(odds)[0]
+        return {trainer: float(p) for trainer, p in zip(self.trainers, wins)}
+
+    def tournament_odds(self):
+        return self.values.get("tournament", {})
+
+    def pair_odds(self, a, b):
+        """
+        P(trainer a beats trainer b).
+        """
+        if f"pair:{a}|{b}" in self.values:
+            return self.values[f"pair:{a}|{b}"]
+        return 1 - self.values[f"pair:{b}|{a}"]
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"values": self.values, "stamps": self.stamps}, f)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        # Stamps carry the profile fingerprint, so a cache written under
+        # another profile is simply recomputed
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.values, self.stamps = data["values"], data["stamps"]
+
+
+class Watcher:
+    """
+    Polls the input files. poll() returns freshly loaded inputs when any of
+    them changed since the last successful load, else None.
+    """
+
+    def __init__(self, paths=INPUT_PATHS):
+        self.paths = paths
+        self.error = None
+        self._mtimes = self._scan()
+
+    def _scan(self):
+        return [
+            os.stat(path).st_mtime_ns if os.path.exists(path) else None
+            for path in self.paths
+        ]
+
+    def poll(self):
+        if self._scan() == self._mtimes:
+            return None
+        try:
+            inputs = load_inputs()
+        except (OSError, ValueError, KeyError) as e:
+            # Half-saved file: keep the old state and retry on the next poll
+            self.error = f"{type(e).__name__}: {e}"
+            return None
+        self.error = None
+        # Scanned again: loading may have rebuilt species.db
+        self._mtimes = self._scan()
+        return inputs
+
+
+def format_odds(analyses):
+    odds = analyses.tournament_odds()
+    width = max((len(t) for t in odds), default=0)
+    return "\n".join(
+        f"  {trainer:<{width}}  {p:6.1%}"
+        for trainer, p in sorted(odds.items(), key=lambda kv: -kv[1])
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cache", help="JSON file keeping results between runs")
+    parser.add_argument("--profile", help="ScoringProfile JSON file")
+    parser.add_argument(
+        "--watch", action="store_true", help="keep refreshing on input edits"
+    )
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL)
+    args = parser.parse_args(argv)
+
+    profile = scoring.ScoringProfile.load(args.profile) if args.profile else None
+    analyses = Analyses(profile)
+    if args.cache:
+        analyses.load(args.cache)
+    watcher = Watcher()
+    inputs = load_inputs()
+    while True:
+        start = time.perf_counter()
+        try:
+            recomputed = analyses.refresh(inputs)
+        except KeyError as e:
+            # e.g. a roster entry naming a line missing from pokemon_stages
+            print(f"Invalid inputs, unknown key {e}", flush=True)
+            if not args.watch:
+                return 1
+        else:
+            elapsed = time.perf_counter() - start
+            if args.cache and recomputed:
+                analyses.save(args.cache)
+            print(
+                f"Recomputed {len(recomputed)} of {len(analyses.values)} results "
+                f"in {elapsed * 1000:.1f} ms"
+            )
+            print("Tournament odds:")
+            print(format_odds(analyses), flush=True)
+            if not args.watch:
+                return 0
+        inputs, error = None, None
+        while inputs is None:
+            time.sleep(args.interval)
+            inputs = watcher.poll()
+            if watcher.error and watcher.error != error:
+                error = watcher.error
+                print(f"Waiting for valid inputs: {error}", flush=True)
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        pass
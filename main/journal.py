@@ -0,0 +1,202 @@
+"""
+Append-only tournament journal.
+
+Every tournament event (setup, battle start, starter choice, exchange,
+substitution, undo and redo, battle result) is appended as one compact JSON line and
+flushed immediately. Every SNAPSHOT_EVERY events the folded state is written
+atomically to ``<journal>.snapshot`` together with the journal offset it
+covers, so a restart only has to read the snapshot and the events after it.
+
+Events:
+    tournament     {"format", "teams_config", "players", "chart"}
+                   players: seeding order, chart: type_charts name or null
+    battle_start   {"a", "b", "hp": [[...], [...]]}   trainer indices, full HP
+    starter        {"side", "idx"}
+    exchange       {"active": [ia, ib], "hp": [hp_a, hp_b], "winner": "A" | "B"}
+    substitute     {"side", "idx"}
+    undo, redo     {"hp": [[...], [...]], "active": [ia, ib]}   state it leads to
+    battle_end     {"a", "b", "winner"}               winner: trainer index or null
+
+Indices inside a battle refer to the trainer's Pokémon with level > 0.
+"""
+
+import json
+import os
+
+import tournament_formats
+
+SNAPSHOT_EVERY = 200
+
+
+def read_events(path, offset=0):
+    """
+    Yields events from the journal starting at a byte offset. A torn last
+    line (crash mid-write) is ignored.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            yield json.loads(line)
+
+
+class TournamentState:
+    """
+    Plain-data state folded from journal events.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self.format = None
+        self.teams_config = None
+        self.players = None  # seeding order, None for config order
+        self.chart = None  # type_charts name, None for type_effectiveness.csv
+        self.results = []  # [a, b, winner] in order
+        self.battle = None  # battle in progress, see battle_start
+
+    def apply(self, event):
+        kind = event["type"]
+        if kind == "tournament":
+            self.format = event["format"]
+            self.teams_config = event["teams_config"]
+            self.players = event.get("players")
+            self.chart = event.get("chart")
+            self.results = []
+            self.battle = None
+        elif kind == "battle_start":
+            self.battle = {
+                "a": event["a"],
+                "b": event["b"],
+                "hp": [list(hp) for hp in event["hp"]],
+                "active": [None, None],
+            }
+        elif kind in ("starter", "substitute"):
+            self.battle["active"][event["side"]] = event["idx"]
+        elif kind == "exchange":
+            self.battle["active"] = list(event["active"])
+            for side, hp in enumerate(event["hp"]):
+                self.battle["hp"][side][event["active"][side]] = hp
+        elif kind in ("undo", "redo"):
+            # Both carry the whole battle state they lead to
+            self.battle["hp"] = [list(hp) for hp in event["hp"]]
+            self.battle["active"] = list(event["active"])
+        elif kind == "battle_end":
+            self.results.append([event["a"], event["b"], event["winner"]])
+            self.battle = None
+        self.seq = event["seq"]
+
+    def to_dict(self):
+        return {
+            "seq": self.seq,
+            "format": self.format,
+            "teams_config": self.teams_config,
+            "players": self.players,
+            "chart": self.chart,
+            "results": self.results,
+            "battle": self.battle,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        state.__dict__.update(data)
+        return state
+
+    def build_tournament(self):
+        """
+        A tournament object with all journaled results recorded. Nothing is
+        re-simulated: the results are fed in as they were played.
+        """
+        trainers = [team["trainer"] for team in self.teams_config]
+        tournament = tournament_formats.make_tournament(
+            self.format, trainers, players=self.players
+        )
+        for a, b, winner in self.results:
+            tournament.pending()  # opens the round (and hands out byes)
+            tournament.record(a, b, winner)
+        return tournament
+
+
+def load(path):
+    """
+    Rebuilds the state from the last snapshot plus the events after it.
+    """
+    state, offset = TournamentState(), 0
+    snapshot_path = path + ".snapshot"
+    if os.path.exists(snapshot_path):
+        with open(snapshot_path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        state = TournamentState.from_dict(snapshot["state"])
+        offset = snapshot["offset"]
+    for event in read_events(path, offset):
+        state.apply(event)
+    return state
+
+
+def _drop_torn_tail(path):
+    # Appending after a half-written line would corrupt the next event
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        size = end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end != size:
+            f.truncate(end)
+
+
+class Journal:
+    """
+    Appends events to a journal file, resuming an existing one. `state`
+    always reflects everything written so far.
+    """
+
+    def __init__(self, path, snapshot_every=SNAPSHOT_EVERY):
+        self.path = path
+        self.snapshot_path = path + ".snapshot"
+        self.snapshot_every = snapshot_every
+        self.state = load(path)
+        _drop_torn_tail(path)
+        self._file = open(path, "ab")
+        self._since_snapshot = 0
+
+    @property
+    def resumed(self):
+        return self.state.format is not None
+
+    def append(self, kind, **data):
+        event = {"seq": self.state.seq + 1, "type": kind}
+        event.update(data)
+        line = json.dumps(event, separators=(",", ":")) + "\n"
+        self._file.write(line.encode("utf-8"))
+        self._file.flush()
+        self.state.apply(event)
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+        return event
+
+    def snapshot(self):
+        os.fsync(self._file.fileno())
+        data = {"offset": self._file.tell(), "state": self.state.to_dict()}
+        tmp = self.snapshot_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        self._since_snapshot = 0
+
+    def close(self):
+        if not self._file.closed:
+            self.snapshot()
+            self._file.close()
@@ -0,0 +1,392 @@
+"""
+Scoring kernels behind the deterministic battle engine.
+
+The same kernel source is used by two backends: plain Python, and a Numba
+compiled version used for the batch kernels when Numba is installed. Both
+expose identical functions and return identical results, so callers never
+need to know which one is active. Use ``active_backend()`` to check and
+``set_backend()`` to switch at runtime (or set ``POKE_SIM_BACKEND=python``
+to force the fallback).
+"""
+
+import os
+import random
+
+import scoring
+
+try:
+    import numba
+    import numpy as np
+except ImportError:  # Numba (and NumPy) are optional
+    numba = None
+    np = None
+
+# Kernel parameter tuple: (level_weight, hp_weight, type_weight,
+# stage_weight, margin_hp_factor, tie_margin), see ScoringProfile.params()
+DEFAULT_PARAMS = scoring.DEFAULT_PROFILE.params()
+
+# Outcome codes returned by the kernels
+A_WINS = 0
+B_WINS = 1
+DRAW = 2  # both teams ran out in the same exchange
+
+BACKENDS = ("python", "numba")
+
+
+def _build_kernels(jit):
+    """
+    Builds the kernel set with the given decorator (identity or numba.njit).
+    Kernels only use scalars, tuples and indexing so they compile unchanged.
+    """
+
+    @jit
+    def score(level, hp, type_mult, stage, params):
+        return (
+            level * params[0]
+            + hp * params[1]
+            + type_mult * params[2]
+            + stage * params[3]
+        )
+
+    @jit
+    def is_tie(a_score, b_score, params):
+        return abs(a_score - b_score) <= params[5]
+
+    @jit
+    def resolve(a_score, b_score, a_hp, b_hp, coin, params):
+        # Returns (winner, winner_hp); the loser always ends on 0 HP
+        if abs(a_score - b_score) <= params[5]:
+            if coin:
+                return A_WINS, 1
+            return B_WINS, 1
+        if a_score > b_score:
+            return A_WINS, int(min(a_hp, (a_score - b_score) * params[4]))
+        return B_WINS, int(min(b_hp, (b_score - a_score) * params[4]))
+
+    @jit
+    def next_alive(hps, start):
+        for i in range(start, len(hps)):
+            if hps[i] > 0:
+                return i
+        return -1
+
+    @jit
+    def team_battle(
+        levels_a,
+        stages_a,
+        out_a,
+        levels_b,
+        stages_b,
+        out_b,
+        mult_ab,
+        mult_ba,
+        coins,
+        params,
+    ):
+        # Plays a full team battle in place on the HP buffers out_a / out_b.
+        # Each side sends in its next alive Pokémon in roster order, and
+        # exchange k uses coins[k] if it ends in a tie.
+        ia = next_alive(out_a, 0)
+        ib = next_alive(out_b, 0)
+        k = 0
+        while ia >= 0 and ib >= 0:
+            a_score = score(
+                levels_a[ia], out_a[ia], mult_ab[ia][ib], stages_a[ia], params
+            )
+            b_score = score(
+                levels_b[ib], out_b[ib], mult_ba[ib][ia], stages_b[ib], params
+            )
+            winner, hp = resolve(
+                a_score, b_score, out_a[ia], out_b[ib], coins[k % len(coins)], params
+            )
+            if winner == A_WINS:
+                out_a[ia] = hp
+                out_b[ib] = 0
+                ib = next_alive(out_b, ib)
+            else:
+                out_a[ia] = 0
+                out_b[ib] = hp
+                ib = next_alive(out_b, ib)
+            # A narrow win can leave the winner on 0 HP, so it faints too
+            ia = next_alive(out_a, ia)
+            k += 1
+        if ia >= 0:
+            return A_WINS, k
+        if ib >= 0:
+            return B_WINS, k
+        return DRAW, k
+
+    @jit
+    def score_batch(levels, hps, type_mults, stages, params, out):
+        for i in range(len(out)):
+            out[i] = score(levels[i], hps[i], type_mults[i], stages[i], params)
+        return out
+
+    @jit
+    def resolve_batch(a_scores, b_scores, a_hps, b_hps, coins, params, winners, hps):
+        for i in range(len(winners)):
+            winners[i], hps[i] = resolve(
+                a_scores[i], b_scores[i], a_hps[i], b_hps[i], coins[i], params
+            )
+        return winners, hps
+
+    return {
+        "score": score,
+        "is_tie": is_tie,
+        "resolve": resolve,
+        "team_battle": team_battle,
+        "score_batch": score_batch,
+        "resolve_batch": resolve_batch,
+    }
+
+
+_KERNELS = {"python": _build_kernels(lambda func: func)}
+if numba is not None:
+    _KERNELS["numba"] = _build_kernels(numba.njit(cache=True))
+
+# Kernels that loop over whole arrays; the others work on a few scalars (or
+# one small team) per call, where Numba's dispatch and conversions cost more
+# than the work itself
+BATCH_KERNELS = ("score_batch", "resolve_batch")
+
+_backend = None
+_impl = None
+_compiled = set()  # names of the kernels running on Numba
+
+
+def available_backends():
+    return [name for name in BACKENDS if name in _KERNELS]
+
+
+def active_backend():
+    return _backend
+
+
+def set_backend(name="auto"):
+    """
+    Switches the active backend. "auto" picks Numba when it is installed,
+    but only for the batch kernels; the per-call kernels stay on Python.
+    Naming a backend runs every kernel on it, e.g. to check parity.
+    """
+    global _backend, _impl, _compiled
+    auto = name == "auto"
+    if auto:
+        name = "numba" if "numba" in _KERNELS else "python"
+    if name not in _KERNELS:
+        raise ValueError(
+            f"Backend {name!r} is not available (available: {available_backends()})"
+        )
+    _backend = name
+    _compiled = set()
+    if name == "numba":
+        _compiled = set(BATCH_KERNELS if auto else _KERNELS["numba"])
+    _impl = {
+        kernel: _KERNELS["numba" if kernel in _compiled else "python"][kernel]
+        for kernel in _KERNELS["python"]
+    }
+    return name
+
+
+set_backend(os.environ.get("POKE_SIM_BACKEND", "auto"))
+
+
+# --- Buffers: any sequence for Python, contiguous arrays for Numba ---
+# NumPy arrays of the right dtype are passed through without a copy, and
+# batch results come back as arrays when the inputs were arrays
+def _is_array(values):
+    return np is not None and isinstance(values, np.ndarray)
+
+
+def _buffer(values, dtype, kernel):
+    if kernel in _compiled:
+        return np.asarray(values, dtype=dtype)
+    return values
+
+
+def _zeros(n, dtype, kernel, as_array):
+    if kernel in _compiled or as_array:
+        return np.zeros(n, dtype=dtype)
+    return [0] * n
+
+
+def _copy(values, dtype, kernel):
+    if kernel in _compiled or _is_array(values):
+        return np.array(values, dtype=dtype)
+    return list(values)
+
+
+def _result(out, as_array):
+    if as_array or not _is_array(out):
+        return out
+    return out.tolist()
+
+
+# --- Public API (identical for both backends) ---
+def score(level, hp, type_mult, stage, params=DEFAULT_PARAMS):
+    return _impl["score"](level, hp, type_mult, stage, params)
+
+
+def is_tie(a_score, b_score, params=DEFAULT_PARAMS):
+    return bool(_impl["is_tie"](a_score, b_score, params))
+
+
+def resolve(a_score, b_score, a_hp, b_hp, coin, params=DEFAULT_PARAMS):
+    """
+    Returns (winner, winner_hp) where winner is A_WINS or B_WINS.
+    coin decides ties: True means A survives with 1 HP.
+    """
+    winner, hp = _impl["resolve"](a_score, b_score, a_hp, b_hp, bool(coin), params)
+    return int(winner), int(hp)
+
+
+def team_battle(
+    levels_a,
+    hps_a,
+    stages_a,
+    levels_b,
+    hps_b,
+    stages_b,
+    mult_ab,
+    mult_ba,
+    coins=None,
+    params=DEFAULT_PARAMS,
+):
+    """
+    Plays out a whole team battle with roster-order substitutions.
+    mult_ab[i][j] is the type multiplier of A's i-th Pokémon attacking B's j-th.
+    coins decide ties per exchange (drawn at random when not given).
+    Returns (winner, final_hps_a, final_hps_b, exchanges); the final HP are
+    arrays when hps_a and hps_b are, lists otherwise.
+    """
+    kernel = "team_battle"
+    if coins is None or len(coins) == 0:
+        coins = [random.choice([True, False]) for _ in range(len(hps_a) + len(hps_b))]
+    as_array = _is_array(hps_a) and _is_array(hps_b)
+    out_a = _copy(hps_a, "float64", kernel)
+    out_b = _copy(hps_b, "float64", kernel)
+    if kernel in _compiled:
+        mult_ab = np.asarray(mult_ab, dtype="float64").reshape(len(hps_a), len(hps_b))
+        mult_ba = np.asarray(mult_ba, dtype="float64").reshape(len(hps_b), len(hps_a))
+    winner, exchanges = _impl[kernel](
+        _buffer(levels_a, "float64", kernel),
+        _buffer(stages_a, "float64", kernel),
+        out_a,
+        _buffer(levels_b, "float64", kernel),
+        _buffer(stages_b, "float64", kernel),
+        out_b,
+        mult_ab,
+        mult_ba,
+        _buffer(coins, "bool", kernel),
+        params,
+    )
+    return (
+        int(winner),
+        _result(out_a, as_array),
+        _result(out_b, as_array),
+        int(exchanges),
+    )
+
+
+def score_batch(levels, hps, type_mults, stages, params=DEFAULT_PARAMS):
+    """
+    Vector form of score(); an array for array inputs, a list otherwise.
+    """
+    kernel = "score_batch"
+    as_array = _is_array(levels)
+    out = _zeros(len(levels), "float64", kernel, as_array)
+    _impl[kernel](
+        _buffer(levels, "float64", kernel),
+        _buffer(hps, "float64", kernel),
+        _buffer(type_mults, "float64", kernel),
+        _buffer(stages, "float64", kernel),
+        params,
+        out,
+    )
+    return _result(out, as_array)
+
+
+def resolve_batch(a_scores, b_scores, a_hps, b_hps, coins, params=DEFAULT_PARAMS):
+    """
+    Vector form of resolve(); returns (winners, winner_hps), arrays for
+    array inputs and lists otherwise.
+    """
+    kernel = "resolve_batch"
+    as_array = _is_array(a_scores)
+    winners = _zeros(len(a_scores), "int64", kernel, as_array)
+    hps = _zeros(len(a_scores), "int64", kernel, as_array)
+    _impl[kernel](
+        _buffer(a_scores, "float64", kernel),
+        _buffer(b_scores, "float64", kernel),
+        _buffer(a_hps, "float64", kernel),
+        _buffer(b_hps, "float64", kernel),
+        _buffer(coins, "bool", kernel),
+        params,
+        winners,
+        hps,
+    )
+    return _result(winners, as_array), _result(hps, as_array)
+
+
+def check_backends(num_cases=2000, seed=0):
+    """
+    Runs every available backend on the same random inputs and returns the
+    names of the kernels whose results differ (an empty list means parity).
+    """
+    rng = random.Random(seed)
+    n = num_cases
+    levels = [rng.randint(1, 100) for _ in range(n)]
+    hps = [rng.randint(0, 400) + rng.choice([0, 0.5]) for _ in range(n)]
+    mults = [rng.choice([0.0, 0.25, 0.5, 1.0, 2.0, 4.0]) for _ in range(n)]
+    stages = [rng.randint(1, 3) for _ in range(n)]
+    coins = [rng.random() < 0.5 for _ in range(n)]
+    team_size = 8
+    teams = [
+        (
+            [rng.randint(1, 60) for _ in range(team_size)],
+            [rng.randint(1, 300) for _ in range(team_size)],
+            [rng.randint(1, 3) for _ in range(team_size)],
+        )
+        for _ in range(2)
+    ]
+    mult_ab = [[rng.choice(mults) for _ in range(team_size)] for _ in range(team_size)]
+    mult_ba = [[rng.choice(mults) for _ in range(team_size)] for _ in range(team_size)]
+
+    previous = active_backend()
+    results = {}
+    try:
+        for name in available_backends():
+            set_backend(name)
+            scores = score_batch(levels, hps, mults, stages)
+            results[name] = {
+                "score": [score(*args) for args in zip(levels, hps, mults, stages)],
+                "score_batch": scores,
+                "resolve": [
+                    resolve(a, b, ha, hb, c)
+                    for a, b, ha, hb, c in zip(
+                        scores, scores[::-1], hps, hps[::-1], coins
+                    )
+                ],
+                "resolve_batch": resolve_batch(
+                    scores, scores[::-1], hps, hps[::-1], coins
+                ),
+                "team_battle": team_battle(
+                    *teams[0], *teams[1], mult_ab, mult_ba, coins=coins[:16]
+                ),
+            }
+    finally:
+        set_backend(previous)
+    reference = results["python"]
+    return sorted(
+        {
+            kernel
+            for other in results.values()
+            for kernel, value in other.items()
+            if value != reference[kernel]
+        }
+    )
+
+
+if __name__ == "__main__":
+    print(f"Active backend: {active_backend()} (available: {available_backends()})")
+    mismatches = check_backends()
+    print("Backends agree." if not mismatches else f"Mismatch in: {mismatches}")
@@ -0,0 +1,236 @@
+"""
+Memory profiles of the simulation entry points.
+
+Runs simulate_battle, run_many_battles or a tournament under tracemalloc
+and reports the peak traced memory, what is still allocated afterwards
+(per battle, and the top allocation sites), and which poke_battle_sim
+objects (battles, trainers, Pokémon) stay alive. The report is written as
+JSON; with --baseline it is compared to an earlier report and the run
+fails when memory grew, like a time regression.
+
+Example:
+    python main/memory_profile.py many --battles 10000 --out memory.json
+    python main/memory_profile.py tournament --random-teams 64 \\
+        --baseline memory-main.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+TOP_SITES = 15
+TOLERANCE = 0.10  # allowed growth over the baseline
+COMPARED = ("peak_bytes_per_battle", "retained_bytes_per_battle")
+
+
+def _live_sim_objects():
+    # Objects of the simulator package, by class name
+    counts = Counter()
+    for obj in gc.get_objects():
+        module = getattr(type(obj), "__module__", "")
+        if isinstance(module, str) and module.startswith("poke_battle_sim"):
+            counts[type(obj).__name__] += 1
+    return counts
+
+
+def profile(run, top=TOP_SITES, frames=1):
+    """
+    Runs run() under tracemalloc. run() returns the number of battles it
+    played, for the per-battle figures; anything it keeps alive is reported
+    as retained.
+    """
+    gc.collect()
+    objects_before = _live_sim_objects()
+    tracemalloc.start(frames)
+    before = tracemalloc.take_snapshot()
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    battles = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    objects_after = _live_sim_objects()
+
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ]
+    diff = after.filter_traces(filters).compare_to(
+        before.filter_traces(filters), "traceback" if frames > 1 else "lineno"
+    )
+    sites = [
+        {
+            "site": [f"{f.filename}:{f.lineno}" for f in stat.traceback],
+            "bytes": stat.size_diff,
+            "blocks": stat.count_diff,
+        }
+        for stat in sorted(diff, key=lambda s: -s.size_diff)[:top]
+        if stat.size_diff > 0
+    ]
+    battles = max(1, battles)
+    return {
+        "battles": battles,
+        "elapsed_seconds": round(elapsed, 3),
+        "peak_bytes": peak - baseline,
+        "peak_bytes_per_battle": round((peak - baseline) / battles, 1),
+        "retained_bytes": current - baseline,
+        "retained_bytes_per_battle": round((current - baseline) / battles, 1),
+        "retained_blocks": sum(stat.count_diff for stat in diff),
+        "retained_sim_objects": {
+            name: count
+            for name, count in (objects_after - objects_before).items()
+            if count
+        },
+        "top_sites": sites,
+    }
+
+
+# --- Targets ---
+
+
+def target_simulate(args):
+    import example
+
+    def run():
+        for _ in range(args.battles):
+            example.simulate_battle(
+                poke_a_id=args.a,
+                poke_b_id=args.b,
+                poke_a_moves=[args.a_move],
+                poke_b_moves=[args.b_move],
+                poke_a_level=args.a_level,
+                poke_b_level=args.b_level,
+            )
+        return args.battles
+
+    return run
+
+
+def target_many(args):
+    import example
+
+    def run():
+        example.run_many_battles(
+            num_simulations=args.battles,
+            poke_a_id=args.a,
+            poke_b_id=args.b,
+            poke_a_moves=[args.a_move],
+            poke_b_moves=[args.b_move],
+            poke_a_level=args.a_level,
+            poke_b_level=args.b_level,
+            seed=args.seed,
+        )
+        return args.battles
+
+    return run
+
+
+def target_tournament(args):
+    import batch_engine
+    import species_db
+    import tournament_formats
+
+    stages = species_db.load_stages()
+    if args.random_teams:
+        config = tournament_formats.random_teams_config(
+            args.random_teams, stages, seed=args.seed
+        )
+    else:
+        config = batch_engine.load_json(batch_engine.CONFIG_PATH)
+    trainers = [team["trainer"] for team in config]
+
+    def run():
+        tournament = tournament_formats.make_tournament(args.format, trainers)
+        engine = tournament_formats.MatchEngine(config, stages, seed=args.seed)
+        tournament_formats.run(tournament, engine)
+        return len(tournament.history)
+
+    return run
+
+
+TARGETS = {
+    "simulate": target_simulate,
+    "many": target_many,
+    "tournament": target_tournament,
+}
+
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    """
+    Regressions against a baseline report: [(key, baseline, now)].
+    """
+    return [
+        (key, baseline[key], report[key])
+        for key in COMPARED
+        if key in baseline and report[key] > baseline[key] * (1 + tolerance) + 1
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("target", choices=list(TARGETS))
+    parser.add_argument("--battles", type=int, default=1000)
+    parser.add_argument("--a", default="Pikachu")
+    parser.add_argument("--b", default="Starmie")
+    parser.add_argument("--a-move", default="thunderbolt")
+    parser.add_argument("--b-move", default="water-gun")
+    parser.add_argument("--a-level", type=int, default=10)
+    parser.add_argument("--b-level", type=int, default=10)
+    parser.add_argument("--format", default="round_robin", help="tournament format")
+    parser.add_argument("--random-teams", type=int, help="tournament of random teams")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--frames", type=int, default=1, help="traceback depth")
+    parser.add_argument(
+        "--no-warmup", action="store_true", help="include first-run costs"
+    )
+    parser.add_argument("--top", type=int, default=TOP_SITES)
+    parser.add_argument("--out", default="memory_profile.json", help="JSON report")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    run = TARGETS[args.target](args)
+    if not args.no_warmup:
+        # One small untraced run, so imports and JIT compilation are not
+        # reported as retained by the run itself
+        small = dict(vars(args), battles=1, random_teams=2)
+        TARGETS[args.target](argparse.Namespace(**small))()
+    report = profile(run, args.top, args.frames)
+    report["target"] = args.target
+    report["args"] = {k: v for k, v in vars(args).items() if k not in ("out",)}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(
+        f"{args.target}: {report['battles']} battles in "
+        f"{report['elapsed_seconds']}s, peak {report['peak_bytes'] / 2**20:.1f} MiB "
+        f"({report['peak_bytes_per_battle']:.0f} B/battle), retained "
+        f"{report['retained_bytes'] / 2**10:.1f} KiB "
+        f"({report['retained_bytes_per_battle']:.1f} B/battle)"
+    )
+    if report["retained_sim_objects"]:
+        print(f"Simulator objects still alive: {report['retained_sim_objects']}")
+    for site in report["top_sites"][:5]:
+        print(f"  {site['bytes'] / 1024:8.1f} KiB  {site['site'][0]}")
+    print(f"Report written to {os.path.abspath(args.out)}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for key, before, now in regressions:
+            print(f"Memory regression: {key} {before} -> {now}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+"""
+Move selection for poke_battle_sim battles.
+
+pick() chooses the move a Pokémon uses this turn by expectimax over both
+sides' moves: the side to move maximises, the foe answers with its worst
+case, and every hit is averaged over its damage distribution. Damage
+distributions come from the simulator's formula (accuracy, 1/16 crits,
+the 85-100% roll, STAB and type effectiveness) and are cached per
+(attacker, defender, move), so a matchup pays for them once however many
+battles and turns use it. Leaves are scored by the race of expected turns
+to knock each other out.
+
+Search depth is bounded by a time budget by iterative deepening; with
+budget None the search runs to a fixed depth, so seeded battles replay
+exactly. A Pokémon with a single usable move skips the search altogether
+and battles with one move each cost what they did before.
+
+The model ignores abilities, items, weather, stat stages, status and move
+side effects: it ranks moves, the simulator still plays them out.
+
+Example:
+    python main/move_ai.py charmander squirtle --moves ember,scratch --foe-moves water-gun,tackle
+"""
+
+import argparse
+import math
+import sys
+import time
+
+import poke_battle_sim as pb
+from poke_battle_sim.poke_sim import PokeSim
+
+MAX_DEPTH = 4  # turns looked ahead with a time budget
+FIXED_DEPTH = 1  # turns looked ahead with budget None
+TIME_BUDGET = 0.001  # seconds per decision
+HIT_BUCKETS = 2  # damage outcomes kept per move, besides a miss
+CRIT_CHANCE = 1 / 16
+ROLLS = range(85, 101)
+CACHE_LIMIT = 100000  # cached decisions before the cache is cleared
+
+WIN = 1.0
+LOSS = -1.0
+NODE_CHECK = 256  # nodes searched between deadline checks
+
+PHYSICAL = 2
+SPECIAL = 3
+
+_tables = {}
+_decisions = {}
+
+
+class _Timeout(Exception):
+    pass
+
+
+# --- Damage tables ---
+
+
+def poke_key(poke):
+    """
+    What the damage of a Pokémon's moves depends on, as a hashable key.
+    """
+    return (poke.name, poke.level, tuple(poke.stats_actual), tuple(poke.types))
+
+
+def _type_multiplier(move_type, defender_types):
+    mult = 1.0
+    for t in defender_types:
+        if t:
+            mult *= PokeSim.get_type_ef(move_type, t)
+    return mult
+
+
+def _hit_damages(attacker, defender, move):
+    # (damage, probability) of a hit, every crit and roll combination
+    if move.category == PHYSICAL:
+        ratio = attacker.stats_actual[1] / defender.stats_actual[2]
+    else:
+        ratio = attacker.stats_actual[3] / defender.stats_actual[4]
+    base = (2 * attacker.level / 5 + 2) * move.power * ratio / 50 + 2
+    if move.type != "typeless":
+        base *= _type_multiplier(move.type, defender.types)
+    if move.type in attacker.types:
+        base *= 1.5
+    outcomes = []
+    for crit, p_crit in ((1, 1 - CRIT_CHANCE), (2, CRIT_CHANCE)):
+        for roll in ROLLS:
+            outcomes.append((int(base * crit * roll / 100), p_crit / len(ROLLS)))
+    return sorted(outcomes)
+
+
+def _bucket(outcomes, buckets):
+    # Equal-probability groups of sorted outcomes, each as its mean damage
+    result, size = [], 1.0 / buckets
+    damage = mass = 0.0
+    for dmg, p in outcomes:
+        while p > 1e-12:
+            take = min(p, size - mass)
+            damage += dmg * take
+            mass += take
+            p -= take
+            if mass >= size - 1e-12:
+                result.append((damage / mass, mass))
+                damage = mass = 0.0
+    if mass > 1e-12:
+        result.append((damage / mass, mass))
+    return result
+
+
+def damage_table(attacker, defender, move):
+    """
+    Damage distribution of one move as a tuple of (damage, probability),
+    a miss included, cached per (attacker, defender, move).
+    """
+    key = (poke_key(attacker), poke_key(defender), move.name)
+    table = _tables.get(key)
+    if table is None:
+        if not move.power or move.category not in (PHYSICAL, SPECIAL):
+            table = ((0.0, 1.0),)
+        else:
+            p_hit = min(move.acc, 100) / 100 if move.acc and move.acc > 0 else 1.0
+            hits = _bucket(_hit_damages(attacker, defender, move), HIT_BUCKETS)
+            table = tuple((dmg, p * p_hit) for dmg, p in hits)
+            if p_hit < 1:
+                table += ((0.0, 1 - p_hit),)
+        _tables[key] = table
+    return table
+
+
+def clear_cache():
+    _tables.clear()
+    _decisions.clear()
+
+
+# --- Search ---
+
+
+class _Search:
+    """
+    One decision: the side to move (me) against the foe, over their HP.
+    """
+
+    def __init__(self, me, foe, my_moves, foe_moves, deadline):
+        self.my_max, self.foe_max = me.max_hp, foe.max_hp
+        # (priority, damage table, name, mean damage) of every move
+        self.my_moves = [_entry(m, damage_table(me, foe, m)) for m in my_moves]
+        self.foe_moves = [_entry(m, damage_table(foe, me, m)) for m in foe_moves]
+        self.my_speed, self.foe_speed = me.stats_actual[5], foe.stats_actual[5]
+        self.my_rate = max(entry[3] for entry in self.my_moves)
+        self.foe_rate = max(entry[3] for entry in self.foe_moves)
+        # Positions one turn deeper, for each position searched
+        self.branching = (
+            len(self.my_moves)
+            * len(self.foe_moves)
+            * max(len(entry[1]) for entry in self.my_moves)
+            * max(len(entry[1]) for entry in self.foe_moves)
+        )
+        self.deadline = deadline
+        self.nodes = 0
+        self.memo = {}
+
+    def best(self, my_hp, foe_hp, depth):
+        # Best move name and its value, the foe answering with its worst case;
+        # equal values go to the move with the higher mean damage
+        best, best_name = (-math.inf, 0.0), None
+        for mine in self.my_moves:
+            worst = math.inf
+            for theirs in self.foe_moves:
+                value = self.turn(my_hp, foe_hp, mine, theirs, depth)
+                if value < worst:
+                    worst = value
+                    if (worst, mine[3]) <= best:
+                        break
+            if (worst, mine[3]) > best:
+                best, best_name = (worst, mine[3]), mine[2]
+        return best_name, best[0]
+
+    def turn(self, my_hp, foe_hp, mine, theirs, depth):
+        my_first = (mine[0], self.my_speed) > (theirs[0], self.foe_speed)
+        foe_first = (theirs[0], self.foe_speed) > (mine[0], self.my_speed)
+        if my_first:
+            return self.order(my_hp, foe_hp, mine[1], theirs[1], depth, True)
+        if foe_first:
+            return self.order(my_hp, foe_hp, mine[1], theirs[1], depth, False)
+        # Speed tie: the simulator flips a coin
+        return 0.5 * (
+            self.order(my_hp, foe_hp, mine[1], theirs[1], depth, True)
+            + self.order(my_hp, foe_hp, mine[1], theirs[1], depth, False)
+        )
+
+    def order(self, my_hp, foe_hp, my_table, foe_table, depth, my_first):
+        value = 0.0
+        first, second = (my_table, foe_table) if my_first else (foe_table, my_table)
+        for dmg1, p1 in first:
+            if my_first:
+                hp1 = foe_hp - dmg1
+                if hp1 <= 0:
+                    value += p1 * WIN
+                    continue
+            else:
+                hp1 = my_hp - dmg1
+                if hp1 <= 0:
+                    value += p1 * LOSS
+                    continue
+            for dmg2, p2 in second:
+                if my_first:
+                    mine, theirs = my_hp - dmg2, hp1
+                    if mine <= 0:
+                        value += p1 * p2 * LOSS
+                        continue
+                else:
+                    mine, theirs = hp1, foe_hp - dmg2
+                    if theirs <= 0:
+                        value += p1 * p2 * WIN
+                        continue
+                value += p1 * p2 * self.value(mine, theirs, depth - 1)
+        return value
+
+    def value(self, my_hp, foe_hp, depth):
+        if depth <= 0:
+            return self.leaf(my_hp, foe_hp)
+        key = (my_hp, foe_hp, depth)
+        value = self.memo.get(key)
+        if value is None:
+            self.nodes += 1
+            if self.deadline and self.nodes % NODE_CHECK == 0:
+                if time.perf_counter() > self.deadline:
+                    raise _Timeout
+            value = self.memo[key] = self.best(my_hp, foe_hp, depth)[1]
+        return value
+
+    def leaf(self, my_hp, foe_hp):
+        # Race of expected turns to a knock-out, in [-1, 1]
+        if not self.my_rate:
+            return (
+                LOSS if self.foe_rate else my_hp / self.my_max - foe_hp / self.foe_max
+            )
+        if not self.foe_rate:
+            return WIN
+        mine = foe_hp / self.my_rate
+        theirs = my_hp / self.foe_rate
+        return (theirs - mine) / (theirs + mine)
+
+
+def _entry(move, table):
+    return (move.prio, table, move.name, sum(dmg * p for dmg, p in table))
+
+
+def _usable(poke):
+    moves = [m for m in poke.moves if m.cur_pp > 0 and not m.disabled]
+    return moves or list(poke.moves)
+
+
+def pick(poke, foe, budget=TIME_BUDGET):
+    """
+    Name of the move poke uses against foe this turn. budget is the search
+    time in seconds; None searches FIXED_DEPTH turns, the same every run.
+    """
+    moves = _usable(poke)
+    if len(moves) == 1:
+        return moves[0].name
+    foe_moves = _usable(foe)
+    my_hp, foe_hp = poke.cur_hp, foe.cur_hp
+    if budget is None:
+        key = (
+            poke_key(poke),
+            poke_key(foe),
+            tuple(m.name for m in moves),
+            tuple(m.name for m in foe_moves),
+            my_hp,
+            foe_hp,
+        )
+        name = _decisions.get(key)
+        if name is None:
+            search = _Search(poke, foe, moves, foe_moves, None)
+            name = search.best(my_hp, foe_hp, FIXED_DEPTH)[0]
+            if len(_decisions) >= CACHE_LIMIT:
+                _decisions.clear()
+            _decisions[key] = name
+        return name
+    # Iterative deepening: a depth is only started when it is expected to
+    # fit in what is left of the budget, and abandoned when it does not
+    start = time.perf_counter()
+    deadline = start + budget
+    search = _Search(poke, foe, moves, foe_moves, deadline)
+    name = search.best(my_hp, foe_hp, 1)[0]
+    for depth in range(2, MAX_DEPTH + 1):
+        now = time.perf_counter()
+        if now + (now - start) * search.branching > deadline:
+            break
+        start = now
+        try:
+            name = search.best(my_hp, foe_hp, depth)[0]
+        except _Timeout:
+            break
+    return name
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("poke", help="species of the Pokémon to move")
+    parser.add_argument("foe", help="species of its opponent")
+    parser.add_argument("--moves", required=True, help="comma-separated moves")
+    parser.add_argument("--foe-moves", required=True, help="comma-separated moves")
+    parser.add_argument("--level", type=int, default=10)
+    parser.add_argument("--foe-level", type=int, default=10)
+    parser.add_argument(
+        "--budget", type=float, default=TIME_BUDGET, help="search time in seconds"
+    )
+    args = parser.parse_args(argv)
+
+    pokes = [
+        pb.Pokemon(
+            name,
+            level,
+            moves.split(","),
+            "genderless",
+            ivs=[15, 15, 15, 15, 15, 15],
+            evs=[0, 0, 0, 0, 0, 0],
+            nature="hardy",
+        )
+        for name, level, moves in (
+            (args.poke, args.level, args.moves),
+            (args.foe, args.foe_level, args.foe_moves),
+        )
+    ]
+    poke, foe = pokes
+    for move in poke.moves:
+        table = ", ".join(
+            f"{dmg:.0f} ({p:.0%})" for dmg, p in damage_table(poke, foe, move)
+        )
+        print(f"{move.name:<16} {table}")
+    print(f"pick: {pick(poke, foe, args.budget)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,78 +8,105 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QListWidget,
     QTextEdit,
-    QProgressBar,
     QDialog,
     QGridLayout,
-    QGraphicsOpacityEffect,
+    QComboBox,
+    QListView,
+    QStyledItemDelegate,
+    QStyle,
+    QShortcut,
 )
-from PyQt5.QtGui import QPixmap, QPainter, QColor, QPen
-from PyQt5.QtCore import Qt
-from PyQt5.QtCore import QPropertyAnimation
+from PyQt5.QtGui import QPixmap, QPainter, QColor, QPen, QPalette, QKeySequence
+from PyQt5.QtCore import Qt, QTimer, QElapsedTimer, QRectF, QSize
+from PyQt5.QtCore import QAbstractListModel, QModelIndex
+from PyQt5 import sip
 import sys
 import os
 import json
+import math
+from collections import OrderedDict
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import battle_service
 import battle_simulator
+import battle_state
+import counter_picks
+import journal as event_journal
+import ratings as rating_tables
+import scoring
+import species_db
+import tournament_formats
+import type_charts
 
 # --- Load team config from JSON ---
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "teams_config.json")
-STAGES_PATH = os.path.join(os.path.dirname(__file__), "pokemon_stages.json")
 with open(CONFIG_PATH, "r", encoding="utf-8") as f:
     TEAMS_CONFIG = json.load(f)
-with open(STAGES_PATH, "r", encoding="utf-8") as f:
-    POKEMON_STAGES = json.load(f)
+# Species store: the curated lines plus every other species, read lazily
+POKEMON_STAGES = species_db.load_stages()
 
 TEAM_SIZE = len(TEAMS_CONFIG[0]["pokemon"])
 NUM_TEAMS = len(TEAMS_CONFIG)
 
-HP_BOOST = 10  # Set the HP boost factor here
+HP_BOOST = scoring.DEFAULT_PROFILE.hp_boost  # Set via ScoringProfile.hp_boost
+
+# Above this many trainers the tournament window shows a standings table
+# instead of one roster panel per trainer
+MAX_ROSTER_PANELS = 8
+
+# --- Auto-play ---
+HP_ANIMATION_MS = 600
+# Speed -> milliseconds between exchanges; 0 plays the rest at once. HP bars
+# only animate when exchanges are further apart than the animation
+AUTO_PLAY_SPEEDS = {"realtime": 1200, "fast": 60, "instant": 0}
+AUTO_PLAY_FRAME_MS = 30  # at most one redraw per frame
+# How a trainer sends in the next Pokémon without a dialog:
+# "counter" picks the best counter to the opposing Pokémon,
+# "roster" the next alive one in roster order
+SUBSTITUTION_POLICIES = ("counter", "roster")
+
+# --- HP bars ---
+# Bar color by remaining HP: the first band whose threshold the ratio exceeds
+HP_BANDS = ((0.5, "#4caf50"), (0.2, "#ffb300"), (0.0, "#e53935"))
+HP_RAMP_STEPS = 100
+HP_FRAME_MS = 16
+
+
+def species_image(stage_info):
+    """
+    Image path of a species stage; "" (a blank icon) if it has no image.
+    """
+    img = stage_info.get("img")
+    if not img or os.path.isabs(img):
+        return img or ""
+    return os.path.join(os.path.dirname(__file__), img)
 
 
 class PokemonWrapper:
-    def __init__(self, poke_dict):
+    def __init__(self, poke_dict, profile=None):
+        profile = profile or scoring.DEFAULT_PROFILE
         agg_name = poke_dict["name"]
         stage = str(poke_dict["stage"])
         level = poke_dict.get("level", 0)
         if level > 0:
             stage_info = POKEMON_STAGES[agg_name][stage]
             self.name = stage_info["name"]
-            self.move = stage_info["move"]
-            self.img = (
-                os.path.join(os.path.dirname(__file__), stage_info["img"])
-                if not os.path.isabs(stage_info["img"])
-                else stage_info["img"]
-            )
+            self.moves = species_db.moves_of(stage_info)
+            self.move = self.moves[0]
+            self.img = species_image(stage_info)
             self.gender = stage_info.get("gender", "male")
             self.level = level
             self.type = stage_info.get("type", ["Normal"])
-            BASE_HP = 30
-            LEVEL_MULT = 3
-            # Slightly boost HP gain for evolution
-            STAGE_MULT = 32  # was 25
-            if self.name == "Pikachu":
-                self.stage = 1
-                bonus = 0.5 * STAGE_MULT
-            elif self.name == "Raichu":
-                self.stage = 2
-                bonus = 0.5 * STAGE_MULT
-            else:
-                self.stage = int(stage)
-                bonus = 0
-            self.max_hp = (
-                BASE_HP
-                + (self.level * LEVEL_MULT)
-                + (self.stage * STAGE_MULT)
-                + bonus
-                + HP_BOOST
-            )
+            # HP formula and the Pikachu line bonus live in the scoring profile
+            self.stage, bonus_stages = scoring.stage_and_bonus(self.name, stage)
+            self.max_hp = profile.max_hp(self.level, self.stage, bonus_stages)
             self.cur_hp = self.max_hp
         else:
             self.max_hp = 0
             self.cur_hp = 0
             self.name = agg_name
             self.move = None
+            self.moves = []
             self.img = None
             self.gender = None
             self.level = 0
@@ -120,10 +147,19 @@ class TrainerTeam:
 
 
 class TeamBattleManager:
-    def __init__(self):
+    def __init__(self, profile=None, journal=None, ratings=None, chart=None):
+        self.profile = profile or scoring.DEFAULT_PROFILE
+        self.chart = chart  # type_charts name, None for type_effectiveness.csv
+        self.journal = journal  # journal.Journal or None
+        self.ratings = ratings  # ratings.Ratings or None
+        # Called with the regions a state change touched ("battlers", "log",
+        # "roster:<team>"), or with none when everything may have changed
+        self.on_change = None
         self.teams = []
         for team_conf in TEAMS_CONFIG:
-            team_pokes = [PokemonWrapper(poke) for poke in team_conf["pokemon"]]
+            team_pokes = [
+                PokemonWrapper(poke, self.profile) for poke in team_conf["pokemon"]
+            ]
             self.teams.append(TrainerTeam(team_conf["trainer"], team_pokes))
         self.scores = [0] * NUM_TEAMS
         self.battle_log = []
@@ -140,6 +176,33 @@ class TeamBattleManager:
             raise ValueError(
                 "Both teams must have at least one Pokémon with level > 0."
             )
+        # HP and active Pokémon live in an immutable BattleState; the teams
+        # and wrappers mirror the current one. Every action keeps the state
+        # before it, so undo and redo only swap states
+        self.state = battle_state.BattleState.initial(
+            [
+                [pw.cur_hp for pw in team.pokemon_wrappers]
+                for team in (self.team_a, self.team_b)
+            ],
+            (self.team_a.active_idx, self.team_b.active_idx),
+        )
+        self.undo_stack = []
+        self.redo_stack = []
+        # Counter-pick indexes for substitution hints, one per side
+        self.counter_picks = [
+            counter_picks.CounterPickIndex(
+                self.team_a.pokemon_wrappers,
+                self.team_b.pokemon_wrappers,
+                self.profile,
+                self.chart,
+            ),
+            counter_picks.CounterPickIndex(
+                self.team_b.pokemon_wrappers,
+                self.team_a.pokemon_wrappers,
+                self.profile,
+                self.chart,
+            ),
+        ]
         self.start_new_battle()
 
     def start_new_battle(self):
@@ -150,6 +213,26 @@ class TeamBattleManager:
             f"Starting HP: {poke_a.name}: {poke_a.cur_hp} HP, {poke_b.name}: {poke_b.cur_hp} HP"
         )
 
+    def _changed(self, *regions):
+        if self.on_change is not None:
+            self.on_change(*regions)
+
+    def _set_state(self, state, undoable=True):
+        """
+        Makes state the current battle state and mirrors it onto the teams;
+        only the wrappers of a side whose HP changed are written.
+        """
+        old = self.state
+        if undoable:
+            self.undo_stack.append(old)
+            self.redo_stack.clear()
+        self.state = state
+        for side, team in enumerate((self.team_a, self.team_b)):
+            team.active_idx = state.active[side]
+            if state.hp[side] is not old.hp[side]:
+                for pw, hp in zip(team.pokemon_wrappers, state.hp[side]):
+                    pw.cur_hp = hp
+
     def get_current_battlers(self):
         return self.team_a.get_active(), self.team_b.get_active()
 
@@ -163,8 +246,8 @@ class TeamBattleManager:
         result = battle_simulator.deterministic_battle(
             poke_a_id=t1.name,
             poke_b_id=t2.name,
-            poke_a_moves=[t1.move],
-            poke_b_moves=[t2.move],
+            poke_a_moves=t1.moves,
+            poke_b_moves=t2.moves,
             poke_a_gender=t1.gender,
             poke_b_gender=t2.gender,
             poke_a_level=t1.level,
@@ -176,28 +259,182 @@ class TeamBattleManager:
             poke_a_stage=t1.stage,
             poke_b_stage=t2.stage,
             verbose=False,
+            profile=self.profile,
+            chart=self.chart,
         )
         winner = result["winner"]
         avg_hp = result["winner_hp"]
         if winner == "A":
-            t1.cur_hp = avg_hp
-            t2.cur_hp = 0
+            hp = [avg_hp, 0]
         else:
-            t1.cur_hp = 0
-            t2.cur_hp = avg_hp
-        self.battle_log.append(f"Deterministic battle. Winner: {winner} (HP: {avg_hp})")
+            hp = [0, avg_hp]
+        active = [self.team_a.active_idx, self.team_b.active_idx]
+        self.apply_exchange(active, hp, winner)
+        if self.journal:
+            self.journal.append("exchange", active=active, hp=hp, winner=winner)
+        if self.ratings:
+            self.ratings.record_exchange(t1.name, t1.level, t2.name, t2.level, winner)
+
+    def apply_exchange(self, active, hp, winner):
+        """
+        Sets the outcome of one exchange; also used to replay a journal.
+        """
+        self._set_state(self.state.exchange(active, hp))
+        self._update_counter_picks()
+        self.battle_log.append(
+            f"Deterministic battle. Winner: {winner} (HP: {max(hp)})"
+        )
+        fainted = [
+            f"roster:{self.teams.index(team)}"
+            for team in (self.team_a, self.team_b)
+            if not team.get_active().is_alive()
+        ]
+        self._changed("battlers", "log", *fainted)
+
+    def _update_counter_picks(self):
+        idx_a, idx_b = self.team_a.active_idx, self.team_b.active_idx
+        hp_a, hp_b = self.team_a.get_active().cur_hp, self.team_b.get_active().cur_hp
+        self.counter_picks[0].update_our_hp(idx_a, hp_a)
+        self.counter_picks[0].update_their_hp(idx_b, hp_b)
+        self.counter_picks[1].update_our_hp(idx_b, hp_b)
+        self.counter_picks[1].update_their_hp(idx_a, hp_a)
+
+    def rank_substitutes(self, team_idx):
+        """
+        Alive bench of a team, best counter to the opposing Pokémon first:
+        a list of (idx, wrapper, result, hp_left). If the opposing active has
+        fainted too, ranks against the one it will most likely send next.
+        """
+        team = self.team_a if team_idx == 0 else self.team_b
+        opp = self.team_b if team_idx == 0 else self.team_a
+        opp_idx = opp.active_idx
+        if not opp.get_active().is_alive():
+            opp_idx = opp.next_alive_idx()
+        if opp_idx is None:
+            return [
+                (i, pw, None, None)
+                for i, pw in enumerate(team.pokemon_wrappers)
+                if pw.is_alive() and i != team.active_idx
+            ]
+        picks = self.counter_picks[team_idx].recommend(
+            opp_idx, exclude={team.active_idx}
+        )
+        return [
+            (i, team.pokemon_wrappers[i], result, hp_left)
+            for i, result, _, hp_left in picks
+        ]
 
     def is_battle_over(self):
         # This needs to be re-evaluated based on the local battle
         # For now, we can say a battle is over after one turn (one full simulation)
         return True
 
+    def is_finished(self):
+        return not (self.team_a.has_alive() and self.team_b.has_alive())
+
+    def pick_substitute(self, team_idx, policy="counter"):
+        """
+        Next Pokémon of a team under a substitution policy, or None if none
+        is left.
+        """
+        if policy == "roster":
+            team = self.team_a if team_idx == 0 else self.team_b
+            return team.next_alive_idx()
+        ranked = self.rank_substitutes(team_idx)
+        return ranked[0][0] if ranked else None
+
+    def pick_starters(self, policy="counter"):
+        """
+        Starters without dialogs: A leads with its first Pokémon and, under
+        the "counter" policy, B answers with its best counter.
+        """
+        a_idx = self.team_a.next_alive_idx()
+        b_idx = self.team_b.next_alive_idx()
+        if policy == "counter":
+            picks = self.counter_picks[1].recommend(a_idx, limit=1)
+            if picks:
+                b_idx = picks[0][0]
+        self.choose_starter(0, a_idx)
+        self.choose_starter(1, b_idx)
+
+    def auto_turn(self, policy="counter"):
+        """
+        One exchange, then fainted Pokémon are replaced under the policy.
+        """
+        self.do_battle_turn()
+        for idx, team in enumerate((self.team_a, self.team_b)):
+            if not team.get_active().is_alive():
+                new_idx = self.pick_substitute(idx, policy)
+                if new_idx is not None:
+                    self.handle_faint(idx, new_idx)
+
+    def play_out(self, policy="counter"):
+        """
+        Plays the battle to the end without a window.
+        """
+        while not self.is_finished():
+            self.auto_turn(policy)
+
     def handle_faint(self, team_idx, new_idx):
-        if team_idx == 0:
-            self.team_a.active_idx = new_idx
-        else:
-            self.team_b.active_idx = new_idx
+        self._set_state(self.state.with_active(team_idx, new_idx))
+        if self.journal:
+            self.journal.append("substitute", side=team_idx, idx=new_idx)
         self.start_new_battle()
+        self._changed("battlers", "log")
+
+    def choose_starter(self, team_idx, idx):
+        self._set_state(self.state.with_active(team_idx, idx))
+        if self.journal:
+            self.journal.append("starter", side=team_idx, idx=idx)
+        self._changed("battlers")
+
+    def team_hp(self):
+        return self.state.to_dict()["hp"]
+
+    def restore(self, battle):
+        """
+        Restores HP and active Pokémon from a journaled battle state.
+        """
+        active = [
+            current if idx is None else idx
+            for idx, current in zip(battle["active"], self.state.active)
+        ]
+        self._set_state(
+            battle_state.BattleState.initial(battle["hp"], active), undoable=False
+        )
+        for index in self.counter_picks:
+            index.sync()
+        self.battle_log.append("Battle restored from journal")
+        self._changed()
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self):
+        """
+        Steps back over the last exchange, substitution or starter choice.
+        Ratings already recorded for an exchange are kept.
+        """
+        if self.undo_stack:
+            self.redo_stack.append(self.state)
+            self._step(self.undo_stack.pop(), "undo")
+
+    def redo(self):
+        if self.redo_stack:
+            self.undo_stack.append(self.state)
+            self._step(self.redo_stack.pop(), "redo")
+
+    def _step(self, state, kind):
+        self._set_state(state, undoable=False)
+        for index in self.counter_picks:
+            index.sync()
+        if self.journal:
+            self.journal.append(kind, **state.to_dict())
+        self.battle_log.append("Undone" if kind == "undo" else "Redone")
+        self._changed()
 
     def get_team_status(self, team):
         return [
@@ -206,19 +443,197 @@ class TeamBattleManager:
         ]
 
 
+class RefreshScheduler:
+    """
+    Coalesces window refreshes. mark() flags regions as dirty and schedules
+    one repaint pass for the next event-loop iteration, which calls the
+    painter of every dirty region once, in the order given.
+    """
+
+    def __init__(self, parent, painters):
+        self.painters = painters  # {region: callable}
+        self.dirty = set()
+        self._timer = QTimer(parent)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+    def mark(self, *regions):
+        """
+        Flags regions as dirty; no regions means all of them.
+        """
+        self.dirty.update(regions or self.painters)
+        if not self._timer.isActive():
+            self._timer.start(0)
+
+    def flush(self):
+        self._timer.stop()
+        dirty, self.dirty = self.dirty, set()
+        for region, paint in self.painters.items():
+            if region in dirty:
+                paint()
+
+
+def _hp_ramp(steps=HP_RAMP_STEPS):
+    # ramp[k] is the color at k/steps of max HP
+    ramp = []
+    for k in range(steps + 1):
+        color = next((c for t, c in HP_BANDS if k / steps > t), HP_BANDS[-1][1])
+        ramp.append(QColor(color))
+    return ramp
+
+
+class HpBar(QWidget):
+    """
+    HP bar that paints itself. The color is looked up in a precomputed ramp
+    instead of restyling the widget, and all running animations are stepped
+    by one shared timer, which only repaints a bar when its fill moves by a
+    pixel.
+    """
+
+    RAMP = _hp_ramp()
+    BACKGROUND = QColor("#222")
+    TEXT = QColor("#fff")
+    RADIUS = 8
+
+    _animating = set()
+    _timer = None
+    _clock = None
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.hp = 0
+        self.max_hp = 1
+        self.shown = 0.0  # HP currently drawn, behind hp while animating
+        self._from = 0.0
+        self._start = 0
+        self.setFixedHeight(22)
+
+    def set_hp(self, hp, max_hp, animate=False):
+        """
+        Sets the HP; a decrease slides down over HP_ANIMATION_MS if animate.
+        """
+        decreasing = hp < self.hp
+        self.hp, self.max_hp = hp, max(1, max_hp)
+        if animate and decreasing:
+            self._from = self.shown
+            self._start = self._now()
+            HpBar._animating.add(self)
+            if not HpBar._timer.isActive():
+                HpBar._timer.start(HP_FRAME_MS)
+        else:
+            HpBar._animating.discard(self)
+            self.shown = hp
+        self.update()
+
+    def stop(self):
+        """
+        Ends any animation and empties the bar without animating.
+        """
+        HpBar._animating.discard(self)
+        self.hp = self.shown = 0
+        self.update()
+
+    @classmethod
+    def _now(cls):
+        if cls._timer is None:
+            cls._clock = QElapsedTimer()
+            cls._clock.start()
+            cls._timer = QTimer()
+            cls._timer.timeout.connect(cls._tick)
+        return cls._clock.elapsed()
+
+    @classmethod
+    def _tick(cls):
+        now = cls._now()
+        for bar in list(cls._animating):
+            if sip.isdeleted(bar):
+                cls._animating.discard(bar)
+                continue
+            t = min(1.0, (now - bar._start) / HP_ANIMATION_MS)
+            before = bar._fill()
+            bar.shown = bar._from + (bar.hp - bar._from) * t
+            if bar._fill() != before:
+                bar.update()
+            if t >= 1.0:
+                cls._animating.discard(bar)
+        if not cls._animating:
+            cls._timer.stop()
+
+    def _fill(self):
+        # (fill width in pixels, ramp index)
+        ratio = min(1.0, max(0.0, self.shown / self.max_hp))
+        return round(ratio * self.width()), math.ceil(ratio * HP_RAMP_STEPS)
+
+    def paintEvent(self, event):
+        width, step = self._fill()
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self.BACKGROUND)
+        painter.drawRoundedRect(QRectF(self.rect()), self.RADIUS, self.RADIUS)
+        if width > 0:
+            painter.setBrush(self.RAMP[step])
+            painter.drawRoundedRect(
+                QRectF(0, 0, width, self.height()), self.RADIUS, self.RADIUS
+            )
+        painter.setPen(self.TEXT)
+        painter.drawText(
+            self.rect(), Qt.AlignCenter, f"{int(self.hp)}/{int(self.max_hp)} HP"
+        )
+        painter.end()
+
+
 class MainWindow(QMainWindow):
-    def __init__(self, manager):
+    def __init__(self, manager, prompt_starters=True):
         super().__init__()
-        self.manager = manager
+        self.manager = None
         self.setWindowTitle("Pokémon Team Battle Visualizer")
-        self._hp_animations = []  # Store HP bar animations
-        self._last_hp1 = None
-        self._last_hp2 = None
+        self.animate = True  # off at auto-play speeds above the animation
+        self.on_finished = None  # called once when a team is out of Pokémon
+        self.auto_policy = None
+        self._auto_timer = None
         self.init_ui()
-        self._prompted_starting = False
+        painters = {"battlers": self._paint_battlers, "log": self._paint_log}
+        for i in range(len(self.team_layouts)):
+            painters[f"roster:{i}"] = lambda i=i: self._paint_roster(i)
+        self.refresh = RefreshScheduler(self, painters)
+        self.bind(manager, prompt_starters)
+
+    def bind(self, manager, prompt_starters=True):
+        """
+        Shows a battle in this window, replacing the one shown before. A
+        tournament keeps one window and rebinds it for every battle.
+        """
+        self.unbind()
+        self.manager = manager
+        manager.on_change = self.refresh.mark
+        self.next_turn_btn.setEnabled(True)
+        # Starters are already known when resuming or replaying a journal
+        self._prompted_starting = not prompt_starters
         self.update_ui()
         self.prompt_starting_pokemon_if_needed()
 
+    def unbind(self):
+        """
+        Tears down the bound battle: stops auto-play and HP animations,
+        deletes the roster tiles, clears the battler pixmaps and releases the
+        manager, so nothing of a finished battle stays reachable.
+        """
+        self.stop_auto_play()
+        self.on_finished = None
+        self.auto_policy = None
+        self.animate = True
+        self.poke1_hp.stop()
+        self.poke2_hp.stop()
+        self.poke1_img.clear()
+        self.poke2_img.clear()
+        for layout in self.team_layouts:
+            layout["model"].set_entries([])
+        self.refresh.dirty.clear()
+        if self.manager is not None:
+            self.manager.on_change = None
+            self.manager = None
+
     def prompt_starting_pokemon_if_needed(self):
         # Only prompt once at the very start
         if getattr(self, "_prompted_starting", False):
@@ -232,8 +647,7 @@ class MainWindow(QMainWindow):
                 continue
             dialog = StartingPokemonDialog(team.name, alive_pokemon, self)
             if dialog.exec_() == QDialog.Accepted:
-                team.active_idx = dialog.selected_pokemon_index
-        self.update_ui()
+                self.manager.choose_starter(idx, dialog.selected_pokemon_index)
 
     def init_ui(self):
         main_layout = QVBoxLayout()
@@ -272,9 +686,7 @@ class MainWindow(QMainWindow):
         self.poke1_img = QLabel()
         self.poke1_img.setAlignment(Qt.AlignCenter)
         self.poke1_img.setFixedSize(240, 240)
-        self.poke1_hp = QProgressBar()
-        self.poke1_hp.setMaximum(100)
-        self.poke1_hp.setTextVisible(True)
+        self.poke1_hp = HpBar()
         self.poke1_hp.setFixedWidth(180)
         poke1_frame_layout.addWidget(self.trainer1_name)
         poke1_frame_layout.addWidget(self.poke1_info)
@@ -304,9 +716,7 @@ class MainWindow(QMainWindow):
         self.poke2_img = QLabel()
         self.poke2_img.setAlignment(Qt.AlignCenter)
         self.poke2_img.setFixedSize(240, 240)
-        self.poke2_hp = QProgressBar()
-        self.poke2_hp.setMaximum(100)
-        self.poke2_hp.setTextVisible(True)
+        self.poke2_hp = HpBar()
         self.poke2_hp.setFixedWidth(180)
         poke2_frame_layout.addWidget(self.trainer2_name)
         poke2_frame_layout.addWidget(self.poke2_info)
@@ -329,13 +739,15 @@ class MainWindow(QMainWindow):
             trainer_name.setAlignment(Qt.AlignCenter)
             team_v_layout.addWidget(trainer_name)
 
-            roster_grid_widget = QWidget()
-            roster_grid_layout = QGridLayout()
-            roster_grid_widget.setLayout(roster_grid_layout)
-            team_v_layout.addWidget(roster_grid_widget)
+            roster_model = RosterModel(parent=self)
+            roster_view = RosterView(roster_model)
+            roster_view.setMinimumHeight(2 * ROSTER_TILE.height() + 8)
+            team_v_layout.addWidget(roster_view)
 
             team_layout.addWidget(team_container)
-            self.team_layouts.append({"name": trainer_name, "grid": roster_grid_layout})
+            self.team_layouts.append(
+                {"name": trainer_name, "model": roster_model, "view": roster_view}
+            )
             self.team_containers.append(team_container)
 
         # Add a stylish vertical separator between the two teams in the battle window
@@ -357,11 +769,23 @@ class MainWindow(QMainWindow):
         self.battle_log.setReadOnly(True)
         log_layout.addWidget(self.battle_log)
 
-        # Next turn button
+        # Next turn button, between undo and redo (also Ctrl+Z / Ctrl+Shift+Z)
+        button_layout = QHBoxLayout()
+        self.undo_btn = QPushButton("Undo")
+        self.undo_btn.setStyleSheet(button_style)
+        self.undo_btn.clicked.connect(self.undo)
         self.next_turn_btn = QPushButton("Battle")
         self.next_turn_btn.setStyleSheet(button_style)
         self.next_turn_btn.clicked.connect(self.next_turn)
-        log_layout.addWidget(self.next_turn_btn)
+        self.redo_btn = QPushButton("Redo")
+        self.redo_btn.setStyleSheet(button_style)
+        self.redo_btn.clicked.connect(self.redo)
+        button_layout.addWidget(self.undo_btn)
+        button_layout.addWidget(self.next_turn_btn, 1)
+        button_layout.addWidget(self.redo_btn)
+        log_layout.addLayout(button_layout)
+        QShortcut(QKeySequence.Undo, self, activated=self.undo)
+        QShortcut(QKeySequence.Redo, self, activated=self.redo)
 
         # Main layout
         main_layout.addLayout(battle_area_layout)
@@ -375,45 +799,19 @@ class MainWindow(QMainWindow):
         # Remove any frame/border from labels and health bars
         label_style = "font-size: 18px; font-weight: bold; color: #fff; background: none; border: none;"
         info_style = "font-size: 15px; color: #fff; background: none; border: none;"
-        hp_style = (
-            "QProgressBar { background: #222; border: none; border-radius: 8px; color: #fff; } "
-            "QProgressBar::chunk { border-radius: 8px; background-color: #4caf50; border: none; }"
-        )
         self.trainer1_name.setStyleSheet(label_style)
         self.trainer2_name.setStyleSheet(label_style)
         self.poke1_info.setStyleSheet(info_style)
         self.poke2_info.setStyleSheet(info_style)
-        self.poke1_hp.setStyleSheet(hp_style)
-        self.poke2_hp.setStyleSheet(hp_style)
-
-    def animate_hp_bar(self, bar, start, end, max_hp):
-        # Animate the HP bar from start to end value, updating color as it animates
-        animation = QPropertyAnimation(bar, b"value")
-        animation.setDuration(600)
-        animation.setStartValue(int(start))
-        animation.setEndValue(int(end))
-        animation.valueChanged.connect(
-            lambda val: self.update_hp_bar_color(bar, val, max_hp)
-        )
-        animation.finished.connect(lambda: self.update_hp_bar_color(bar, end, max_hp))
-        animation.start()
-        # Store reference to prevent garbage collection
-        if not hasattr(self, "_hp_animations"):
-            self._hp_animations = []
-        self._hp_animations.append(animation)
-        # Clean up finished animations
-        animation.finished.connect(lambda: self._hp_animations.remove(animation))
-
-    def update_hp_bar_color(self, bar, value, max_hp):
-        ratio = value / max_hp if max_hp else 0
-        if ratio > 0.5:
-            bar.setStyleSheet("QProgressBar::chunk {background-color: #4caf50;}")
-        elif ratio > 0.2:
-            bar.setStyleSheet("QProgressBar::chunk {background-color: #ffb300;}")
-        else:
-            bar.setStyleSheet("QProgressBar::chunk {background-color: #e53935;}")
 
     def update_ui(self):
+        """
+        Repaints everything now; state changes only repaint what they touched.
+        """
+        self.refresh.mark()
+        self.refresh.flush()
+
+    def _paint_battlers(self):
         poke1, poke2 = self.manager.get_current_battlers()
         color1 = self.trainer_colors.get(self.manager.team_a.name, "#fff")
         color2 = self.trainer_colors.get(self.manager.team_b.name, "#fff")
@@ -446,32 +844,10 @@ class MainWindow(QMainWindow):
                 pad_color="#fff",
             )
         )
-        self.poke1_hp.setMaximum(int(poke1.max_hp))
-        self.poke2_hp.setMaximum(int(poke2.max_hp))
-        # Animate HP bars if values changed and HP is decreasing
-        if not hasattr(self, "_last_hp1") or self._last_hp1 is None:
-            self._last_hp1 = poke1.cur_hp
-        if not hasattr(self, "_last_hp2") or self._last_hp2 is None:
-            self._last_hp2 = poke2.cur_hp
-        # Only animate if HP is decreasing
-        if int(self._last_hp1) > int(poke1.cur_hp):
-            self.animate_hp_bar(
-                self.poke1_hp, self._last_hp1, poke1.cur_hp, poke1.max_hp
-            )
-        else:
-            self.update_hp_bar_color(self.poke1_hp, poke1.cur_hp, poke1.max_hp)
-            self.poke1_hp.setValue(int(poke1.cur_hp))
-        if int(self._last_hp2) > int(poke2.cur_hp):
-            self.animate_hp_bar(
-                self.poke2_hp, self._last_hp2, poke2.cur_hp, poke2.max_hp
-            )
-        else:
-            self.update_hp_bar_color(self.poke2_hp, poke2.cur_hp, poke2.max_hp)
-            self.poke2_hp.setValue(int(poke2.cur_hp))
-        self._last_hp1 = poke1.cur_hp
-        self._last_hp2 = poke2.cur_hp
-        self.poke1_hp.setFormat(f"{int(poke1.cur_hp)}/{int(poke1.max_hp)} HP")
-        self.poke2_hp.setFormat(f"{int(poke2.cur_hp)}/{int(poke2.max_hp)} HP")
+        # HP bars only animate when HP is decreasing
+        self.poke1_hp.set_hp(poke1.cur_hp, poke1.max_hp, self.animate)
+        self.poke2_hp.set_hp(poke2.cur_hp, poke2.max_hp, self.animate)
+        self._paint_history()
 
         # Show only the two currently fighting trainers' teams
         for i, container in enumerate(self.team_containers):
@@ -480,70 +856,114 @@ class MainWindow(QMainWindow):
             else:
                 container.hide()
 
-        for i, team in enumerate(self.manager.teams):
-            # Clear previous widgets from grid
-            for j in reversed(range(self.team_layouts[i]["grid"].count())):
-                widget_to_remove = self.team_layouts[i]["grid"].itemAt(j).widget()
-                widget_to_remove.setParent(None)
-
-            self.team_layouts[i]["name"].setText(team.name)
-
-            row, col = 0, 0
-            for pw in team.pokemon_wrappers:
-                if pw.level <= 0:
-                    continue
-                icon = QLabel()
-                icon.setPixmap(get_square_icon(pw.img, size=56))
-
-                name = QLabel(pw.name)
-                level = QLabel(f"Lv. {pw.level}")
-                level.setAlignment(Qt.AlignCenter)
-
-                poke_widget = QWidget()
-                poke_layout = QVBoxLayout()
-                poke_widget.setLayout(poke_layout)
-                poke_layout.addWidget(icon)
-                poke_layout.addWidget(name)
-                poke_layout.addWidget(level)
+    def _paint_history(self):
+        # Undo and redo only while the battle can be played by hand
+        playable = self.next_turn_btn.isEnabled() and self._auto_timer is None
+        self.undo_btn.setEnabled(playable and self.manager.can_undo())
+        self.redo_btn.setEnabled(playable and self.manager.can_redo())
 
-                if not pw.is_alive():
-                    opacity_effect = QGraphicsOpacityEffect()
-                    opacity_effect.setOpacity(0.3)
-                    poke_widget.setGraphicsEffect(opacity_effect)
-
-                self.team_layouts[i]["grid"].addWidget(poke_widget, row, col)
-                col += 1
-                if col > 3:  # 4 pokemon per row
-                    col = 0
-                    row += 1
+    def _paint_roster(self, i):
+        if i >= len(self.manager.teams):
+            return
+        team = self.manager.teams[i]
+        layout = self.team_layouts[i]
+        model = layout["model"]
+        if model.team is not team:
+            layout["name"].setText(team.name)
+            entries = [
+                (j, pw, None)
+                for j, pw in enumerate(team.pokemon_wrappers)
+                if pw.level > 0
+            ]
+            model.set_entries(entries, team)
+        else:
+            # Same tiles, only fainted dimming changed
+            model.refresh()
 
+    def _paint_log(self):
         self.battle_log.setText(self.manager.get_battle_log())
 
     def next_turn(self):
-        prev1 = self.manager.team_a.get_active().cur_hp
-        prev2 = self.manager.team_b.get_active().cur_hp
         self.manager.do_battle_turn()
-        # Animate HP bars after battle
-        self.update_ui()
+        # The exchange is painted before any substitution dialog blocks
+        self.refresh.flush()
+        self.handle_fainted()
+        self._check_finished()
+
+    def undo(self):
+        # Undoing a substitution brings its dialog back
+        if self.undo_btn.isEnabled():
+            self.manager.undo()
+            self._after_step()
+
+    def redo(self):
+        if self.redo_btn.isEnabled():
+            self.manager.redo()
+            self._after_step()
+
+    def _after_step(self):
+        self.refresh.flush()
+        if not self.manager.is_finished():
+            self.handle_fainted()
+        self._check_finished()
+
+    def start_auto_play(self, interval_ms, policy="counter"):
+        """
+        Plays one exchange every interval_ms, substituting under the policy
+        instead of asking, with at most one redraw per frame.
+        """
+        self.auto_policy = policy
+        self.animate = interval_ms > HP_ANIMATION_MS
+        self.next_turn_btn.setEnabled(False)
+        self.undo_btn.setEnabled(False)
+        self.redo_btn.setEnabled(False)
+        self._auto_interval = max(1, interval_ms)
+        self._auto_played = 0
+        self._auto_clock = QElapsedTimer()
+        self._auto_clock.start()
+        self._auto_timer = QTimer(self)
+        self._auto_timer.timeout.connect(self.auto_step)
+        self._auto_timer.start(max(AUTO_PLAY_FRAME_MS, interval_ms))
+
+    def stop_auto_play(self):
+        if self._auto_timer is not None:
+            self._auto_timer.stop()
+            self._auto_timer = None
+
+    def auto_step(self):
+        # Below the frame time several exchanges are due per tick; the
+        # refresh scheduler still paints once
+        due = max(
+            self._auto_played + 1, self._auto_clock.elapsed() // self._auto_interval
+        )
+        while self._auto_played < due and not self.manager.is_finished():
+            self.manager.auto_turn(self.auto_policy)
+            self._auto_played += 1
+        self._check_finished()
 
-        # Handle fainted Pokémon
+    def _check_finished(self):
+        if not self.manager.is_finished():
+            return
+        self.stop_auto_play()
+        if self.on_finished is not None:
+            callback, self.on_finished = self.on_finished, None
+            callback()
+
+    def handle_fainted(self):
         for idx, team in enumerate([self.manager.team_a, self.manager.team_b]):
             if not team.get_active().is_alive():
                 # Prompt for substitution
                 self.prompt_substitute(idx)
-        self.update_ui()
 
     def prompt_substitute(self, team_idx):
         team = self.manager.team_a if team_idx == 0 else self.manager.team_b
-        alive_pokemon = [
-            (i, pw)
-            for i, pw in enumerate(team.pokemon_wrappers)
-            if pw.is_alive() and i != team.active_idx
-        ]
+        # Best counter-picks first
+        ranked = self.manager.rank_substitutes(team_idx)
+        alive_pokemon = [(i, pw) for i, pw, _, _ in ranked]
+        hints = {i: (result, hp_left) for i, _, result, hp_left in ranked}
         if not alive_pokemon:
-            self.battle_log.append(
-                f"No available Pokémon to substitute for {team.name}!"
-            )
+            log = self.manager.battle_log
+            log.append(f"No available Pokémon to substitute for {team.name}!")
             # Check for game over
             if (
                 not self.manager.team_a.has_alive()
@@ -554,213 +974,22 @@ class MainWindow(QMainWindow):
                     if self.manager.team_a.has_alive()
                     else self.manager.team_b.name
                 )
-                self.battle_log.append(f"Game Over! {winner} wins!")
+                log.append(f"Game Over! {winner} wins!")
                 self.next_turn_btn.setDisabled(True)
+            self.refresh.mark("log")
             return
 
-        dialog = SubstitutionDialog(team.name, alive_pokemon, self)
+        dialog = SubstitutionDialog(team.name, alive_pokemon, self, hints)
         if dialog.exec_() == QDialog.Accepted:
             new_idx = dialog.selected_pokemon_index
             self.manager.handle_faint(team_idx, new_idx)
-            self.update_ui()
-
-
-# --- Starting Pokémon selection dialog (Czech) ---
-class StartingPokemonDialog(QDialog):
-    def __init__(self, trainer_name, available_pokemon, parent=None):
-        super().__init__(parent)
-        self.setWindowTitle(f"{trainer_name}, vyberte si startovního Pokémona!")
-        self.selected_pokemon_index = -1
-        layout = QGridLayout()
-        self.setLayout(layout)
-        for i, (idx, pw) in enumerate(available_pokemon):
-            icon = QLabel()
-            icon.setPixmap(get_square_icon(pw.img, size=60))
-
-            name = QLabel(pw.name)
-            level = QLabel(f"Lv. {pw.level}")
-
-            btn = QPushButton("Vybrat")
-            btn.clicked.connect(lambda _, index=idx: self._select_pokemon(index))
 
-            layout.addWidget(icon, i, 0)
-            layout.addWidget(name, i, 1)
-            layout.addWidget(level, i, 2)
-            layout.addWidget(btn, i, 3)
 
-    def _select_pokemon(self, index):
-        self.selected_pokemon_index = index
-        self.accept()
-
-
-class TournamentWindow(QMainWindow):
-    def __init__(self, teams_config, pokemon_stages):
-        super().__init__()
-        self.setWindowTitle("Pokémon Tournament")
-        self.teams_config = teams_config
-        self.pokemon_stages = pokemon_stages
-        self.trainers = [team["trainer"] for team in teams_config]
-        self.scores = {trainer: 0 for trainer in self.trainers}
-        self.battle_pairs = self._generate_battle_pairs()
-        self.current_battle_idx = 0
-        self.battle_windows = []
-        self.init_ui()
-        self.update_ui()
-
-    def _generate_battle_pairs(self):
-        pairs = []
-        n = len(self.trainers)
-        for i in range(n):
-            for j in range(i + 1, n):
-                pairs.append((i, j))
-        return pairs
-
-    def init_ui(self):
-        main_layout = QVBoxLayout()
-        self.score_labels = []
-        score_layout = QHBoxLayout()
-        for trainer in self.trainers:
-            vbox = QVBoxLayout()
-            name_label = QLabel(trainer)
-            name_label.setAlignment(Qt.AlignCenter)
-            # Set trainer color from config
-            color = next(
-                (t["color"] for t in self.teams_config if t["trainer"] == trainer),
-                "#fff",
-            )
-            name_label.setStyleSheet(
-                f"font-size: 18px; font-weight: bold; color: {color}; background: none; border: none;"
-            )
-            score_label = QLabel("Score: 0")
-            score_label.setAlignment(Qt.AlignCenter)
-            self.score_labels.append(score_label)
-            vbox.addWidget(name_label)
-            vbox.addWidget(score_label)
-            # Team roster
-            team = next(t for t in self.teams_config if t["trainer"] == trainer)
-            grid = QGridLayout()
-            row, col = 0, 0
-            for poke in team["pokemon"]:
-                if poke["level"] <= 0:
-                    continue
-                poke_name = self.pokemon_stages[poke["name"]][str(poke["stage"])]
-                icon = QLabel()
-                icon.setPixmap(
-                    get_square_icon(
-                        os.path.join(os.path.dirname(__file__), poke_name["img"]),
-                        size=40,
-                    )
-                )
-                poke_label = QLabel(f"Lv.{poke['level']} {poke_name['name']}")
-                poke_label.setAlignment(Qt.AlignCenter)
-                poke_widget = QVBoxLayout()
-                poke_widget.addWidget(icon)
-                poke_widget.addWidget(poke_label)
-                grid.addLayout(poke_widget, row, col)
-                col += 1
-                if col > 2:
-                    col = 0
-                    row += 1
-            vbox.addLayout(grid)
-            score_layout.addLayout(vbox)
-        main_layout.addLayout(score_layout)
-        # Add a stylish vertical separator between teams in the tournament window
-        for i in range(score_layout.count() - 1):
-            separator = QWidget()
-            separator.setFixedWidth(10)
-            separator.setMinimumHeight(120)
-            separator.setStyleSheet(
-                """
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #e0e0e0, stop:0.5 #bdbdbd, stop:1 #e0e0e0);
-                border-radius: 5px;
-                margin-left: 8px;
-                margin-right: 8px;
-                """
-            )
-            score_layout.insertWidget(2 * i + 1, separator)
-        # Next battle button
-        self.next_battle_btn = QPushButton("Start Next Battle")
-        self.next_battle_btn.clicked.connect(self.start_next_battle)
-        main_layout.addWidget(self.next_battle_btn)
-        self.status_label = QLabel()
-        self.status_label.setAlignment(Qt.AlignCenter)
-        main_layout.addWidget(self.status_label)
-        central = QWidget()
-        central.setLayout(main_layout)
-        self.setCentralWidget(central)
-
-    def update_ui(self):
-        for i, trainer in enumerate(self.trainers):
-            self.score_labels[i].setText(f"Score: {self.scores[trainer]}")
-        if self.current_battle_idx < len(self.battle_pairs):
-            a, b = self.battle_pairs[self.current_battle_idx]
-            self.status_label.setText(f"Next: {self.trainers[a]} vs {self.trainers[b]}")
-            self.next_battle_btn.setEnabled(True)
-        else:
-            self.status_label.setText("Tournament finished!")
-            self.next_battle_btn.setEnabled(False)
-
-    def start_next_battle(self):
-        if self.current_battle_idx >= len(self.battle_pairs):
-            return
-        a_idx, b_idx = self.battle_pairs[self.current_battle_idx]
-        # Create a new TeamBattleManager for this battle
-        teams = [self.teams_config[a_idx], self.teams_config[b_idx]]
-        # Patch global config for TeamBattleManager
-        global TEAMS_CONFIG
-        TEAMS_CONFIG = teams
-        battle_manager = TeamBattleManager()
-        battle_window = MainWindow(battle_manager)
-        battle_window.setWindowTitle(
-            f"Battle: {self.trainers[a_idx]} vs {self.trainers[b_idx]}"
-        )
-        battle_window.show()
-        self.battle_windows.append(battle_window)
-
-        # Connect to battle end
-        def on_battle_end():
-            # Determine winner
-            team_a_alive = any(
-                pw.is_alive() for pw in battle_manager.team_a.pokemon_wrappers
-            )
-            team_b_alive = any(
-                pw.is_alive() for pw in battle_manager.team_b.pokemon_wrappers
-            )
-            winner = None
-            if team_a_alive and not team_b_alive:
-                self.scores[self.trainers[a_idx]] += 1
-                winner = self.trainers[a_idx]
-            elif team_b_alive and not team_a_alive:
-                self.scores[self.trainers[b_idx]] += 1
-                winner = self.trainers[b_idx]
-            if winner:
-                from PyQt5.QtWidgets import QMessageBox
-
-                msg = QMessageBox(self)
-                msg.setWindowTitle("Battle Result")
-                msg.setText(f"{winner} wins this battle!")
-                msg.setIcon(QMessageBox.Information)
-                msg.exec_()
-            # Close battle window and update
-            battle_window.close()
-            self.current_battle_idx += 1
-            self.update_ui()
-
-        # Patch MainWindow to call on_battle_end when battle is over
-        orig_next_turn = battle_window.next_turn
-
-        def patched_next_turn():
-            orig_next_turn()
-            if (
-                not battle_manager.team_a.has_alive()
-                or not battle_manager.team_b.has_alive()
-            ):
-                on_battle_end()
-
-        battle_window.next_turn = patched_next_turn
-        battle_window.next_turn_btn.clicked.disconnect()
-        battle_window.next_turn_btn.clicked.connect(battle_window.next_turn)
-        self.update_ui()
+# Icons are redrawn on every refresh; decoding and scaling the image each
+# time dominated the cost of a refresh. Least recently used icons are
+# dropped beyond ICON_CACHE_SIZE, so long events do not keep every pixmap
+ICON_CACHE_SIZE = 256
+_icon_cache = OrderedDict()
 
 
 def get_square_icon(
@@ -769,6 +998,17 @@ def get_square_icon(
     """
     Returns a square QPixmap of given size, with the image centered, padded, and a border.
     """
+    key = (img_path, size, border_color, border_width, pad_color)
+    if key in _icon_cache:
+        _icon_cache.move_to_end(key)
+    else:
+        _icon_cache[key] = _draw_square_icon(*key)
+        if len(_icon_cache) > ICON_CACHE_SIZE:
+            _icon_cache.popitem(last=False)
+    return _icon_cache[key]
+
+
+def _draw_square_icon(img_path, size, border_color, border_width, pad_color):
     pixmap = QPixmap(img_path)
     if pixmap.isNull():
         # fallback: blank
@@ -801,62 +1041,312 @@ def get_square_icon(
     return square
 
 
-class SubstitutionDialog(QDialog):
-    def __init__(self, trainer_name, alive_pokemon, parent=None):
+# Hint label per counter-pick result
+SUBSTITUTION_HINTS = {
+    counter_picks.WIN: ("Likely win ({hp} HP left)", "#2e7d32"),
+    counter_picks.TIE: ("Coin flip", "#f9a825"),
+    counter_picks.LOSS: ("Likely loss", "#c62828"),
+}
+
+
+# --- Roster model/view ---
+# Rosters and pickers are list views over a model: only the visible entries
+# are painted, each from a cached thumbnail, so a roster of 100+ Pokémon
+# costs no more widgets than one of 8
+ROSTER_TILE = QSize(104, 100)
+PICKER_ROW_HEIGHT = 68
+PICKER_VISIBLE_ROWS = 6
+THUMBNAIL_SIZE = 56
+
+
+class RosterModel(QAbstractListModel):
+    """
+    Roster entries as list rows: (roster index, PokemonWrapper, hint), hint
+    being a counter-pick (result, hp_left) or None.
+    """
+
+    EntryRole = Qt.UserRole + 1
+
+    def __init__(self, entries=(), parent=None):
         super().__init__(parent)
-        self.setWindowTitle(f"{trainer_name}, choose your next Pokémon!")
-        self.selected_pokemon_index = -1
+        self.entries = list(entries)
+        self.team = None  # TrainerTeam the entries come from, if any
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self.entries[index.row()]
+        if role == Qt.DisplayRole:
+            return f"Lv. {entry[1].level} {entry[1].name}"
+        if role == self.EntryRole:
+            return entry
+        return None
+
+    def set_entries(self, entries, team=None):
+        self.beginResetModel()
+        self.entries = list(entries)
+        self.team = team
+        self.endResetModel()
+
+    def refresh(self):
+        # HP or fainted state changed, the rows did not
+        if self.entries:
+            self.dataChanged.emit(self.index(0), self.index(len(self.entries) - 1))
+
+
+class RosterDelegate(QStyledItemDelegate):
+    """
+    Paints an entry from its cached thumbnail: a tile with the name and
+    level below, or a picker row with the counter-pick hint. Fainted
+    Pokémon are dimmed.
+    """
+
+    def __init__(self, tiles=True, parent=None):
+        super().__init__(parent)
+        self.tiles = tiles
+
+    def sizeHint(self, option, index):
+        if self.tiles:
+            return ROSTER_TILE
+        return QSize(360, PICKER_ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        _, pw, hint = index.data(RosterModel.EntryRole)
+        rect = option.rect
+        painter.save()
+        text_role = QPalette.Text
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(rect, option.palette.highlight())
+            text_role = QPalette.HighlightedText
+        painter.setPen(option.palette.color(text_role))
+        if not pw.is_alive():
+            painter.setOpacity(0.3)
+        icon = get_square_icon(pw.img, size=THUMBNAIL_SIZE)
+        label = f"{pw.name}\nLv. {pw.level}"
+        if self.tiles:
+            painter.drawPixmap(
+                rect.x() + (rect.width() - THUMBNAIL_SIZE) // 2, rect.y() + 2, icon
+            )
+            text = rect.adjusted(0, THUMBNAIL_SIZE + 4, 0, 0)
+            painter.drawText(text, Qt.AlignHCenter | Qt.AlignTop, label)
+        else:
+            top = rect.y() + (rect.height() - THUMBNAIL_SIZE) // 2
+            painter.drawPixmap(rect.x() + 4, top, icon)
+            text = rect.adjusted(THUMBNAIL_SIZE + 12, 0, -8, 0)
+            painter.drawText(text, Qt.AlignLeft | Qt.AlignVCenter, label)
+            result, hp_left = hint or (None, None)
+            if result is not None:
+                hint_text, color = SUBSTITUTION_HINTS.get(result, ("", "#000"))
+                star = "★ " if index.row() == 0 else ""
+                font = painter.font()
+                font.setBold(True)
+                painter.setFont(font)
+                painter.setPen(QColor(color))
+                painter.drawText(
+                    text,
+                    Qt.AlignRight | Qt.AlignVCenter,
+                    star + hint_text.format(hp=hp_left),
+                )
+        painter.restore()
+
+
+class RosterView(QListView):
+    """
+    Virtualized view over a RosterModel: wrapping tiles, or picker rows.
+    """
 
-        layout = QGridLayout()
+    def __init__(self, model, tiles=True, parent=None):
+        super().__init__(parent)
+        self.setModel(model)
+        self.setItemDelegate(RosterDelegate(tiles, self))
+        self.setUniformItemSizes(True)
+        self.setEditTriggers(QListView.NoEditTriggers)
+        if tiles:
+            self.setViewMode(QListView.IconMode)
+            self.setResizeMode(QListView.Adjust)
+            self.setMovement(QListView.Static)
+            self.setWrapping(True)
+            self.setSelectionMode(QListView.NoSelection)
+
+
+class PokemonPickerDialog(QDialog):
+    """
+    Picks one of the entries (roster index, PokemonWrapper, hint): double
+    click a row, or select it and press the button.
+    """
+
+    def __init__(self, title, entries, button_text, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.selected_pokemon_index = -1
+        self.model = RosterModel(entries, self)
+        self.view = RosterView(self.model, tiles=False, parent=self)
+        rows = max(1, min(len(entries), PICKER_VISIBLE_ROWS))
+        self.view.setMinimumSize(420, rows * PICKER_ROW_HEIGHT + 4)
+        self.view.activated.connect(self._select_row)
+        if entries:
+            self.view.setCurrentIndex(self.model.index(0))
+        btn = QPushButton(button_text)
+        btn.clicked.connect(lambda: self._select_row(self.view.currentIndex()))
+        layout = QVBoxLayout()
+        layout.addWidget(self.view)
+        layout.addWidget(btn)
         self.setLayout(layout)
 
-        for i, (idx, pw) in enumerate(alive_pokemon):
-            icon = QLabel()
-            icon.setPixmap(get_square_icon(pw.img, size=60))
+    def _select_row(self, index):
+        if index.isValid():
+            self.selected_pokemon_index = self.model.entries[index.row()][0]
+            self.accept()
 
-            name = QLabel(pw.name)
-            level = QLabel(f"Lv. {pw.level}")
 
-            btn = QPushButton("Select")
-            btn.clicked.connect(lambda _, index=idx: self._select_pokemon(index))
+# --- Starting Pokémon selection dialog (Czech) ---
+class StartingPokemonDialog(PokemonPickerDialog):
+    def __init__(self, trainer_name, available_pokemon, parent=None):
+        super().__init__(
+            f"{trainer_name}, vyberte si startovního Pokémona!",
+            [(idx, pw, None) for idx, pw in available_pokemon],
+            "Vybrat",
+            parent,
+        )
 
-            layout.addWidget(icon, i, 0)
-            layout.addWidget(name, i, 1)
-            layout.addWidget(level, i, 2)
-            layout.addWidget(btn, i, 3)
 
-    def _select_pokemon(self, index):
-        self.selected_pokemon_index = index
-        self.accept()
+class SubstitutionDialog(PokemonPickerDialog):
+    def __init__(self, trainer_name, alive_pokemon, parent=None, hints=None):
+        # Rows come best counter-pick first
+        hints = hints or {}
+        super().__init__(
+            f"{trainer_name}, choose your next Pokémon!",
+            [(idx, pw, hints.get(idx)) for idx, pw in alive_pokemon],
+            "Select",
+            parent,
+        )
 
 
 class TournamentWindow(QMainWindow):
-    def __init__(self, teams_config, pokemon_stages):
+    def __init__(
+        self,
+        teams_config,
+        pokemon_stages,
+        tournament_format="round_robin",
+        tournament=None,
+        journal=None,
+        read_only=False,
+        ratings=None,
+        chart=None,
+    ):
         super().__init__()
         self.setWindowTitle("Pokémon Tournament")
+        self.journal = journal
+        self.ratings = ratings  # ratings.Ratings, updated after every battle
+        self.read_only = read_only
+        if journal is not None and journal.resumed:
+            # Resume where the journal left off
+            teams_config = journal.state.teams_config
+            chart = journal.state.chart
+        self.chart = chart  # type chart of every battle of the event
         self.teams_config = teams_config
         self.pokemon_stages = pokemon_stages
         self.trainers = [team["trainer"] for team in teams_config]
-        self.scores = {trainer: 0 for trainer in self.trainers}
-        self.battle_pairs = self._generate_battle_pairs()
-        self.current_battle_idx = 0
-        self.battle_windows = []
+        if journal is not None and journal.resumed:
+            self.tournament = journal.state.build_tournament()
+        else:
+            # Seed a new event by rating, strongest trainer first
+            players = None
+            if ratings is not None and tournament is None:
+                players = ratings.trainers.seed_order(self.trainers)
+            # A RemoteTournament makes this window a client of battle_service
+            self.tournament = tournament or tournament_formats.make_tournament(
+                tournament_format, self.trainers, players=players
+            )
+            if journal is not None:
+                journal.append(
+                    "tournament",
+                    format=tournament_format,
+                    teams_config=teams_config,
+                    players=players,
+                    chart=chart,
+                )
+        self.battle_window = None  # one battle view, rebound for every battle
+        self.analyses = None
+        self.auto_interval = None  # ms between exchanges while auto-playing
+        self.auto_policy = "counter"
+        self.init_ui()
+        self.refresh = RefreshScheduler(
+            self, {"scores": self._paint_scores, "status": self._paint_status}
+        )
+        self.update_ui()
+        if journal is not None and journal.state.battle:
+            self.start_next_battle(resume=journal.state.battle)
+        if isinstance(self.tournament, battle_service.RemoteTournament):
+            # Pick up results pushed by the service from other terminals
+            self._shown_version = self.tournament.version
+            self._refresh_timer = QTimer(self)
+            self._refresh_timer.timeout.connect(self._refresh_remote)
+            self._refresh_timer.start(250)
+
+    def watch_inputs(self, interval_ms=1000):
+        """
+        Picks up edits to the rosters, species and type chart while running:
+        later battles use the new rosters, and the panels and title odds are
+        refreshed. Only the analyses touched by an edit are recomputed.
+        """
+        import incremental  # needs NumPy, like the other analysis tools
+
+        self.analyses = incremental.Analyses()
+        self.analyses.refresh(incremental.load_inputs())
+        self._watcher = incremental.Watcher()
+        self._watch_timer = QTimer(self)
+        self._watch_timer.timeout.connect(self._poll_inputs)
+        self._watch_timer.start(interval_ms)
+        self.update_ui()
+
+    def _poll_inputs(self):
+        inputs = self._watcher.poll()
+        if inputs is None:
+            if self._watcher.error:
+                self.status_label.setText(
+                    f"Waiting for valid inputs: {self._watcher.error}"
+                )
+            return
+        trainers = [team["trainer"] for team in inputs["teams_config"]]
+        if trainers != self.trainers:
+            self.status_label.setText(
+                "Trainers changed: restart to use the new list"
+            )
+            return
+        try:
+            self.analyses.refresh(inputs)
+        except KeyError as e:
+            self.status_label.setText(f"Invalid inputs, unknown key {e}")
+            return
+        # PokemonWrapper reads the module-level stages: the species store,
+        # which load_inputs() rebuilds when pokemon_stages.json changed
+        global POKEMON_STAGES
+        POKEMON_STAGES = self.pokemon_stages = inputs["pokemon_stages"]
+        self.teams_config = inputs["teams_config"]
         self.init_ui()
         self.update_ui()
 
-    def _generate_battle_pairs(self):
-        pairs = []
-        n = len(self.trainers)
-        for i in range(n):
-            for j in range(i + 1, n):
-                pairs.append((i, j))
-        return pairs
+    def _refresh_remote(self):
+        if self.tournament.version != self._shown_version:
+            self._shown_version = self.tournament.version
+            self.refresh.mark()
 
     def init_ui(self):
         main_layout = QVBoxLayout()
         self.score_labels = []
+        self.standings_list = None
         score_layout = QHBoxLayout()
-        for trainer in self.trainers:
+        if len(self.trainers) > MAX_ROSTER_PANELS:
+            # Large events: one standings row per trainer
+            self.standings_list = QListWidget()
+            self.standings_list.setMinimumSize(420, 480)
+            score_layout.addWidget(self.standings_list)
+        panels = self.trainers if self.standings_list is None else []
+        for trainer in panels:
             vbox = QVBoxLayout()
             name_label = QLabel(trainer)
             name_label.setAlignment(Qt.AlignCenter)
@@ -883,10 +1373,7 @@ class TournamentWindow(QMainWindow):
                 poke_name = self.pokemon_stages[poke["name"]][str(poke["stage"])]
                 icon = QLabel()
                 icon.setPixmap(
-                    get_square_icon(
-                        os.path.join(os.path.dirname(__file__), poke_name["img"]),
-                        size=40,
-                    )
+                    get_square_icon(species_image(poke_name), size=40)
                 )
                 poke_label = QLabel(f"Lv.{poke['level']} {poke_name['name']}")
                 poke_label.setAlignment(Qt.AlignCenter)
@@ -919,6 +1406,22 @@ class TournamentWindow(QMainWindow):
         self.next_battle_btn = QPushButton("Start Next Battle")
         self.next_battle_btn.clicked.connect(self.start_next_battle)
         main_layout.addWidget(self.next_battle_btn)
+        # Resolve the remaining matches with the deterministic engine
+        self.simulate_btn = QPushButton("Simulate Rest")
+        self.simulate_btn.clicked.connect(self.simulate_rest)
+        main_layout.addWidget(self.simulate_btn)
+        # Play the remaining battles without clicks or dialogs
+        auto_layout = QHBoxLayout()
+        self.speed_box = QComboBox()
+        self.speed_box.addItems(list(AUTO_PLAY_SPEEDS))
+        self.policy_box = QComboBox()
+        self.policy_box.addItems(list(SUBSTITUTION_POLICIES))
+        self.auto_btn = QPushButton("Auto Play")
+        self.auto_btn.clicked.connect(lambda: self.auto_play())
+        auto_layout.addWidget(self.speed_box)
+        auto_layout.addWidget(self.policy_box)
+        auto_layout.addWidget(self.auto_btn)
+        main_layout.addLayout(auto_layout)
         self.status_label = QLabel()
         self.status_label.setAlignment(Qt.AlignCenter)
         main_layout.addWidget(self.status_label)
@@ -927,82 +1430,384 @@ class TournamentWindow(QMainWindow):
         self.setCentralWidget(central)
 
     def update_ui(self):
-        for i, trainer in enumerate(self.trainers):
-            self.score_labels[i].setText(f"Score: {self.scores[trainer]}")
-        if self.current_battle_idx < len(self.battle_pairs):
-            a, b = self.battle_pairs[self.current_battle_idx]
-            self.status_label.setText(f"Next: {self.trainers[a]} vs {self.trainers[b]}")
-            self.next_battle_btn.setEnabled(True)
+        self.refresh.mark()
+        self.refresh.flush()
+
+    def _paint_scores(self):
+        standings = self.tournament.standings
+        odds = self.analyses.tournament_odds() if self.analyses else {}
+        for i, label in enumerate(self.score_labels):
+            text = f"Score: {standings.points[i]:g}"
+            if self.trainers[i] in odds:
+                text += f"  (title odds {odds[self.trainers[i]]:.0%})"
+            if self.ratings is not None:
+                rating, _ = self.ratings.trainers.get(self.trainers[i])
+                text += f"  (rating {rating:.0f})"
+            label.setText(text)
+        if self.standings_list is not None:
+            self.standings_list.clear()
+            for rank, row in enumerate(standings.rows(), 1):
+                trainer, points, wins, draws, losses = row
+                self.standings_list.addItem(
+                    f"{rank:>3}. {trainer}  {points:g} pts  ({wins}-{draws}-{losses})"
+                )
+
+    def _paint_status(self):
+        pending = self.tournament.pending()
+        if pending:
+            a, b = pending[0]
+            self.status_label.setText(
+                f"Round {self.tournament.round}, next: "
+                f"{self.trainers[a]} vs {self.trainers[b]}"
+            )
+            idle = not self.read_only and self.auto_interval is None
+            self.next_battle_btn.setEnabled(idle)
+            self.simulate_btn.setEnabled(idle)
+            self.auto_btn.setEnabled(
+                idle and not isinstance(self.tournament, battle_service.RemoteTournament)
+            )
         else:
-            self.status_label.setText("Tournament finished!")
+            champion = self.tournament.champion()
+            text = "Tournament finished!"
+            if champion is not None:
+                text += f" Champion: {self.trainers[champion]}"
+            self.status_label.setText(text)
             self.next_battle_btn.setEnabled(False)
+            self.simulate_btn.setEnabled(False)
+            self.auto_btn.setEnabled(False)
+
+    def auto_play(self, speed=None, policy=None):
+        """
+        Plays the remaining battles with the exchange engine. speed is a name
+        from AUTO_PLAY_SPEEDS or the milliseconds between exchanges; 0
+        ("instant") plays them all at once and only redraws the final
+        standings.
+        """
+        speed = speed or self.speed_box.currentText()
+        self.auto_interval = AUTO_PLAY_SPEEDS.get(speed, speed)
+        self.auto_policy = policy or self.policy_box.currentText()
+        if self.auto_interval == 0:
+            self.play_instant()
+        else:
+            self.start_next_battle()
+
+    def play_instant(self):
+        while True:
+            pending = self.tournament.pending()
+            if not pending:
+                break
+            a_idx, b_idx = pending[0]
+            manager = self.battle_manager(a_idx, b_idx, self.journal)
+            if self.journal is not None:
+                self.journal.append(
+                    "battle_start", a=a_idx, b=b_idx, hp=manager.team_hp()
+                )
+            manager.pick_starters(self.auto_policy)
+            manager.play_out(self.auto_policy)
+            self.finish_battle(a_idx, b_idx, manager)
+        self.auto_interval = None
+        self.update_ui()
 
-    def start_next_battle(self):
-        if self.current_battle_idx >= len(self.battle_pairs):
+    def finish_battle(self, a_idx, b_idx, manager):
+        """
+        Records a finished battle; returns the winner index or None.
+        """
+        team_a_alive = manager.team_a.has_alive()
+        team_b_alive = manager.team_b.has_alive()
+        winner = None
+        if team_a_alive and not team_b_alive:
+            winner = a_idx
+        elif team_b_alive and not team_a_alive:
+            winner = b_idx
+        # A draw scores half a point, or is replayed in knockout formats
+        if self.journal is not None:
+            self.journal.append("battle_end", a=a_idx, b=b_idx, winner=winner)
+        self.tournament.record(a_idx, b_idx, winner)
+        self.record_rating(a_idx, b_idx, winner)
+        return winner
+
+    def simulate_rest(self):
+        if isinstance(self.tournament, battle_service.RemoteTournament):
+            self.tournament.simulate()
+            self.update_ui()
             return
-        a_idx, b_idx = self.battle_pairs[self.current_battle_idx]
-        # Create a new TeamBattleManager for this battle
-        teams = [self.teams_config[a_idx], self.teams_config[b_idx]]
+        engine = tournament_formats.MatchEngine(
+            self.teams_config, self.pokemon_stages, chart=self.chart
+        )
+        workers = 1
+        if len(self.trainers) > MAX_ROSTER_PANELS:
+            workers = os.cpu_count() or 1
+        played = len(self.tournament.history)
+        tournament_formats.run(self.tournament, engine, workers)
+        for _, a, b, winner in self.tournament.history[played:]:
+            if self.journal is not None:
+                self.journal.append("battle_end", a=a, b=b, winner=winner)
+            self.record_rating(a, b, winner, save=False)
+        # One write for the whole batch instead of one per battle
+        self.save_ratings()
+        self.update_ui()
+
+    def record_rating(self, a, b, winner, save=True):
+        if self.ratings is None:
+            return
+        self.ratings.record_battle(
+            self.trainers[a],
+            self.trainers[b],
+            None if winner is None else self.trainers[winner],
+        )
+        if save:
+            self.save_ratings()
+
+    def save_ratings(self):
+        if self.ratings is not None and self.ratings.path:
+            self.ratings.save()
+
+    def battle_manager(self, a_idx, b_idx, journal=None):
         # Patch global config for TeamBattleManager
         global TEAMS_CONFIG
-        TEAMS_CONFIG = teams
-        battle_manager = TeamBattleManager()
-        battle_window = MainWindow(battle_manager)
+        TEAMS_CONFIG = [self.teams_config[a_idx], self.teams_config[b_idx]]
+        return TeamBattleManager(
+            journal=journal, ratings=self.ratings, chart=self.chart
+        )
+
+    def close_battle(self):
+        # The window is kept for the next battle, the battle is released
+        if self.battle_window is not None:
+            self.battle_window.unbind()
+            self.battle_window.hide()
+
+    def start_next_battle(self, resume=None):
+        """
+        resume: journaled state of a battle that was interrupted.
+        """
+        pending = self.tournament.pending()
+        if not pending:
+            self.auto_interval = None
+            self.refresh.mark()
+            return
+        a_idx, b_idx = (resume["a"], resume["b"]) if resume else pending[0]
+        # Create a new TeamBattleManager for this battle
+        battle_manager = self.battle_manager(a_idx, b_idx, self.journal)
+        if resume:
+            battle_manager.restore(resume)
+        elif self.journal is not None:
+            self.journal.append(
+                "battle_start", a=a_idx, b=b_idx, hp=battle_manager.team_hp()
+            )
+        prompt_starters = resume is None or None in resume["active"]
+        if self.auto_interval is not None and prompt_starters:
+            battle_manager.pick_starters(self.auto_policy)
+            prompt_starters = False
+        if self.battle_window is None:
+            self.battle_window = MainWindow(battle_manager, prompt_starters)
+        else:
+            self.battle_window.bind(battle_manager, prompt_starters)
+        battle_window = self.battle_window
         battle_window.setWindowTitle(
             f"Battle: {self.trainers[a_idx]} vs {self.trainers[b_idx]}"
         )
         battle_window.show()
-        self.battle_windows.append(battle_window)
 
         # Connect to battle end
         def on_battle_end():
-            # Determine winner
-            team_a_alive = any(
-                pw.is_alive() for pw in battle_manager.team_a.pokemon_wrappers
-            )
-            team_b_alive = any(
-                pw.is_alive() for pw in battle_manager.team_b.pokemon_wrappers
-            )
-            winner = None
-            if team_a_alive and not team_b_alive:
-                self.scores[self.trainers[a_idx]] += 1
-                winner = self.trainers[a_idx]
-            elif team_b_alive and not team_a_alive:
-                self.scores[self.trainers[b_idx]] += 1
-                winner = self.trainers[b_idx]
-            if winner:
+            if (a_idx, b_idx) not in self.tournament.pending():
+                # Already resolved by "Simulate Rest"
+                self.close_battle()
+                return
+            winner = self.finish_battle(a_idx, b_idx, battle_manager)
+            if self.auto_interval is not None:
+                self.close_battle()
+                self.refresh.mark()
+                QTimer.singleShot(self.auto_interval, self.start_next_battle)
+                return
+            if winner is not None:
                 from PyQt5.QtWidgets import QMessageBox
 
                 msg = QMessageBox(self)
                 msg.setWindowTitle("Battle Result")
-                msg.setText(f"{winner} wins this battle!")
+                msg.setText(f"{self.trainers[winner]} wins this battle!")
                 msg.setIcon(QMessageBox.Information)
                 msg.exec_()
             # Close battle window and update
-            battle_window.close()
-            self.current_battle_idx += 1
-            self.update_ui()
+            self.close_battle()
+            self.refresh.mark()
 
-        # Patch MainWindow to call on_battle_end when battle is over
-        orig_next_turn = battle_window.next_turn
+        battle_window.on_finished = on_battle_end
+        if resume:
+            # The crash may have hit between a faint and its substitution
+            if battle_manager.team_a.has_alive() and battle_manager.team_b.has_alive():
+                battle_window.handle_fainted()
+            battle_window._check_finished()
+        if self.auto_interval is not None and not battle_manager.is_finished():
+            battle_window.start_auto_play(self.auto_interval, self.auto_policy)
+        self.refresh.mark("status")
 
-        def patched_next_turn():
-            orig_next_turn()
-            if (
-                not battle_manager.team_a.has_alive()
-                or not battle_manager.team_b.has_alive()
-            ):
-                on_battle_end()
 
-        battle_window.next_turn = patched_next_turn
-        battle_window.next_turn_btn.clicked.disconnect()
-        battle_window.next_turn_btn.clicked.connect(battle_window.next_turn)
-        self.update_ui()
+# --- Journal replay ---
+REPLAY_STEP_MS = 400  # per event at speed 1
+REPLAY_FRAME_MS = 30  # at most one redraw per frame
+
+
+class JournalReplay:
+    """
+    Plays a journal back in a read-only TournamentWindow from the recorded
+    events, without re-running any battle. At high speeds several events are
+    applied per frame and only the final state is drawn; speed 0 jumps
+    straight to the end.
+    """
+
+    def __init__(self, path, speed=1.0):
+        self.events = list(event_journal.read_events(path))
+        if not self.events or self.events[0]["type"] != "tournament":
+            raise ValueError(f"{path} does not start with a tournament event")
+        setup = self.events[0]
+        trainers = [team["trainer"] for team in setup["teams_config"]]
+        tournament = tournament_formats.make_tournament(
+            setup["format"], trainers, players=setup.get("players")
+        )
+        self.window = TournamentWindow(
+            setup["teams_config"],
+            POKEMON_STAGES,
+            setup["format"],
+            tournament=tournament,
+            read_only=True,
+            chart=setup.get("chart"),
+        )
+        self.window.setWindowTitle("Pokémon Tournament (replay)")
+        self.speed = speed
+        self.manager = None
+        self.battle_window = None
+        self.position = 1
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.tick)
+        self._elapsed = QElapsedTimer()
+        self._elapsed.start()
+        if speed > 0:
+            self.timer.start(max(1, min(REPLAY_FRAME_MS, int(REPLAY_STEP_MS / speed))))
+        else:
+            self.tick()
+
+    @property
+    def finished(self):
+        return self.position >= len(self.events)
+
+    def tick(self):
+        if self.speed > 0:
+            due = 1 + int(self._elapsed.elapsed() * self.speed / REPLAY_STEP_MS)
+        else:
+            due = len(self.events)
+        while self.position < min(due, len(self.events)):
+            self.apply(self.events[self.position])
+            self.position += 1
+        self.render()
+        if self.finished:
+            self.timer.stop()
+
+    def apply(self, event):
+        kind = event["type"]
+        if kind == "battle_start":
+            self.manager = self.window.battle_manager(event["a"], event["b"])
+        elif kind == "starter":
+            self.manager.choose_starter(event["side"], event["idx"])
+        elif kind == "substitute":
+            self.manager.handle_faint(event["side"], event["idx"])
+        elif kind == "exchange":
+            self.manager.apply_exchange(event["active"], event["hp"], event["winner"])
+        elif kind == "undo":
+            self.manager.undo()
+        elif kind == "redo":
+            self.manager.redo()
+        elif kind == "battle_end":
+            self.window.tournament.pending()
+            self.window.tournament.record(event["a"], event["b"], event["winner"])
+            self.manager = None
+
+    def render(self):
+        view = self.battle_window
+        if self.manager is None:
+            if view is not None and view.manager is not None:
+                view.unbind()
+                view.hide()
+        else:
+            if view is None:
+                view = self.battle_window = MainWindow(self.manager, False)
+            elif view.manager is not self.manager:
+                view.bind(self.manager, prompt_starters=False)
+            view.next_turn_btn.setEnabled(False)
+            view.show()
+            # Only the regions the applied events touched
+            view.refresh.flush()
+        self.window.update_ui()
 
 
 if __name__ == "__main__":
+    import argparse
+
     app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Pokémon tournament GUI")
+    parser.add_argument(
+        "target",
+        nargs="?",
+        default="round_robin",
+        help="tournament format, or the URL of a running battle_service",
+    )
+    parser.add_argument(
+        "--journal", help="record to this journal, resuming it if it exists"
+    )
+    parser.add_argument("--replay", help="replay a finished journal")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="replay speed (0: jump to the end)"
+    )
+    parser.add_argument(
+        "--ratings", help="rating file: seeds the event and is updated after battles"
+    )
+    parser.add_argument(
+        "--auto",
+        choices=list(AUTO_PLAY_SPEEDS),
+        help="auto-play the remaining battles at this speed",
+    )
+    parser.add_argument(
+        "--policy",
+        choices=SUBSTITUTION_POLICIES,
+        default="counter",
+        help="substitution policy for auto-play",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="pick up edits to the rosters, species and type chart while running",
+    )
+    parser.add_argument(
+        "--type-chart",
+        choices=list(type_charts.CHARTS),
+        help="type chart of the battles (default: type_effectiveness.csv)",
+    )
+    args = parser.parse_args()
     # Tournament main window
-    window = TournamentWindow(TEAMS_CONFIG, POKEMON_STAGES)
+    if args.replay:
+        replay = JournalReplay(args.replay, args.speed)
+        window = replay.window
+    elif args.target.startswith("http"):
+        remote = battle_service.RemoteTournament(
+            battle_service.BattleClient(args.target)
+        )
+        window = TournamentWindow(
+            remote.teams_config, POKEMON_STAGES, tournament=remote
+        )
+    else:
+        journal = event_journal.Journal(args.journal) if args.journal else None
+        ratings = rating_tables.Ratings(args.ratings) if args.ratings else None
+        window = TournamentWindow(
+            TEAMS_CONFIG,
+            POKEMON_STAGES,
+            args.target,
+            journal=journal,
+            ratings=ratings,
+            chart=args.type_chart,
+        )
+        if args.watch:
+            window.watch_inputs()
+        if args.auto:
+            QTimer.singleShot(0, lambda: window.auto_play(args.auto, args.policy))
     window.show()
     sys.exit(app.exec_())
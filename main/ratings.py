@@ -0,0 +1,297 @@
+"""
+Glicko ratings for trainers and species/level entries.
+
+Two rating tables live side by side: trainers (one rating per trainer name)
+and entries (one per species and level, "Gengar@50"). Every player has a
+rating and a rating deviation (RD, the uncertainty of the rating); the GUI
+updates them after every exchange and battle, and stored simulations can be
+ingested in bulk.
+
+Bulk updates are vectorized with NumPy: records are split into rating
+periods, every game of a period is scored against the ratings at the start
+of the period, and the Glicko sums are accumulated per player with one
+bincount per term. Unlike summed Elo deltas, a player with thousands of
+games in one period still gets a bounded, well-scaled update.
+
+Tables are saved compactly in the shared_tables format (names, ratings, RDs
+and game counts as flat arrays behind a small header).
+
+Example:
+    python main/ratings.py ingest ratings.bin --store results.sqlite
+    python main/ratings.py top ratings.bin --table entries
+"""
+
+import argparse
+import math
+import os
+import sys
+from array import array
+
+import shared_tables
+
+INITIAL_RATING = 1500.0
+INITIAL_RD = 350.0
+MIN_RD = 30.0  # keeps ratings responsive after many games
+PERIOD = 50000  # records per rating period in bulk updates
+Q = math.log(10) / 400
+
+
+def entry_key(species, level):
+    return f"{species}@{int(level)}"
+
+
+def _g(rd):
+    return 1 / math.sqrt(1 + 3 * (Q * rd / math.pi) ** 2)
+
+
+def expected_score(r_a, rd_a, r_b, rd_b):
+    """
+    Probability that a beats b, accounting for both deviations.
+    """
+    g = _g(math.sqrt(rd_a**2 + rd_b**2))
+    return 1 / (1 + 10 ** (-g * (r_a - r_b) / 400))
+
+
+class RatingTable:
+    def __init__(self):
+        self.names = []
+        self._index = {}
+        self.rating = array("d")
+        self.rd = array("d")
+        self.games = array("q")
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def index(self, name):
+        idx = self._index.get(name)
+        if idx is None:
+            idx = self._index[name] = len(self.names)
+            self.names.append(name)
+            self.rating.append(INITIAL_RATING)
+            self.rd.append(INITIAL_RD)
+            self.games.append(0)
+        return idx
+
+    def get(self, name):
+        """
+        (rating, RD); unrated players start at the initial values.
+        """
+        idx = self._index.get(name)
+        if idx is None:
+            return INITIAL_RATING, INITIAL_RD
+        return self.rating[idx], self.rd[idx]
+
+    def expected(self, a, b):
+        return expected_score(*self.get(a), *self.get(b))
+
+    def update(self, a, b, score):
+        """
+        One game; score is 1 if a won, 0 if b won and 0.5 for a draw.
+        """
+        i, j = self.index(a), self.index(b)
+        r_i, rd_i, r_j, rd_j = self.rating[i], self.rd[i], self.rating[j], self.rd[j]
+        for idx, r, rd, r_opp, rd_opp, s in (
+            (i, r_i, rd_i, r_j, rd_j, score),
+            (j, r_j, rd_j, r_i, rd_i, 1 - score),
+        ):
+            g = _g(rd_opp)
+            e = 1 / (1 + 10 ** (-g * (r - r_opp) / 400))
+            inv = 1 / rd**2 + Q**2 * g**2 * e * (1 - e)
+            self.rating[idx] = r + Q / inv * g * (s - e)
+            self.rd[idx] = max(MIN_RD, math.sqrt(1 / inv))
+            self.games[idx] += 1
+
+    def update_batch(self, a_names, b_names, scores, period=PERIOD):
+        """
+        Many games at once, in rating periods of `period` games.
+        """
+        import numpy as np
+
+        ia = np.array([self.index(n) for n in a_names], dtype=np.intp)
+        ib = np.array([self.index(n) for n in b_names], dtype=np.intp)
+        scores = np.asarray(scores, dtype=np.float64)
+        if not len(ia):
+            return
+        n = len(self.names)
+        # Views over the tables, updated in place
+        rating = np.frombuffer(self.rating, dtype=np.float64)
+        rd = np.frombuffer(self.rd, dtype=np.float64)
+        games = np.frombuffer(self.games, dtype=np.int64)
+        for start in range(0, len(ia), period):
+            a = ia[start : start + period]
+            b = ib[start : start + period]
+            s = scores[start : start + period]
+            g_a = 1 / np.sqrt(1 + 3 * (Q * rd[a] / np.pi) ** 2)
+            g_b = 1 / np.sqrt(1 + 3 * (Q * rd[b] / np.pi) ** 2)
+            e_a = 1 / (1 + 10 ** (-g_b * (rating[a] - rating[b]) / 400))
+            e_b = 1 - 1 / (1 + 10 ** (-g_a * (rating[a] - rating[b]) / 400))
+            info = np.bincount(
+                a, weights=g_b**2 * e_a * (1 - e_a), minlength=n
+            ) + np.bincount(b, weights=g_a**2 * e_b * (1 - e_b), minlength=n)
+            gain = np.bincount(a, weights=g_b * (s - e_a), minlength=n) + np.bincount(
+                b, weights=g_a * ((1 - s) - e_b), minlength=n
+            )
+            played = info > 0
+            inv = 1 / rd[played] ** 2 + Q**2 * info[played]
+            rating[played] += Q / inv * gain[played]
+            rd[played] = np.maximum(MIN_RD, np.sqrt(1 / inv))
+        games += np.bincount(ia, minlength=n) + np.bincount(ib, minlength=n)
+
+    def top(self, limit=None):
+        """
+        (name, rating, RD, games), best first.
+        """
+        rows = sorted(
+            zip(self.names, self.rating, self.rd, self.games), key=lambda r: -r[1]
+        )
+        return rows[:limit]
+
+    def seed_order(self, names):
+        """
+        Indices into names, highest rated first (for tournament seeding).
+        """
+        return sorted(range(len(names)), key=lambda i: -self.get(names[i])[0])
+
+    def pairings(self, names):
+        """
+        Matchmaking: pairs of indices into names with the closest ratings.
+        With an odd count the lowest rated player sits out.
+        """
+        order = self.seed_order(names)
+        return [(order[k], order[k + 1]) for k in range(0, len(order) - 1, 2)]
+
+    def _arrays(self, prefix):
+        return {
+            f"{prefix}.names": array("B", "\n".join(self.names).encode("utf-8")),
+            f"{prefix}.rating": self.rating,
+            f"{prefix}.rd": self.rd,
+            f"{prefix}.games": self.games,
+        }
+
+    @classmethod
+    def _from_tables(cls, tables, prefix):
+        table = cls()
+        text = bytes(tables[f"{prefix}.names"]).decode("utf-8")
+        table.names = text.split("\n") if text else []
+        table._index = {name: i for i, name in enumerate(table.names)}
+        table.rating = array("d", tables[f"{prefix}.rating"])
+        table.rd = array("d", tables[f"{prefix}.rd"])
+        table.games = array("q", tables[f"{prefix}.games"])
+        return table
+
+
+class Ratings:
+    """
+    Trainer and entry rating tables, saved together in one file.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.trainers = RatingTable()
+        self.entries = RatingTable()
+        if path and os.path.exists(path):
+            with shared_tables.attach(("file", path)) as tables:
+                self.trainers = RatingTable._from_tables(tables, "trainers")
+                self.entries = RatingTable._from_tables(tables, "entries")
+
+    def record_exchange(self, species_a, level_a, species_b, level_b, winner):
+        """
+        One exchange of a battle; winner is "A" or "B".
+        """
+        self.entries.update(
+            entry_key(species_a, level_a),
+            entry_key(species_b, level_b),
+            1.0 if winner == "A" else 0.0,
+        )
+
+    def record_battle(self, trainer_a, trainer_b, winner):
+        """
+        One team battle; winner is a trainer name, or None for a draw.
+        """
+        score = 0.5 if winner is None else float(winner == trainer_a)
+        self.trainers.update(trainer_a, trainer_b, score)
+
+    def save(self, path=None):
+        path = path or self.path
+        arrays = self.trainers._arrays("trainers")
+        arrays.update(self.entries._arrays("entries"))
+        tmp = path + ".tmp"
+        shared_tables.publish(arrays, tmp).close()
+        os.replace(tmp, path)
+
+
+def ingest_store(ratings, store_path, batch_size=PERIOD):
+    """
+    Feeds every battle of a results store into the entry ratings.
+    """
+    import results_store
+
+    count = 0
+    with results_store.open_store(store_path) as store:
+        for batch in store.battles(batch_size):
+            ratings.entries.update_batch(
+                map(entry_key, batch["species_a"], batch["level_a"]),
+                map(entry_key, batch["species_b"], batch["level_b"]),
+                batch["a_won"],
+                batch_size,
+            )
+            count += len(batch["a_won"])
+    return count
+
+
+def ingest_journal(ratings, journal_path):
+    """
+    Feeds the battles of a tournament journal into the trainer ratings.
+    """
+    import journal
+
+    trainers, count = [], 0
+    for event in journal.read_events(journal_path):
+        if event["type"] == "tournament":
+            trainers = [team["trainer"] for team in event["teams_config"]]
+        elif event["type"] == "battle_end":
+            winner = event["winner"]
+            ratings.record_battle(
+                trainers[event["a"]],
+                trainers[event["b"]],
+                None if winner is None else trainers[winner],
+            )
+            count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="update ratings from stored results")
+    ingest.add_argument("ratings", help="ratings file (created if missing)")
+    ingest.add_argument("--store", action="append", default=[], help="results store")
+    ingest.add_argument(
+        "--journal", action="append", default=[], help="tournament journal"
+    )
+    top = sub.add_parser("top", help="print the best rated players")
+    top.add_argument("ratings")
+    top.add_argument("--table", choices=("trainers", "entries"), default="trainers")
+    top.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    ratings = Ratings(args.ratings)
+    if args.command == "ingest":
+        for path in args.store:
+            print(f"{path}: {ingest_store(ratings, path)} battles")
+        for path in args.journal:
+            print(f"{path}: {ingest_journal(ratings, path)} battles")
+        ratings.save()
+        return 0
+    table = getattr(ratings, args.table)
+    for rank, (name, rating, rd, games) in enumerate(table.top(args.limit), 1):
+        print(f"{rank:>3}. {name:<24} {rating:7.1f} ±{2 * rd:5.1f}  ({games} games)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+"""
+Stored simulation results.
+
+Keeps one record per simulated battle (species, levels and types of both
+sides, engine, config hash, seed, outcome) so analyses can query stored data
+instead of re-running simulations, and run_many_battles can skip battles it
+has already simulated. Two backends share one interface:
+
+    SQLiteStore    a single .sqlite file, batched executemany writes,
+                   indexed on (species, level, opponent) for both sides
+    ParquetStore   a directory of Parquet files, one per flushed batch
+                   (needs pyarrow: pip install .[store])
+
+Example:
+    python main/results_store.py results.sqlite Gengar --level 50 --vs-type Fire
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet support is optional
+    pa = None
+
+COLUMNS = (
+    "species_a",
+    "level_a",
+    "types_a",
+    "species_b",
+    "level_b",
+    "types_b",
+    "engine",
+    "config_hash",
+    "seed",
+    "a_won",
+    "winner_hp",
+)
+BATCH_SIZE = 1000
+
+
+def config_hash(**settings):
+    """
+    Short stable hash of everything besides species and level that affects
+    an outcome (moves, genders, HP boost, scoring profile, ...).
+    """
+    text = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def types_key(types):
+    """
+    ["Fire", "Flying"] -> "/fire/flying/", so one type matches as "/fire/".
+    """
+    if isinstance(types, str):
+        types = types.split("/")
+    return "/" + "/".join(t.lower() for t in types if t) + "/"
+
+
+def record(
+    species_a,
+    level_a,
+    species_b,
+    level_b,
+    engine,
+    config,
+    seed,
+    a_won,
+    winner_hp,
+    types_a=(),
+    types_b=(),
+):
+    return (
+        species_a,
+        int(level_a),
+        types_key(types_a),
+        species_b,
+        int(level_b),
+        types_key(types_b),
+        engine,
+        config,
+        seed,
+        int(bool(a_won)),
+        winner_hp,
+    )
+
+
+class _BufferedStore:
+    """
+    Shared buffering: records are written in batches of BATCH_SIZE.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self._buffer = []
+
+    def add(self, rec):
+        self._buffer.append(rec)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, records):
+        for rec in records:
+            self.add(rec)
+
+    def flush(self):
+        if self._buffer:
+            self._write(self._buffer)
+            self._buffer = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SQLiteStore(_BufferedStore):
+    def __init__(self, path, batch_size=BATCH_SIZE):
+        super().__init__(batch_size)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS battles (
+                id INTEGER PRIMARY KEY,
+                species_a TEXT NOT NULL,
+                level_a INTEGER NOT NULL,
+                types_a TEXT NOT NULL,
+                species_b TEXT NOT NULL,
+                level_b INTEGER NOT NULL,
+                types_b TEXT NOT NULL,
+                engine TEXT NOT NULL,
+                config_hash TEXT NOT NULL,
+                seed INTEGER,
+                a_won INTEGER NOT NULL,
+                winner_hp REAL
+            )
+            """)
+        # A species can be stored on either side of a battle
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS battles_a ON battles (species_a, level_a, species_b)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS battles_b ON battles (species_b, level_b, species_a)"
+        )
+        self.conn.commit()
+
+    def _write(self, records):
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO battles ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                records,
+            )
+
+    def outcomes(self, species_a, level_a, species_b, level_b, engine, config):
+        """
+        Stored (a_won, winner_hp, seed) of one exact matchup setup.
+        """
+        self.flush()
+        return self.conn.execute(
+            "SELECT a_won, winner_hp, seed FROM battles "
+            "WHERE species_a = ? AND level_a = ? AND species_b = ? AND level_b = ? "
+            "AND engine = ? AND config_hash = ? ORDER BY id",
+            (species_a, int(level_a), species_b, int(level_b), engine, config),
+        ).fetchall()
+
+    def win_rate(
+        self, species, level=None, opponent=None, opponent_type=None, engine=None
+    ):
+        """
+        (wins, battles) of a species over all stored battles on either side,
+        optionally restricted by level, opponent species or opponent type.
+        """
+        self.flush()
+        wins = games = 0
+        for me, other, won in (("a", "b", "a_won"), ("b", "a", "1 - a_won")):
+            where, args = [f"species_{me} = ?"], [species]
+            if level is not None:
+                where.append(f"level_{me} = ?")
+                args.append(int(level))
+            if opponent is not None:
+                where.append(f"species_{other} = ?")
+                args.append(opponent)
+            if opponent_type is not None:
+                where.append(f"types_{other} LIKE ?")
+                args.append(f"%{types_key([opponent_type])}%")
+            if engine is not None:
+                where.append("engine = ?")
+                args.append(engine)
+            w, n = self.conn.execute(
+                f"SELECT SUM({won}), COUNT(*) FROM battles WHERE {' AND '.join(where)}",
+                args,
+            ).fetchone()
+            wins += w or 0
+            games += n
+        return wins, games
+
+    def battles(self, batch_size=BATCH_SIZE, columns=COLUMNS):
+        """
+        Yields all stored battles as {column: list} batches.
+        """
+        self.flush()
+        cursor = self.conn.execute(f"SELECT {', '.join(columns)} FROM battles")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield dict(zip(columns, map(list, zip(*rows))))
+
+    def count(self):
+        self.flush()
+        return self.conn.execute("SELECT COUNT(*) FROM battles").fetchone()[0]
+
+    def close(self):
+        super().close()
+        self.conn.close()
+
+
+class ParquetStore(_BufferedStore):
+    def __init__(self, directory, batch_size=BATCH_SIZE):
+        if pa is None:
+            raise ImportError(
+                "Parquet results need pyarrow (pip install .[store]); "
+                "use a .sqlite path instead"
+            )
+        super().__init__(batch_size)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _write(self, records):
+        table = pa.Table.from_pylist([dict(zip(COLUMNS, rec)) for rec in records])
+        name = f"part-{time.time_ns()}-{os.getpid()}.parquet"
+        pq.write_table(table, os.path.join(self.directory, name))
+
+    def _dataset(self):
+        return ds.dataset(self.directory, format="parquet")
+
+    def _table(self, condition, columns):
+        if not any(f.endswith(".parquet") for f in os.listdir(self.directory)):
+            return pa.table({c: [] for c in columns})
+        return self._dataset().to_table(columns=list(columns), filter=condition)
+
+    def outcomes(self, species_a, level_a, species_b, level_b, engine, config):
+        self.flush()
+        condition = (
+            (ds.field("species_a") == species_a)
+            & (ds.field("level_a") == int(level_a))
+            & (ds.field("species_b") == species_b)
+            & (ds.field("level_b") == int(level_b))
+            & (ds.field("engine") == engine)
+            & (ds.field("config_hash") == config)
+        )
+        table = self._table(condition, ("a_won", "winner_hp", "seed"))
+        return list(
+            zip(*(table.column(c).to_pylist() for c in ("a_won", "winner_hp", "seed")))
+        )
+
+    def win_rate(
+        self, species, level=None, opponent=None, opponent_type=None, engine=None
+    ):
+        self.flush()
+        wins = games = 0
+        for me, other in (("a", "b"), ("b", "a")):
+            condition = ds.field(f"species_{me}") == species
+            if level is not None:
+                condition &= ds.field(f"level_{me}") == int(level)
+            if opponent is not None:
+                condition &= ds.field(f"species_{other}") == opponent
+            if opponent_type is not None:
+                condition &= pc.match_substring(
+                    ds.field(f"types_{other}"), types_key([opponent_type])
+                )
+            if engine is not None:
+                condition &= ds.field("engine") == engine
+            won = self._table(condition, ("a_won",)).column("a_won")
+            n = len(won)
+            a_wins = pc.sum(won).as_py() or 0
+            wins += a_wins if me == "a" else n - a_wins
+            games += n
+        return wins, games
+
+    def battles(self, batch_size=BATCH_SIZE, columns=COLUMNS):
+        self.flush()
+        if not any(f.endswith(".parquet") for f in os.listdir(self.directory)):
+            return
+        for batch in self._dataset().to_batches(
+            columns=list(columns), batch_size=batch_size
+        ):
+            yield {c: batch.column(c).to_pylist() for c in columns}
+
+    def count(self):
+        self.flush()
+        if not any(f.endswith(".parquet") for f in os.listdir(self.directory)):
+            return 0
+        return self._dataset().count_rows()
+
+
+def open_store(path, batch_size=BATCH_SIZE):
+    """
+    SQLite for .sqlite / .db files, Parquet for anything else (a directory).
+    """
+    if path.endswith((".sqlite", ".sqlite3", ".db")):
+        return SQLiteStore(path, batch_size)
+    return ParquetStore(path, batch_size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("store", help=".sqlite file or Parquet directory")
+    parser.add_argument("species")
+    parser.add_argument("--level", type=int)
+    parser.add_argument("--vs", help="opponent species")
+    parser.add_argument("--vs-type", help="opponent type, e.g. Fire")
+    parser.add_argument("--engine")
+    args = parser.parse_args(argv)
+
+    with open_store(args.store) as store:
+        start = time.perf_counter()
+        wins, games = store.win_rate(
+            args.species, args.level, args.vs, args.vs_type, args.engine
+        )
+        elapsed = time.perf_counter() - start
+    label = args.species + (f" Lv{args.level}" if args.level else "")
+    against = " vs " + (args.vs or (f"{args.vs_type} types" if args.vs_type else "all"))
+    if games:
+        print(f"{label}{against}: {wins}/{games} wins ({wins / games:.1%})")
+    else:
+        print(f"{label}{against}: no stored battles")
+    print(f"({elapsed * 1000:.1f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Scoring profiles for the deterministic battle engine.
+
+A ScoringProfile bundles every tunable number of the deterministic model:
+the score weights used by deterministic_battle, the share of the score
+margin the winner keeps as HP, the tie window, and the HP formula used by
+PokemonWrapper. DEFAULT_PROFILE reproduces the original hard-coded values.
+"""
+
+import itertools
+import json
+
+# Pikachu is a two-stage line, so its stages get half a stage of extra HP
+# (name -> (effective stage, bonus stages))
+STAGE_OVERRIDES = {
+    "Pikachu": (1, 0.5),
+    "Raichu": (2, 0.5),
+}
+
+
+class ScoringProfile:
+    FIELDS = (
+        "level_weight",
+        "hp_weight",
+        "type_weight",
+        "stage_weight",
+        "margin_hp_factor",
+        "tie_margin",
+        "base_hp",
+        "level_mult",
+        "stage_mult",
+        "hp_boost",
+    )
+
+    def __init__(
+        self,
+        level_weight=2,
+        hp_weight=1.5,
+        type_weight=45,
+        stage_weight=14,
+        margin_hp_factor=0.7,
+        tie_margin=1,
+        base_hp=30,
+        level_mult=3,
+        stage_mult=32,
+        hp_boost=10,
+    ):
+        # Score = level * level_weight + hp * hp_weight
+        #         + type_mult * type_weight + stage * stage_weight
+        self.level_weight = level_weight
+        self.hp_weight = hp_weight
+        self.type_weight = type_weight
+        self.stage_weight = stage_weight
+        # Winner keeps min(cur_hp, margin * margin_hp_factor) HP
+        self.margin_hp_factor = margin_hp_factor
+        # Scores within tie_margin of each other are a coin flip
+        self.tie_margin = tie_margin
+        # Max HP = base_hp + level * level_mult + stage * stage_mult + hp_boost
+        self.base_hp = base_hp
+        self.level_mult = level_mult
+        self.stage_mult = stage_mult  # was 25
+        self.hp_boost = hp_boost
+
+    def params(self):
+        """
+        Returns the parameter tuple expected by the kernels module.
+        """
+        return (
+            float(self.level_weight),
+            float(self.hp_weight),
+            float(self.type_weight),
+            float(self.stage_weight),
+            float(self.margin_hp_factor),
+            float(self.tie_margin),
+        )
+
+    def max_hp(self, level, stage, bonus_stages=0):
+        hp = self.base_hp + (level * self.level_mult) + (stage * self.stage_mult)
+        if bonus_stages:
+            hp += bonus_stages * self.stage_mult
+        return hp + self.hp_boost
+
+    def replace(self, **changes):
+        values = self.to_dict()
+        for key in changes:
+            if key not in values:
+                raise ValueError(f"Unknown scoring parameter: {key}")
+        values.update(changes)
+        return ScoringProfile(**values)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(**{k: v for k, v in values.items() if k in cls.FIELDS})
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def _key(self):
+        return tuple(getattr(self, name) for name in self.FIELDS)
+
+    def __eq__(self, other):
+        return isinstance(other, ScoringProfile) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        changed = [
+            f"{k}={v!r}"
+            for k, v in self.to_dict().items()
+            if v != getattr(DEFAULT_PROFILE, k, None)
+        ]
+        return f"ScoringProfile({', '.join(changed)})"
+
+
+DEFAULT_PROFILE = ScoringProfile()
+
+
+def stage_and_bonus(name, stage):
+    """
+    Returns (stage, bonus_stages) used for scoring a Pokémon of this stage.
+    """
+    return STAGE_OVERRIDES.get(name, (int(stage), 0))
+
+
+def profile_grid(base=None, **values):
+    """
+    Cartesian product of parameter values around a base profile, e.g.
+    profile_grid(type_weight=[30, 45, 60], stage_weight=[10, 14]).
+    """
+    base = base or DEFAULT_PROFILE
+    names = list(values)
+    return [
+        base.replace(**dict(zip(names, combo)))
+        for combo in itertools.product(*(values[n] for n in names))
+    ]
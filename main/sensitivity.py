@@ -0,0 +1,183 @@
+"""
+Sensitivity sweeps over scoring profiles.
+
+Evaluates a grid of ScoringProfiles against every roster matchup and the full
+round-robin tournament in one batched pass, then reports how each trainer's
+tournament win probability shifts with each parameter. With --charts the
+base profile is also evaluated under other type charts, side by side.
+
+Example:
+    python main/sensitivity.py type_weight=30,45,60 stage_weight=8:20:7
+    python main/sensitivity.py --charts gen1,gen2-5,gen6+
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+import batch_engine
+import scoring
+import type_charts
+
+
+def parse_values(text):
+    """
+    "30,45,60" -> [30.0, 45.0, 60.0]; "8:20:7" -> 7 evenly spaced values.
+    """
+    if ":" in text:
+        start, stop, num = text.split(":")
+        return [float(v) for v in np.linspace(float(start), float(stop), int(num))]
+    return [float(v) for v in text.split(",")]
+
+
+def sweep(grid_values, field=None, base=None, charts=()):
+    """
+    grid_values maps parameter names to lists of values; every combination
+    is evaluated, and the base profile under every type chart in charts.
+    Returns a JSON-friendly report dict.
+    """
+    field = field or batch_engine.Field()
+    base = base or scoring.DEFAULT_PROFILE
+    profiles = scoring.profile_grid(base, **grid_values)
+    # The base profile rides along as the last lane
+    lanes = batch_engine.ProfileArrays(profiles + [base])
+    odds = batch_engine.tournament_odds(field, lanes)
+    matchups = batch_engine.matchup_matrix(field, lanes)
+
+    # Only matchups between different trainers count
+    owner = np.empty(len(field.names), dtype=np.intp)
+    for t, entries in enumerate(field.team_entries):
+        owner[entries] = t
+    cross = owner[:, None] != owner[None, :]
+    favourite = np.sign(matchups[:, cross] - 0.5)
+    flipped = (favourite[:-1] != favourite[-1]).mean(axis=1)
+
+    baseline = odds[-1]
+    report = {
+        "profiles": len(profiles),
+        "trainers": field.trainers,
+        "baseline": dict(zip(field.trainers, baseline.round(4).tolist())),
+        "parameters": {},
+    }
+    for name, values in grid_values.items():
+        column = getattr(lanes, name)[:-1]
+        rows = []
+        for value in values:
+            mask = column == float(value)
+            mean = odds[:-1][mask].mean(axis=0)
+            rows.append(
+                {
+                    "value": float(value),
+                    "win_prob": dict(zip(field.trainers, mean.round(4).tolist())),
+                    "shift": dict(
+                        zip(field.trainers, (mean - baseline).round(4).tolist())
+                    ),
+                    "flipped_matchups": round(float(flipped[mask].mean()), 4),
+                }
+            )
+        report["parameters"][name] = rows
+    if charts:
+        report["charts"] = {}
+    for name in charts:
+        chart_field = field.with_chart(name)
+        chart_odds = batch_engine.tournament_odds(chart_field, base)[0]
+        chart_matchups = batch_engine.matchup_matrix(chart_field, base)[0]
+        report["charts"][name] = {
+            "win_prob": dict(zip(field.trainers, chart_odds.round(4).tolist())),
+            "shift": dict(
+                zip(field.trainers, (chart_odds - baseline).round(4).tolist())
+            ),
+            "flipped_matchups": round(
+                float((np.sign(chart_matchups[cross] - 0.5) != favourite[-1]).mean()),
+                4,
+            ),
+        }
+    return report
+
+
+def format_report(report):
+    trainers = report["trainers"]
+    lines = [f"Evaluated {report['profiles']} profiles"]
+    header = f"{'value':>10} " + " ".join(f"{t:>10}" for t in trainers)
+    lines.append(
+        "Baseline".ljust(11)
+        + " ".join(f"{report['baseline'][t]:>10.3f}" for t in trainers)
+    )
+    for name, rows in report["parameters"].items():
+        lines.append("")
+        lines.append(f"--- {name} (win probability shift, flipped matchups) ---")
+        lines.append(header + f" {'flipped':>8}")
+        for row in rows:
+            lines.append(
+                f"{row['value']:>10g} "
+                + " ".join(f"{row['shift'][t]:>+10.3f}" for t in trainers)
+                + f" {row['flipped_matchups']:>8.1%}"
+            )
+    if report.get("charts"):
+        lines.append("")
+        lines.append("--- type chart (win probability shift, flipped matchups) ---")
+        lines.append(
+            f"{'chart':>10} "
+            + " ".join(f"{t:>10}" for t in trainers)
+            + f" {'flipped':>8}"
+        )
+        for name, row in report["charts"].items():
+            lines.append(
+                f"{name:>10} "
+                + " ".join(f"{row['shift'][t]:>+10.3f}" for t in trainers)
+                + f" {row['flipped_matchups']:>8.1%}"
+            )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "grid",
+        nargs="*",
+        metavar="NAME=VALUES",
+        help="parameter values as a,b,c or start:stop:num",
+    )
+    parser.add_argument("--profile", help="base ScoringProfile JSON file")
+    parser.add_argument(
+        "--charts",
+        type=lambda text: text.split(","),
+        default=[],
+        help=f"type charts to compare, from {','.join(type_charts.CHARTS)}",
+    )
+    parser.add_argument(
+        "--config", help="teams config JSON (default: teams_config.json)"
+    )
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+    if not args.grid and not args.charts:
+        parser.error("Give NAME=VALUES parameters, --charts, or both")
+    unknown = [name for name in args.charts if name not in type_charts.CHARTS]
+    if unknown:
+        parser.error(
+            f"Unknown type charts {unknown}, expected {list(type_charts.CHARTS)}"
+        )
+
+    grid_values = {}
+    for item in args.grid:
+        name, _, values = item.partition("=")
+        if name not in scoring.ScoringProfile.FIELDS or not values:
+            parser.error(
+                f"Expected NAME=VALUES with NAME in {scoring.ScoringProfile.FIELDS}"
+            )
+        grid_values[name] = parse_values(values)
+    base = scoring.ScoringProfile.load(args.profile) if args.profile else None
+    config = batch_engine.load_json(args.config) if args.config else None
+
+    report = sweep(grid_values, batch_engine.Field(config), base, args.charts)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+Read-only lookup tables shared between processes.
+
+A set of named flat arrays (type matrices, species and roster tables,
+matchup tables) is packed once into a single buffer: a
+multiprocessing.shared_memory block, or a file that readers mmap. Workers
+attach with a small picklable handle and read the arrays in place, so
+nothing is rebuilt, copied or unpickled per worker or per task.
+
+Buffer layout: an 8-byte header length, a JSON header with
+{name: [offset, typecode, shape]}, then the arrays, each 64-byte aligned.
+
+Arrays are returned as read-only memoryviews (m[i] or m[i, j]); numpy()
+gives a zero-copy NumPy view of the same memory.
+"""
+
+import json
+import math
+import mmap
+import struct
+import sys
+from multiprocessing import shared_memory
+
+ALIGN = 64
+_LENGTH = struct.Struct("<Q")
+
+
+def _align(n):
+    return -(-n // ALIGN) * ALIGN
+
+
+def _as_buffer(value):
+    # array.array / NumPy array, or (buffer, shape) for a flat buffer
+    shape = None
+    if isinstance(value, tuple):
+        value, shape = value
+    view = memoryview(value)
+    if not view.c_contiguous:
+        raise ValueError("shared tables need contiguous arrays")
+    return view, tuple(shape or view.shape)
+
+
+def _pack(arrays):
+    views, layout = {}, {}
+    for name, value in arrays.items():
+        view, shape = _as_buffer(value)
+        if math.prod(shape) * view.itemsize != view.nbytes:
+            raise ValueError(f"{name}: shape {shape} does not match the data")
+        views[name] = view
+        layout[name] = [0, view.format, list(shape)]
+    # Offsets depend on the header size, which depends on the offsets
+    start = end = 0
+    while True:
+        header = json.dumps(layout, separators=(",", ":")).encode("utf-8")
+        offset = _align(_LENGTH.size + len(header))
+        if offset == start:
+            break
+        start = end = offset
+        for name, view in views.items():
+            layout[name][0] = end
+            end = _align(end + view.nbytes)
+    return header, views, layout, end
+
+
+def _write(buf, header, views, layout):
+    _LENGTH.pack_into(buf, 0, len(header))
+    buf[_LENGTH.size : _LENGTH.size + len(header)] = header
+    for name, view in views.items():
+        offset = layout[name][0]
+        buf[offset : offset + view.nbytes] = view.cast("B")
+
+
+class Tables:
+    """
+    Attached tables. Use publish() or attach() to get one.
+    """
+
+    def __init__(self, handle, buf, owner, unlink=False):
+        self.handle = handle
+        self._buf = memoryview(buf).toreadonly()
+        self._owner = owner
+        self._unlink = unlink
+        (length,) = _LENGTH.unpack_from(self._buf, 0)
+        header = bytes(self._buf[_LENGTH.size : _LENGTH.size + length])
+        self.layout = json.loads(header)
+        self._views = {}
+
+    def __contains__(self, name):
+        return name in self.layout
+
+    def __getitem__(self, name):
+        if name not in self._views:
+            offset, typecode, shape = self.layout[name]
+            size = math.prod(shape) * struct.calcsize(typecode)
+            view = self._buf[offset : offset + size].cast(typecode)
+            if len(shape) > 1 and size:
+                view = view.cast("B").cast(typecode, shape)
+            self._views[name] = view
+        return self._views[name]
+
+    def numpy(self, name):
+        # Drop the returned array before close(), it keeps the buffer exported
+        import numpy as np
+
+        offset, typecode, shape = self.layout[name]
+        return np.frombuffer(
+            self._buf, dtype=typecode, count=math.prod(shape), offset=offset
+        ).reshape(shape)
+
+    def close(self):
+        """
+        Detaches; the publisher of a shared-memory block also frees it.
+        Views handed out before must not be used afterwards.
+        """
+        if self._owner is None:
+            return
+        for view in self._views.values():
+            view.release()
+        self._views = {}
+        self._buf.release()
+        self._owner.close()
+        if self._unlink:
+            self._owner.unlink()
+        self._owner = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def publish(arrays, path=None):
+    """
+    Packs {name: array} into shared memory, or into a file when a path is
+    given. Values are array.array or NumPy arrays, or (flat buffer, shape).
+    Returns the publisher's Tables; pass `tables.handle` to workers.
+    """
+    header, views, layout, size = _pack(arrays)
+    if path is None:
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        _write(shm.buf, header, views, layout)
+        return Tables(("shm", shm.name), shm.buf, shm, unlink=True)
+    with open(path, "wb") as f:
+        f.truncate(size)
+    with open(path, "r+b") as f:
+        mm = mmap.mmap(f.fileno(), size)
+        _write(mm, header, views, layout)
+        mm.flush()
+        mm.close()
+    return attach(("file", path))
+
+
+def attach(handle):
+    """
+    Attaches to published tables without copying them.
+    """
+    kind, name = handle
+    if kind == "shm":
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=name)
+        return Tables(handle, shm.buf, shm)
+    with open(name, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return Tables(handle, mm, mm)
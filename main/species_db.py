@@ -0,0 +1,447 @@
+"""
+Indexed species store.
+
+pokemon_stages.json curates a handful of evolution lines by hand. The store
+adds every other species of the simulator's stat table as a single-stage
+line, with its base stats, types and a default move of each of its types,
+and packs everything into one compact binary file in the shared_tables
+format (read through mmap, nothing decoded when it is opened):
+
+    records        per species: national dex ID, base stats, types, line, stage
+    text           per species: name, moves, gender and image, UTF-8
+    name indexes   species and line names, sorted, for binary-search lookups
+    line members   species of every line, in stage order
+
+open_store() returns a read-only mapping with the pokemon_stages.json
+interface (line -> stage -> info), so PokemonWrapper and the engines use it
+unchanged. A stage may list several moves ("moves", the first one also
+being "move"); moves_of() reads either form. A species is decoded the
+first time it is looked up and its image resolved then, so opening the
+store costs the same for 8 lines or 800.
+
+Example:
+    python main/species_db.py build --gen 4
+    python main/species_db.py show gengar 143
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+import shared_tables
+import type_charts
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "species.db")
+STAGES_PATH = os.path.join(BASE_DIR, "pokemon_stages.json")
+IMAGES_DIR = os.path.join(BASE_DIR, "images")
+IMAGE_EXTS = (".jpg", ".png")
+STATS = ("hp", "attack", "defense", "sp. atk", "sp. def", "speed")
+SEP = "\x1f"  # between the text fields of a species
+MOVE_SEP = ","  # between the moves of a species
+DEFAULT_GEN = 1
+DEFAULT_GENDER = "male"
+
+# Moves of the species without curated ones, one per type
+DEFAULT_MOVES = {
+    "Normal": "body-slam",
+    "Fire": "flamethrower",
+    "Water": "surf",
+    "Electric": "thunderbolt",
+    "Grass": "razor-leaf",
+    "Ice": "ice-beam",
+    "Fighting": "cross-chop",
+    "Poison": "sludge-bomb",
+    "Ground": "earthquake",
+    "Flying": "wing-attack",
+    "Psychic": "psybeam",
+    "Bug": "signal-beam",
+    "Rock": "rock-slide",
+    "Ghost": "shadow-ball",
+    "Dragon": "dragon-claw",
+    "Dark": "crunch",
+    "Steel": "iron-tail",
+}
+
+
+def moves_of(info):
+    """
+    Moves of a stage: its "moves" list, else its single "move".
+    """
+    return list(info.get("moves") or [info["move"]])
+
+
+def stats_path():
+    """
+    The simulator's species table (pokemon_stats.csv).
+    """
+    import poke_battle_sim
+
+    return os.path.join(
+        os.path.dirname(poke_battle_sim.__file__), "data", "pokemon_stats.csv"
+    )
+
+
+def display_name(name):
+    # "mr. mime" -> "Mr. Mime", keeping "farfetch'd" and "ho-oh" as they are
+    return " ".join(word[:1].upper() + word[1:] for word in name.split(" "))
+
+
+def image_path(name, images_dir=IMAGES_DIR):
+    """
+    Relative path of a species image in images/, or None if there is none.
+    """
+    slug = name.lower().replace(" ", "-")
+    for ext in IMAGE_EXTS:
+        if os.path.exists(os.path.join(images_dir, slug + ext)):
+            return f"images/{slug}{ext}"
+    return None
+
+
+def _digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).digest()
+
+
+def _text(strings):
+    # Strings packed into one UTF-8 buffer with start offsets
+    data, starts = bytearray(), array("q", [0])
+    for s in strings:
+        data += s.encode("utf-8")
+        starts.append(len(data))
+    return array("B", data), starts
+
+
+# --- Build ---
+
+
+def build(
+    path=DB_PATH, stages_path=STAGES_PATH, species_path=None, max_gen=DEFAULT_GEN
+):
+    """
+    Writes the store from the curated lines and the species table; species
+    of generations after max_gen are left out. Returns the species count.
+    """
+    with open(stages_path, "r", encoding="utf-8") as f:
+        curated = json.load(f)
+    # Types are stored by their index in the shared type charts index
+    type_names = [t.capitalize() for t in type_charts.TYPES]
+    with open(species_path or stats_path(), "r", encoding="utf-8") as f:
+        rows = {
+            row["name"]: row for row in csv.DictReader(f) if int(row["gen"]) <= max_gen
+        }
+
+    # Curated stages keep their name, moves, gender, types and image
+    species = {}  # lower-case name -> [row, info, line, stage]
+    lines = []
+    for line, stages in curated.items():
+        for stage, info in sorted(stages.items(), key=lambda s: int(s[0])):
+            key = info["name"].lower()
+            if key not in rows:
+                raise KeyError(f"{info['name']} ({line}) is not in the species table")
+            species[key] = [rows[key], info, len(lines), int(stage)]
+        lines.append(line)
+    for key, row in sorted(rows.items(), key=lambda r: int(r[1]["ndex"])):
+        if key in species:
+            continue
+        types = [t.capitalize() for t in (row["type 1"], row["type 2"]) if t]
+        name = display_name(key)
+        moves = [DEFAULT_MOVES[t] for t in types if t in DEFAULT_MOVES]
+        info = {
+            "name": name,
+            "gender": DEFAULT_GENDER,
+            "moves": moves or [DEFAULT_MOVES["Normal"]],
+            "type": types,
+        }
+        species[key] = [row, info, len(lines), 1]
+        lines.append(name)
+
+    records = sorted(species.values(), key=lambda s: int(s[0]["ndex"]))
+    ids, stats, types = array("H"), array("H"), array("b")
+    line_of, stage_of, text = array("q"), array("B"), []
+    members = [[] for _ in lines]
+    for idx, (row, info, line, stage) in enumerate(records):
+        ids.append(int(row["ndex"]))
+        stats.extend(int(row[stat]) for stat in STATS)
+        entry_types = info.get("type", ["Normal"])
+        for t in entry_types:
+            if t not in type_names:
+                type_names.append(t)
+        types.extend([type_names.index(t) for t in entry_types[:2]])
+        types.extend([-1] * (2 - len(entry_types[:2])))
+        line_of.append(line)
+        stage_of.append(stage)
+        members[line].append(idx)
+        text.append(
+            SEP.join(
+                (
+                    info["name"],
+                    MOVE_SEP.join(moves_of(info)),
+                    info.get("gender", DEFAULT_GENDER),
+                    info.get("img", ""),
+                )
+            )
+        )
+    names = [t.split(SEP, 1)[0].lower() for t in text]
+    member_list, member_start = array("q"), array("q", [0])
+    for m in members:
+        member_list.extend(sorted(m, key=lambda idx: stage_of[idx]))
+        member_start.append(len(member_list))
+
+    species_text, species_start = _text(text)
+    line_text, line_start = _text(lines)
+    type_text, _ = _text(["\n".join(type_names)])
+    source, _ = _text([])
+    source.frombytes(_digest(stages_path))
+    n = len(records)
+    arrays = {
+        "ids": ids,
+        "stats": (stats, (n, len(STATS))),
+        "types": (types, (n, 2)),
+        "line": line_of,
+        "stage": stage_of,
+        "text": species_text,
+        "text_start": species_start,
+        "species_order": array("q", sorted(range(n), key=names.__getitem__)),
+        "line_text": line_text,
+        "line_start": line_start,
+        "line_order": array(
+            "q", sorted(range(len(lines)), key=lambda i: lines[i].lower())
+        ),
+        "member_list": member_list,
+        "member_start": member_start,
+        "type_names": type_text,
+        "source": source,
+        "max_gen": array("B", [max_gen]),
+    }
+    tmp = path + ".tmp"
+    shared_tables.publish(arrays, tmp).close()
+    os.replace(tmp, path)
+    return n
+
+
+# --- Store ---
+
+
+class Line(Mapping):
+    """
+    Stages of one line: {"1": info, "2": info, ...}.
+    """
+
+    def __init__(self, store, members):
+        self._store = store
+        self._stages = {str(store._tables["stage"][idx]): idx for idx in members}
+
+    def __getitem__(self, stage):
+        return self._store._info(self._stages[str(stage)])
+
+    def __iter__(self):
+        return iter(self._stages)
+
+    def __len__(self):
+        return len(self._stages)
+
+
+class SpeciesStore(Mapping):
+    """
+    Read-only line -> stage -> info mapping over a store file. Info dicts
+    have the pokemon_stages.json keys plus "id" and "stats".
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._tables = shared_tables.attach(("file", path))
+        self.type_names = bytes(self._tables["type_names"]).decode("utf-8").split("\n")
+        self._species = {}  # record -> info, filled on first use
+        self._lines = {}  # line index -> Line
+
+    def __reduce__(self):
+        # Workers reopen the file instead of receiving the decoded species
+        return SpeciesStore, (self.path,)
+
+    def _string(self, text, start, idx):
+        t = self._tables
+        return bytes(t[text][t[start][idx] : t[start][idx + 1]]).decode("utf-8")
+
+    def _species_name(self, idx):
+        return self._string("text", "text_start", idx).split(SEP, 1)[0]
+
+    def _line_name(self, idx):
+        return self._string("line_text", "line_start", idx)
+
+    def _find(self, order, name_of, key):
+        # Binary search of a sorted name index; decodes log2(n) names
+        order = self._tables[order]
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if name_of(order[mid]).lower() < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(order) and name_of(order[lo]).lower() == key:
+            return order[lo]
+        return None
+
+    def _info(self, idx):
+        info = self._species.get(idx)
+        if info is None:
+            t = self._tables
+            text = self._string("text", "text_start", idx)
+            name, moves, gender, img = text.split(SEP)
+            moves = moves.split(MOVE_SEP)
+            info = self._species[idx] = {
+                "name": name,
+                "img": img or image_path(name),
+                "gender": gender,
+                "move": moves[0],
+                "moves": moves,
+                "type": [
+                    self.type_names[t["types"][idx, k]]
+                    for k in range(2)
+                    if t["types"][idx, k] >= 0
+                ],
+                "id": t["ids"][idx],
+                "stats": {stat: t["stats"][idx, k] for k, stat in enumerate(STATS)},
+            }
+        return info
+
+    def _line(self, line_idx):
+        line = self._lines.get(line_idx)
+        if line is None:
+            t = self._tables
+            start, end = t["member_start"][line_idx], t["member_start"][line_idx + 1]
+            line = self._lines[line_idx] = Line(self, t["member_list"][start:end])
+        return line
+
+    def __getitem__(self, line):
+        if not isinstance(line, str):
+            raise KeyError(line)
+        idx = self._find("line_order", self._line_name, line.lower())
+        if idx is None or self._line_name(idx) != line:
+            raise KeyError(line)
+        return self._line(idx)
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self._line_name(idx)
+
+    def __len__(self):
+        return len(self._tables["line_start"]) - 1
+
+    @property
+    def species_count(self):
+        return len(self._tables["ids"])
+
+    @property
+    def source_digest(self):
+        return bytes(self._tables["source"])
+
+    @property
+    def max_gen(self):
+        return self._tables["max_gen"][0]
+
+    def species(self, key):
+        """
+        Info of a species by name (any case) or national dex ID.
+        """
+        if isinstance(key, int):
+            ids = self._tables["ids"]
+            idx = bisect_left(ids, key)
+            if idx == len(ids) or ids[idx] != key:
+                raise KeyError(key)
+        else:
+            idx = self._find("species_order", self._species_name, key.lower())
+            if idx is None:
+                raise KeyError(key)
+        return self._info(idx)
+
+    def line_of(self, key):
+        """
+        (line name, stage) of a species by name or ID.
+        """
+        info = self.species(key)
+        idx = bisect_left(self._tables["ids"], info["id"])
+        line = self._line_name(self._tables["line"][idx])
+        return line, self._tables["stage"][idx]
+
+    def close(self):
+        self._species, self._lines = {}, {}
+        self._tables.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_store(path=DB_PATH):
+    return SpeciesStore(path)
+
+
+def load_stages(path=None):
+    """
+    Species stages for the GUI and engines: a .json file as before, or a
+    store. By default the store next to this module, rebuilt first when
+    pokemon_stages.json changed since it was built.
+    """
+    if path is not None:
+        if path.endswith(".json"):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return open_store(path)
+    if os.path.exists(DB_PATH):
+        store = open_store(DB_PATH)
+        if store.source_digest == _digest(STAGES_PATH):
+            return store
+        max_gen = store.max_gen
+        store.close()
+        build(max_gen=max_gen)
+    else:
+        build()
+    return open_store(DB_PATH)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    cmd = sub.add_parser("build", help="write the store")
+    cmd.add_argument("--out", default=DB_PATH)
+    cmd.add_argument("--stages", default=STAGES_PATH, help="curated lines")
+    cmd.add_argument("--species", help="species table (default: the simulator's)")
+    cmd.add_argument("--gen", type=int, default=DEFAULT_GEN, help="last generation")
+    cmd = sub.add_parser("show", help="print species by name or ID")
+    cmd.add_argument("species", nargs="+")
+    cmd.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = build(args.out, args.stages, args.species, args.gen)
+        size = os.path.getsize(args.out)
+        print(f"{count} species in {args.out} ({size / 1024:.1f} KiB)")
+        return 0
+    with open_store(args.db) as store:
+        for key in args.species:
+            try:
+                info = store.species(int(key) if key.isdigit() else key)
+            except KeyError:
+                print(f"{key}: unknown species", file=sys.stderr)
+                return 1
+            line, stage = store.line_of(info["id"])
+            print(
+                f"#{info['id']:<4} {info['name']:<12} {'/'.join(info['type']):<16} "
+                f"{','.join(info['moves']):<24} {line} (stage {stage})"
+            )
+            print("      " + "  ".join(f"{k} {v}" for k, v in info["stats"].items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
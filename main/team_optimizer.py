@@ -0,0 +1,579 @@
+"""
+Team composition optimizer over the species pool.
+
+Searches rosters built from the evolution lines in pokemon_stages.json, or
+any lines of the species store given with --line (one entry per line, in
+order, each either benched or fielded at some stage and level) for the one
+with the best average win probability against the trainers in
+teams_config.json, under a total-level and total-stage budget. Equal win
+rates are ranked by fewer levels spent.
+
+The search is a depth-first branch-and-bound over the lines:
+- Static score terms for every (option, opponent entry) pair are computed
+  up front in one NumPy pass.
+- A roster prefix is summarised per opponent as a distribution over the
+  opponent's (active Pokémon, its HP) when our next Pokémon enters. Adding
+  a Pokémon maps each point of that distribution through a memoized
+  transition, so shared sub-rosters are never re-simulated.
+- The bound completes the prefix with "super" entries that dominate every
+  option still affordable for each remaining line. Prefixes whose bound is
+  below the k-th best win rate are cut. Those that can only tie it are
+  kept while they could still tie it on fewer levels, up to --tie-limit
+  of them per worker: where many rosters reach the same win rate, proving
+  the cheapest would take a near-exhaustive search.
+- The first line's options are split across a process pool, which shares
+  the current cut-off win rate. Serial and parallel runs agree unless the
+  tie limit is reached.
+
+Example:
+    python main/team_optimizer.py --level-budget 240 --stage-budget 18 --top 10
+"""
+
+import argparse
+import heapq
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+import batch_engine
+import scoring
+import species_db
+
+DEFAULT_LEVEL_STEP = 5
+DEFAULT_MAX_LEVEL = 50
+DEFAULT_TOP = 10
+DEFAULT_TIE_LIMIT = 1000  # tied prefixes explored per search
+EPS = 1e-12
+TRANSITION_CACHE_SIZE = 1 << 18
+
+
+class Option:
+    """
+    One way to field an evolution line (stage and level), or bench it.
+    """
+
+    def __init__(self, line, stage, level, name=None):
+        self.line = line
+        self.stage = stage
+        self.level = level
+        self.name = name
+
+    @property
+    def fielded(self):
+        return self.level > 0
+
+    def to_config(self):
+        return {"name": self.line, "stage": self.stage or 1, "level": self.level}
+
+
+class SearchSpace:
+    """
+    Options per line plus the score tables of every option against every
+    opponent entry, computed in one batched pass.
+    """
+
+    def __init__(
+        self,
+        field,
+        pokemon_stages,
+        profile=None,
+        level_step=DEFAULT_LEVEL_STEP,
+        max_level=DEFAULT_MAX_LEVEL,
+        lines=None,
+    ):
+        self.field = field
+        self.profile = profile or scoring.DEFAULT_PROFILE
+        self.lines = list(pokemon_stages if lines is None else lines)
+        levels = list(range(max_level, 0, -level_step))
+        self.options = []
+        types = []
+        for line in self.lines:
+            opts = []
+            # Strongest first, so good rosters are found early
+            for level in levels:
+                for stage in sorted(pokemon_stages[line], key=int, reverse=True):
+                    info = pokemon_stages[line][stage]
+                    opts.append(Option(line, int(stage), level, info["name"]))
+                    types.append(info.get("type", ["Normal"]))
+            opts.append(Option(line, 0, 0))
+            self.options.append(opts)
+
+        fielded = [o for opts in self.options for o in opts if o.fielded]
+        for idx, option in enumerate(fielded):
+            option.index = idx
+        p = self.profile
+        eff = [scoring.stage_and_bonus(o.name, o.stage) for o in fielded]
+        lv = np.array([o.level for o in fielded], dtype=np.float64)
+        st = np.array([e[0] for e in eff], dtype=np.float64)
+        self.hp = np.array(
+            [p.max_hp(o.level, s, b) for o, (s, b) in zip(fielded, eff)],
+            dtype=np.float64,
+        )
+        # Type multipliers both ways between options and field entries
+        atk = field.chart.cross(types, field.types)
+        dfn = field.chart.cross(field.types, types).T
+        # Static parts of the score (everything except the HP term)
+        self.own_static = (
+            (p.level_weight * lv)[:, None]
+            + p.type_weight * atk
+            + (p.stage_weight * st)[:, None]
+        )
+        self.opp_static = (
+            (p.level_weight * field.levels)[None, :]
+            + p.type_weight * dfn
+            + (p.stage_weight * field.stages)[None, :]
+        )
+        self.field_hp = batch_engine.ProfileArrays([self.profile]).max_hp(field)[0]
+        self._super = {}
+
+    def super_option(self, line_idx, level_cap, stage_cap):
+        """
+        Score rows that dominate every option of the line within the caps.
+        """
+        key = (line_idx, level_cap, stage_cap)
+        if key not in self._super:
+            rows = [
+                o.index
+                for o in self.options[line_idx]
+                if o.fielded and o.level <= level_cap and o.stage <= stage_cap
+            ]
+            if not rows:
+                self._super[key] = None
+            else:
+                self._super[key] = (
+                    self.own_static[rows].max(axis=0),
+                    self.opp_static[rows].min(axis=0),
+                    float(self.hp[rows].max()),
+                )
+        return self._super[key]
+
+
+class Evaluator:
+    """
+    Exact roster-order battles of our roster, one Pokémon at a time,
+    against each opponent team.
+    """
+
+    def __init__(self, space, opponents):
+        self.space = space
+        self.profile = space.profile
+        self.opponents = [np.asarray(space.field.team_entries[t]) for t in opponents]
+        self.opp_hp = [
+            tuple(float(x) for x in space.field_hp[e]) for e in self.opponents
+        ]
+        self._transitions = {}  # (opp, ib, g, option key) -> _point result
+
+    def start(self):
+        # Per opponent: ({(active idx, its hp): weight}, win mass, zero mass)
+        # "zero" = opponent ran out while our Pokémon fainted in the same
+        # exchange; it is a win if we still have someone left, else a draw.
+        return (
+            tuple((((0, hp[0]), 1.0),) if hp else () for hp in self.opp_hp),
+            tuple(0.0 if hp else 1.0 for hp in self.opp_hp),
+            tuple(0.0 for _ in self.opp_hp),
+        )
+
+    def _rows(self, option):
+        if isinstance(option, tuple):
+            return option
+        i = option.index
+        return (
+            self.space.own_static[i],
+            self.space.opp_static[i],
+            float(self.space.hp[i]),
+        )
+
+    def _point(self, opp, ib, g, rows):
+        # Battles our fresh Pokémon against opponent `opp` starting at its
+        # active index ib with g HP. Returns (next states, win, zero) as
+        # probabilities.
+        own, other, h0 = rows
+        entries = self.opponents[opp]
+        hp0 = self.opp_hp[opp]
+        hw = self.profile.hp_weight
+        factor = self.profile.margin_hp_factor
+        tie = self.profile.tie_margin
+        nb = len(entries)
+        out, win, zero = {}, 0.0, 0.0
+        stack = [(ib, g, h0, 1.0)]
+        while stack:
+            i, g, h, w = stack.pop()
+            e = entries[i]
+            diff = (own[e] + hw * h) - (other[e] + hw * g)
+            if abs(diff) <= tie:
+                branches = [(True, 1, w * 0.5), (False, 1, w * 0.5)]
+            elif diff > 0:
+                branches = [(True, int(min(h, diff * factor)), w)]
+            else:
+                branches = [(False, int(min(g, -diff * factor)), w)]
+            for we_win, left, bw in branches:
+                if we_win:
+                    if i + 1 == nb:
+                        if left > 0:
+                            win += bw
+                        else:
+                            zero += bw
+                    elif left > 0:
+                        stack.append((i + 1, hp0[i + 1], left, bw))
+                    else:
+                        nxt = (i + 1, hp0[i + 1])
+                        out[nxt] = out.get(nxt, 0.0) + bw
+                elif left > 0:
+                    out[(i, left)] = out.get((i, left), 0.0) + bw
+                elif i + 1 == nb:
+                    zero += bw
+                else:
+                    nxt = (i + 1, hp0[i + 1])
+                    out[nxt] = out.get(nxt, 0.0) + bw
+        return tuple(sorted(out.items())), win, zero
+
+    def extend(self, state, option, key=None):
+        """
+        State after our next Pokémon (an Option or super rows) has fought.
+        """
+        if not isinstance(option, tuple) and not option.fielded:
+            return state
+        rows = self._rows(option)
+        key = key if key is not None else ("o", option.index)
+        dists, wins, zeros = state
+        new_dists, new_wins, new_zeros = [], [], []
+        for opp, (dist, win, zero) in enumerate(zip(dists, wins, zeros)):
+            # We still had someone to send in, so earlier zeros were wins
+            win += zero
+            zero = 0.0
+            merged = {}
+            for (ib, g), w in dist:
+                cache_key = (opp, ib, g, key)
+                hit = self._transitions.get(cache_key)
+                if hit is None:
+                    if len(self._transitions) >= TRANSITION_CACHE_SIZE:
+                        self._transitions.clear()
+                    hit = self._transitions[cache_key] = self._point(opp, ib, g, rows)
+                nxt, p_win, p_zero = hit
+                win += w * p_win
+                zero += w * p_zero
+                for point, pw in nxt:
+                    merged[point] = merged.get(point, 0.0) + w * pw
+            new_dists.append(tuple(sorted(merged.items())))
+            new_wins.append(win)
+            new_zeros.append(zero)
+        return tuple(new_dists), tuple(new_wins), tuple(new_zeros)
+
+    @staticmethod
+    def win_rate(state, optimistic=False):
+        # Mean over opponents; leftover zero mass is a draw (half a win)
+        _, wins, zeros = state
+        share = 1.0 if optimistic else 0.5
+        return sum(w + share * z for w, z in zip(wins, zeros)) / len(wins)
+
+
+class Search:
+    def __init__(
+        self,
+        space,
+        opponents,
+        level_budget,
+        stage_budget,
+        top,
+        cutoff=None,
+        tie_limit=DEFAULT_TIE_LIMIT,
+    ):
+        self.space = space
+        self.evaluator = Evaluator(space, opponents)
+        self.level_budget = level_budget
+        self.stage_budget = stage_budget
+        self.top = top
+        self.cutoff = cutoff  # shared multiprocessing.Value or None
+        self.best = []  # min-heap of (win_rate, -levels, roster)
+        self.nodes = 0
+        self.pruned = 0
+        self.tie_limit = tie_limit
+        self.ties = 0  # tied prefixes kept so far
+
+    def _prunable(self, depth, state, levels, stages_left):
+        """
+        Whether no roster below a prefix can enter the top list: its bound is
+        below the k-th best win rate (or the shared cut-off). A prefix that
+        can only tie it is kept while it could still finish on fewer levels
+        than the k-th best, for at most tie_limit such prefixes per search.
+        """
+        levels_left = self.level_budget - levels
+        upper = self.bound(depth, state, levels_left, stages_left)
+        cutoff = -1.0 if self.cutoff is None else self.cutoff.value
+        full = len(self.best) >= self.top
+        rate = self.best[0][0] if full else -1.0
+        threshold = max(rate, cutoff)
+        if upper < threshold - EPS:
+            return True
+        if upper > threshold + EPS:
+            return False
+        if full and rate >= cutoff - EPS:
+            spare = -self.best[0][1] - levels
+            if spare < 0 or (
+                spare < levels_left
+                and self.bound(depth, state, spare, stages_left) < rate - EPS
+            ):
+                return True
+        if self.ties >= self.tie_limit:
+            return True
+        self.ties += 1
+        return False
+
+    def _record(self, rate, levels, roster):
+        # Rates are rounded so that equal ones compare equal and ties fall
+        # to the level cost, however they were summed
+        rate = round(rate, 12)
+        item = (rate, -levels, tuple((o.line, o.stage, o.level) for o in roster))
+        if len(self.best) < self.top:
+            heapq.heappush(self.best, item)
+        elif item > self.best[0]:
+            heapq.heapreplace(self.best, item)
+        if self.cutoff is not None and len(self.best) >= self.top:
+            with self.cutoff.get_lock():
+                if self.best[0][0] > self.cutoff.value:
+                    self.cutoff.value = self.best[0][0]
+
+    def bound(self, depth, state, levels_left, stages_left):
+        for line_idx in range(depth, len(self.space.lines)):
+            rows = self.space.super_option(line_idx, levels_left, stages_left)
+            if rows is not None:
+                state = self.evaluator.extend(
+                    state, rows, key=("s", line_idx, levels_left, stages_left)
+                )
+        return self.evaluator.win_rate(state, optimistic=True)
+
+    def run(self, depth=0, state=None, roster=(), levels=0, stages=0):
+        if state is None:
+            state = self.evaluator.start()
+        self.nodes += 1
+        if depth == len(self.space.lines):
+            if any(o.fielded for o in roster):
+                self._record(self.evaluator.win_rate(state), levels, roster)
+            return
+        levels_left = self.level_budget - levels
+        stages_left = self.stage_budget - stages
+        if self._prunable(depth, state, levels, stages_left):
+            self.pruned += 1
+            return
+        for option in self.space.options[depth]:
+            if option.fielded and (
+                option.level > levels_left or option.stage > stages_left
+            ):
+                continue
+            self.run(
+                depth + 1,
+                self.evaluator.extend(state, option),
+                roster + (option,),
+                levels + option.level,
+                stages + (option.stage if option.fielded else 0),
+            )
+
+
+# --- Parallel driver ---
+# Each worker keeps one Search for all the branches it takes, so its top
+# list (and transition memo) carries over from branch to branch.
+_worker = {}
+
+
+def _init_worker(space, opponents, level_budget, stage_budget, top, cutoff, tie_limit):
+    _worker["search"] = Search(
+        space, opponents, level_budget, stage_budget, top, cutoff, tie_limit
+    )
+
+
+def _search_branch(option_idx):
+    search = _worker["search"]
+    nodes, pruned = search.nodes, search.pruned
+    option = search.space.options[0][option_idx]
+    if not option.fielded or (
+        option.level <= search.level_budget and option.stage <= search.stage_budget
+    ):
+        search.run(
+            1,
+            search.evaluator.extend(search.evaluator.start(), option),
+            (option,),
+            option.level,
+            option.stage,
+        )
+    return list(search.best), search.nodes - nodes, search.pruned - pruned
+
+
+def optimize(
+    field,
+    pokemon_stages,
+    level_budget,
+    stage_budget,
+    opponents=None,
+    profile=None,
+    level_step=DEFAULT_LEVEL_STEP,
+    max_level=DEFAULT_MAX_LEVEL,
+    top=DEFAULT_TOP,
+    workers=None,
+    lines=None,
+    tie_limit=DEFAULT_TIE_LIMIT,
+):
+    """
+    Returns (ranked results, stats). Each result is a dict with the roster
+    in teams_config format, its mean win rate and per-opponent win rates.
+    lines are the evolution lines searched (default: all of pokemon_stages).
+    tie_limit caps the prefixes each worker explores only to find a cheaper
+    roster at an equal win rate (0: none, the fastest search).
+    """
+    opponents = list(range(len(field.trainers))) if opponents is None else opponents
+    space = SearchSpace(field, pokemon_stages, profile, level_step, max_level, lines)
+    workers = workers or os.cpu_count() or 1
+    branches = range(len(space.options[0]))
+    best, nodes, pruned = set(), 0, 0
+    if workers > 1:
+        cutoff = multiprocessing.Value("d", -1.0)
+        with multiprocessing.Pool(
+            workers,
+            initializer=_init_worker,
+            initargs=(
+                space,
+                opponents,
+                level_budget,
+                stage_budget,
+                top,
+                cutoff,
+                tie_limit,
+            ),
+        ) as pool:
+            for part, n, p in pool.imap_unordered(_search_branch, branches):
+                best.update(part)
+                nodes += n
+                pruned += p
+    else:
+        _init_worker(space, opponents, level_budget, stage_budget, top, None, tie_limit)
+        for idx in branches:
+            part, n, p = _search_branch(idx)
+            best.update(part)
+            nodes += n
+            pruned += p
+    best = heapq.nlargest(top, best)
+
+    evaluator = Evaluator(space, opponents)
+    results = []
+    for rate, neg_levels, roster in best:
+        options = [
+            next(o for o in opts if (o.line, o.stage, o.level) == key)
+            for opts, key in zip(space.options, roster)
+        ]
+        state = evaluator.start()
+        for option in options:
+            state = evaluator.extend(state, option)
+        _, wins, zeros = state
+        results.append(
+            {
+                "win_rate": round(rate, 6),
+                "total_level": -neg_levels,
+                "total_stage": sum(o.stage for o in options if o.fielded),
+                "vs": {
+                    field.trainers[t]: round(w + 0.5 * z, 4)
+                    for t, w, z in zip(opponents, wins, zeros)
+                },
+                "pokemon": [o.to_config() for o in options],
+            }
+        )
+    return results, {"nodes": nodes, "pruned": pruned, "workers": workers}
+
+
+def format_results(results, stats, elapsed):
+    lines = [
+        f"Searched {stats['nodes']} nodes ({stats['pruned']} pruned) on "
+        f"{stats['workers']} workers in {elapsed:.2f}s"
+    ]
+    for rank, res in enumerate(results, 1):
+        roster = ", ".join(
+            f"{p['name'].split(' / ')[p['stage'] - 1]} Lv{p['level']}"
+            for p in res["pokemon"]
+            if p["level"] > 0
+        )
+        lines.append(
+            f"{rank:>2}. {res['win_rate']:.1%} (levels {res['total_level']}, "
+            f"stages {res['total_stage']}): {roster}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--config", default=batch_engine.CONFIG_PATH)
+    parser.add_argument(
+        "--stages", help="species store or stages JSON (default: the species store)"
+    )
+    parser.add_argument(
+        "--line",
+        action="append",
+        help="evolution line to build from (repeatable, default: every line of "
+        "--stages, or of pokemon_stages.json)",
+    )
+    parser.add_argument("--profile", help="ScoringProfile JSON file")
+    parser.add_argument("--level-budget", type=int, help="max total level")
+    parser.add_argument("--stage-budget", type=int, help="max sum of stages")
+    parser.add_argument("--level-step", type=int, default=DEFAULT_LEVEL_STEP)
+    parser.add_argument("--max-level", type=int, default=DEFAULT_MAX_LEVEL)
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP)
+    parser.add_argument("--workers", type=int, help="default: all cores")
+    parser.add_argument(
+        "--tie-limit",
+        type=int,
+        default=DEFAULT_TIE_LIMIT,
+        help="prefixes explored per worker only to find cheaper rosters at an "
+        "equal win rate",
+    )
+    parser.add_argument(
+        "--against", action="append", help="trainer to play against (repeatable)"
+    )
+    parser.add_argument("--json", help="write the ranked rosters here")
+    args = parser.parse_args(argv)
+
+    teams_config = batch_engine.load_json(args.config)
+    pokemon_stages = species_db.load_stages(args.stages)
+    lines = args.line
+    if lines is None and args.stages is None:
+        # Every species of the store is a line: search the curated ones
+        lines = list(batch_engine.load_json(batch_engine.STAGES_PATH))
+    field = batch_engine.Field(teams_config, pokemon_stages)
+    opponents = None
+    if args.against:
+        opponents = [field.trainers.index(name) for name in args.against]
+    # Default budgets: the field's average spend
+    totals = [field.levels[e].sum() for e in field.team_entries]
+    stage_totals = [field.stages[e].sum() for e in field.team_entries]
+    level_budget = args.level_budget or int(round(sum(totals) / len(totals)))
+    stage_budget = args.stage_budget or int(
+        round(sum(stage_totals) / len(stage_totals))
+    )
+    profile = scoring.ScoringProfile.load(args.profile) if args.profile else None
+
+    start = time.perf_counter()
+    results, stats = optimize(
+        field,
+        pokemon_stages,
+        level_budget,
+        stage_budget,
+        opponents,
+        profile,
+        args.level_step,
+        args.max_level,
+        args.top,
+        args.workers,
+        lines,
+        args.tie_limit,
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Level budget {level_budget}, stage budget {stage_budget}")
+    print(format_results(results, stats, elapsed))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Tests of the scoring kernels: the Numba backend matches the Python one, and
+the Python fallback takes over when Numba is missing.
+
+Run with:
+    python -m pytest main/test_kernels.py
+"""
+
+import importlib.util
+import os
+import random
+import sys
+import unittest
+from unittest import mock
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+import kernels  # noqa: E402
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def fresh_kernels(name, modules=None, env=None):
+    """
+    A fresh copy of the kernels module, imported with sys.modules and the
+    environment patched (e.g. {"numba": None} makes Numba unimportable).
+    """
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(BASE_DIR, "kernels.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    with mock.patch.dict(sys.modules, modules or {}), mock.patch.dict(
+        os.environ, env or {}
+    ):
+        spec.loader.exec_module(module)
+    return module
+
+
+def random_teams(seed, team_size=8):
+    rng = random.Random(seed)
+    sides = [
+        (
+            [rng.randint(1, 60) for _ in range(team_size)],
+            [rng.randint(1, 300) for _ in range(team_size)],
+            [rng.randint(1, 3) for _ in range(team_size)],
+        )
+        for _ in range(2)
+    ]
+    mults = [0.0, 0.5, 1.0, 2.0]
+    mult_ab = [[rng.choice(mults) for _ in range(team_size)] for _ in range(team_size)]
+    mult_ba = [[rng.choice(mults) for _ in range(team_size)] for _ in range(team_size)]
+    coins = [rng.random() < 0.5 for _ in range(2 * team_size)]
+    return sides, mult_ab, mult_ba, coins
+
+
+class BackendParityTest(unittest.TestCase):
+    def setUp(self):
+        self.previous = kernels.active_backend()
+
+    def tearDown(self):
+        kernels.set_backend(self.previous)
+
+    @unittest.skipUnless("numba" in kernels.available_backends(), "needs Numba")
+    def test_backends_agree(self):
+        for seed in range(3):
+            self.assertEqual(kernels.check_backends(num_cases=500, seed=seed), [])
+
+    @unittest.skipUnless("numba" in kernels.available_backends(), "needs Numba")
+    def test_team_battles_agree(self):
+        for seed in range(20):
+            (a, b), mult_ab, mult_ba, coins = random_teams(seed)
+            results = []
+            for name in ("python", "numba"):
+                kernels.set_backend(name)
+                results.append(
+                    kernels.team_battle(*a, *b, mult_ab, mult_ba, coins=coins)
+                )
+            self.assertEqual(results[0], results[1])
+
+    @unittest.skipUnless("numba" in kernels.available_backends(), "needs Numba")
+    def test_auto_compiles_only_batch_kernels(self):
+        kernels.set_backend("auto")
+        self.assertEqual(kernels.active_backend(), "numba")
+        self.assertEqual(kernels._compiled, set(kernels.BATCH_KERNELS))
+
+    @unittest.skipIf(np is None, "needs NumPy")
+    def test_batch_arrays_in_arrays_out(self):
+        rng = np.random.default_rng(0)
+        levels, hps, mults, stages = rng.uniform(1, 100, size=(4, 50))
+        coins = rng.random(50) < 0.5
+        for name in kernels.available_backends():
+            kernels.set_backend(name)
+            scores = kernels.score_batch(levels, hps, mults, stages)
+            self.assertIsInstance(scores, np.ndarray)
+            self.assertEqual(
+                scores.tolist(),
+                kernels.score_batch(
+                    levels.tolist(), hps.tolist(), mults.tolist(), stages.tolist()
+                ),
+            )
+            winners, winner_hps = kernels.resolve_batch(
+                scores, scores[::-1], hps, hps[::-1], coins
+            )
+            self.assertIsInstance(winners, np.ndarray)
+            self.assertEqual(
+                (winners.tolist(), winner_hps.tolist()),
+                kernels.resolve_batch(
+                    scores.tolist(),
+                    scores[::-1].tolist(),
+                    hps.tolist(),
+                    hps[::-1].tolist(),
+                    coins.tolist(),
+                ),
+            )
+
+    @unittest.skipIf(np is None, "needs NumPy")
+    def test_coins_as_array(self):
+        (a, b), mult_ab, mult_ba, coins = random_teams(0)
+        for name in kernels.available_backends():
+            kernels.set_backend(name)
+            self.assertEqual(
+                kernels.team_battle(*a, *b, mult_ab, mult_ba, coins=np.array(coins)),
+                kernels.team_battle(*a, *b, mult_ab, mult_ba, coins=coins),
+            )
+
+
+class PythonFallbackTest(unittest.TestCase):
+    def test_python_backend_without_numba(self):
+        fallback = fresh_kernels("kernels_no_numba", modules={"numba": None})
+        self.assertEqual(fallback.available_backends(), ["python"])
+        self.assertEqual(fallback.active_backend(), "python")
+        self.assertEqual(fallback.set_backend("auto"), "python")
+        with self.assertRaises(ValueError):
+            fallback.set_backend("numba")
+        self.assertEqual(fallback.check_backends(num_cases=200), [])
+
+    def test_fallback_matches_default_backend(self):
+        fallback = fresh_kernels("kernels_no_numba", modules={"numba": None})
+        previous = kernels.active_backend()
+        try:
+            kernels.set_backend("auto")
+            for seed in range(5):
+                (a, b), mult_ab, mult_ba, coins = random_teams(seed)
+                self.assertEqual(
+                    fallback.team_battle(*a, *b, mult_ab, mult_ba, coins=coins),
+                    kernels.team_battle(*a, *b, mult_ab, mult_ba, coins=coins),
+                )
+        finally:
+            kernels.set_backend(previous)
+
+    def test_forced_python_backend(self):
+        forced = fresh_kernels("kernels_forced", env={"POKE_SIM_BACKEND": "python"})
+        self.assertEqual(forced.active_backend(), "python")
+
+
+if __name__ == "__main__":
+    unittest.main()
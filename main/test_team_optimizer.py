@@ -0,0 +1,69 @@
+"""
+Tests of the team optimizer: the README example stays fast, and equal win
+rates are ranked by level cost the same way serially and in parallel.
+
+Run with:
+    python -m pytest main/test_team_optimizer.py
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+import batch_engine  # noqa: E402
+import team_optimizer  # noqa: E402
+
+README_EXAMPLE = ["--level-budget", "240", "--stage-budget", "18", "--top", "10"]
+TIME_LIMIT = 30  # seconds; the example takes about one on a single core
+
+
+def summary(results):
+    return [(r["win_rate"], r["total_level"], r["pokemon"]) for r in results]
+
+
+class ReadmeExampleTest(unittest.TestCase):
+    def test_finishes_within_time_limit(self):
+        proc = subprocess.run(
+            [
+                sys.executable,
+                os.path.join(BASE_DIR, "team_optimizer.py"),
+                *README_EXAMPLE,
+                "--workers",
+                "1",
+            ],
+            capture_output=True,
+            text=True,
+            timeout=TIME_LIMIT,
+        )
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertIn("Searched", proc.stdout)
+
+
+class TieRankingTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.stages = batch_engine.load_json(batch_engine.STAGES_PATH)
+        cls.field = batch_engine.Field(
+            batch_engine.load_json(batch_engine.CONFIG_PATH), cls.stages
+        )
+
+    def optimize(self, **options):
+        results, _ = team_optimizer.optimize(
+            self.field, self.stages, 150, 12, level_step=25, top=5, **options
+        )
+        return summary(results)
+
+    def test_cheapest_of_equal_win_rates(self):
+        serial = self.optimize(workers=1)
+        self.assertEqual(serial, sorted(serial, key=lambda r: (-r[0], r[1])))
+        # Every roster of this budget loses, so the cheapest fielded one wins
+        self.assertEqual([r[1] for r in serial], [25] * 5)
+        self.assertEqual(self.optimize(workers=2), serial)
+
+
+if __name__ == "__main__":
+    unittest.main()
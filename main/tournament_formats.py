@@ -0,0 +1,669 @@
+"""
+Tournament formats for events of any size.
+
+Each format hands out its pairings one round at a time (``pending()``) and
+takes results one match at a time (``record()``), so the same objects drive
+the interactive TournamentWindow and fully automatic runs. Matches within a
+round are independent and ``run()`` can play them on a process pool.
+Standings (points, wins, Buchholz) are updated per result rather than
+recomputed from the match history.
+
+Formats:
+    round_robin   everyone plays everyone (circle method, n-1 rounds)
+    swiss         ceil(log2 n) rounds pairing trainers on equal points
+    single_elim   seeded knockout bracket with byes
+    double_elim   knockout where a trainer is out after two losses
+    groups        round-robin groups, then a knockout of the top finishers
+
+Example:
+    python main/tournament_formats.py swiss --random-teams 64 --workers 4
+"""
+
+import argparse
+import math
+import multiprocessing
+import random
+import sys
+import time
+from array import array
+
+import kernels
+import scoring
+import shared_tables
+import type_charts
+
+# --- Standings ---
+
+
+class Standings:
+    """
+    Points table updated incrementally: a win is 1 point, a draw 0.5.
+    Buchholz (sum of opponents' points) breaks ties.
+    """
+
+    def __init__(self, trainers):
+        self.trainers = list(trainers)
+        n = len(self.trainers)
+        self.points = [0.0] * n
+        self.wins = [0] * n
+        self.draws = [0] * n
+        self.losses = [0] * n
+        self.byes = [0] * n
+        self.buchholz = [0.0] * n
+        self.opponents = [[] for _ in range(n)]
+
+    def _add_points(self, player, points):
+        self.points[player] += points
+        for opp in self.opponents[player]:
+            self.buchholz[opp] += points
+
+    def record(self, a, b, winner):
+        """
+        winner is a, b, or None for a draw.
+        """
+        self.opponents[a].append(b)
+        self.opponents[b].append(a)
+        self.buchholz[a] += self.points[b]
+        self.buchholz[b] += self.points[a]
+        if winner is None:
+            self.draws[a] += 1
+            self.draws[b] += 1
+            self._add_points(a, 0.5)
+            self._add_points(b, 0.5)
+        else:
+            loser = b if winner == a else a
+            self.wins[winner] += 1
+            self.losses[loser] += 1
+            self._add_points(winner, 1.0)
+
+    def record_bye(self, player):
+        self.byes[player] += 1
+        self.wins[player] += 1
+        self._add_points(player, 1.0)
+
+    def ranking(self, players=None):
+        players = range(len(self.trainers)) if players is None else players
+        return sorted(players, key=lambda p: (-self.points[p], -self.buchholz[p], p))
+
+    def rows(self, players=None):
+        """
+        (trainer, points, wins, draws, losses) in ranking order.
+        """
+        return [
+            (
+                self.trainers[p],
+                self.points[p],
+                self.wins[p],
+                self.draws[p],
+                self.losses[p],
+            )
+            for p in self.ranking(players)
+        ]
+
+
+# --- Formats ---
+
+
+class Tournament:
+    """
+    Base class. Subclasses implement _next_round() returning the pairings of
+    the next round (an empty list once the event is over) and may react to
+    results in _on_result(). Players are indices into trainers; formats
+    nested in another one share its Standings.
+    """
+
+    name = ""
+    # Knockout formats need a winner: a drawn match is replayed
+    decisive = False
+
+    def __init__(self, trainers, players=None, standings=None):
+        self.trainers = list(trainers)
+        self.players = list(range(len(self.trainers)) if players is None else players)
+        self.standings = standings or Standings(self.trainers)
+        self.round = 0
+        self.history = []  # (round, a, b, winner)
+        self.finished = False
+        self._pending = []
+        self._replays = {}
+
+    def pending(self):
+        """
+        Unplayed pairings of the current round; starts the next round when
+        the current one is complete.
+        """
+        if not self._pending and not self.finished:
+            pairings = self._next_round()
+            if pairings:
+                self.round += 1
+                self._pending = list(pairings)
+            else:
+                self.finished = True
+        return list(self._pending)
+
+    def match_key(self, a, b):
+        """
+        Identifies one game of a pairing, replays included.
+        """
+        return f"{self.round}:{a}:{b}:{self._replays.get((a, b), 0)}"
+
+    def record(self, a, b, winner):
+        self._pending.remove((a, b))
+        if winner is None and self.decisive:
+            self._replays[(a, b)] = self._replays.get((a, b), 0) + 1
+            self._pending.append((a, b))
+            return
+        self.history.append((self.round, a, b, winner))
+        self._apply(a, b, winner)
+
+    def _apply(self, a, b, winner):
+        self.standings.record(a, b, winner)
+        self._on_result(a, b, winner)
+
+    def _next_round(self):
+        raise NotImplementedError
+
+    def _on_result(self, a, b, winner):
+        pass
+
+    def champion(self):
+        if not self.finished:
+            return None
+        return self.standings.ranking(self.players)[0]
+
+
+class RoundRobin(Tournament):
+    name = "round_robin"
+
+    def __init__(self, trainers, players=None, standings=None):
+        super().__init__(trainers, players, standings)
+        # Circle method: fix the first slot, rotate the rest
+        self._circle = list(self.players)
+        if len(self._circle) % 2:
+            self._circle.append(None)
+        self._rounds = len(self._circle) - 1
+
+    def _next_round(self):
+        if self.round >= self._rounds:
+            return []
+        c = self._circle
+        half = len(c) // 2
+        pairings = []
+        for k in range(half):
+            a, b = c[k], c[-1 - k]
+            if a is not None and b is not None:
+                pairings.append((a, b))
+        self._circle = [c[0], c[-1]] + c[1:-1]
+        return pairings
+
+
+class Swiss(Tournament):
+    name = "swiss"
+
+    def __init__(self, trainers, players=None, standings=None, rounds=None):
+        super().__init__(trainers, players, standings)
+        n = len(self.players)
+        self.rounds = rounds or max(1, math.ceil(math.log2(max(n, 2))))
+
+    def _next_round(self):
+        if self.round >= self.rounds or len(self.players) < 2:
+            return []
+        order = self.standings.ranking(self.players)
+        if len(order) % 2:
+            # Bye to the lowest-ranked trainer with the fewest byes
+            bye = min(reversed(order), key=lambda p: self.standings.byes[p])
+            order.remove(bye)
+            self.standings.record_bye(bye)
+        pairings = []
+        while order:
+            a = order.pop(0)
+            played = set(self.standings.opponents[a])
+            b = next((p for p in order if p not in played), order[0])
+            order.remove(b)
+            pairings.append((a, b))
+        return pairings
+
+
+def bracket_order(size):
+    """
+    Seed positions for a bracket of the given power-of-two size, so that
+    seeds 1 and 2 can only meet in the final: 4 -> [0, 3, 1, 2].
+    """
+    order = [0]
+    while len(order) < size:
+        n = len(order) * 2
+        order = [s for seed in order for s in (seed, n - 1 - seed)]
+    return order
+
+
+class SingleElimination(Tournament):
+    name = "single_elim"
+    decisive = True
+
+    def __init__(self, trainers, players=None, standings=None):
+        super().__init__(trainers, players, standings)
+        size = 1 << max(0, len(self.players) - 1).bit_length()
+        seeds = list(self.players) + [None] * (size - len(self.players))
+        self._slots = [seeds[s] for s in bracket_order(size)]
+        self._winners = {}
+
+    def _next_round(self):
+        if self.round:
+            # Collapse the finished round into its winners
+            self._slots = [
+                self._winners.get(pair, pair[0] if pair[1] is None else pair[1])
+                for pair in zip(self._slots[::2], self._slots[1::2])
+            ]
+        if len(self._slots) <= 1:
+            return []
+        # A pair with an empty slot is a bye: the other trainer advances
+        return [
+            (a, b)
+            for a, b in zip(self._slots[::2], self._slots[1::2])
+            if a is not None and b is not None
+        ]
+
+    def _on_result(self, a, b, winner):
+        self._winners[(a, b)] = winner
+
+    def champion(self):
+        return self._slots[0] if self.finished and self._slots else None
+
+
+class DoubleElimination(Tournament):
+    """
+    Trainers are out after their second loss. Each round pairs the unbeaten
+    trainers among themselves and the once-beaten ones among themselves;
+    the last unbeaten and last once-beaten trainer then meet in the final,
+    which is played again if the unbeaten trainer loses it.
+    """
+
+    name = "double_elim"
+    decisive = True
+
+    def _pools(self):
+        losses = self.standings.losses
+        upper = [p for p in self.players if losses[p] == 0]
+        lower = [p for p in self.players if losses[p] == 1]
+        return upper, lower
+
+    @staticmethod
+    def _pair(pool):
+        # Highest seed gets the bye; the rest meet in bracket fashion
+        if len(pool) % 2:
+            pool = pool[1:]
+        half = len(pool) // 2
+        return [(pool[k], pool[-1 - k]) for k in range(half)]
+
+    def _next_round(self):
+        upper, lower = self._pools()
+        if len(upper) + len(lower) <= 1:
+            return []
+        if len(upper) == 1 and len(lower) == 1:
+            return [(upper[0], lower[0])]
+        return self._pair(upper) + self._pair(lower)
+
+    def champion(self):
+        if not self.finished:
+            return None
+        upper, lower = self._pools()
+        return (upper + lower)[0]
+
+
+class GroupsKnockout(Tournament):
+    """
+    Round-robin groups (snake-seeded) played side by side, then a single
+    elimination bracket of the best `advance` trainers of every group.
+    """
+
+    name = "groups"
+
+    def __init__(self, trainers, players=None, standings=None, group_size=4, advance=2):
+        super().__init__(trainers, players, standings)
+        num_groups = max(1, math.ceil(len(self.players) / group_size))
+        groups = [[] for _ in range(num_groups)]
+        for k, p in enumerate(self.players):
+            lap, pos = divmod(k, num_groups)
+            groups[pos if lap % 2 == 0 else num_groups - 1 - pos].append(p)
+        self.advance = advance
+        self.groups = [RoundRobin(self.trainers, g, self.standings) for g in groups]
+        self.knockout = None
+
+    @property
+    def stage(self):
+        return "knockout" if self.knockout else "groups"
+
+    @property
+    def decisive(self):
+        return self.knockout is not None
+
+    def _next_round(self):
+        if self.knockout is None:
+            pairings = [pair for g in self.groups for pair in g.pending()]
+            if pairings:
+                return pairings
+            # Group winners are seeded first, then runners-up, and so on
+            ranked = [self.standings.ranking(g.players) for g in self.groups]
+            qualifiers = [
+                r[place]
+                for place in range(self.advance)
+                for r in ranked
+                if place < len(r)
+            ]
+            self.knockout = SingleElimination(self.trainers, qualifiers, self.standings)
+        return self.knockout.pending()
+
+    def _apply(self, a, b, winner):
+        if self.knockout is None:
+            group = next(g for g in self.groups if a in g.players)
+            group.record(a, b, winner)
+        else:
+            self.knockout.record(a, b, winner)
+
+    def champion(self):
+        if not self.finished or self.knockout is None:
+            return None
+        return self.knockout.champion()
+
+
+FORMATS = {
+    cls.name: cls
+    for cls in (RoundRobin, Swiss, SingleElimination, DoubleElimination, GroupsKnockout)
+}
+
+
+def make_tournament(name, trainers, **options):
+    try:
+        cls = FORMATS[name]
+    except KeyError:
+        raise ValueError(f"Unknown format {name!r}, expected one of {list(FORMATS)}")
+    return cls(trainers, **options)
+
+
+# --- Automatic match resolution ---
+
+
+class MatchEngine:
+    """
+    Resolves team battles with the deterministic model, both teams sending
+    their Pokémon in roster order. Tie coins are seeded from the match key,
+    so results do not depend on the number of workers.
+
+    Rosters are compiled into flat tables: level, HP, stage and type
+    combination per entry, each team's first entry, and the multiplier
+    between every pair of type combinations under the tournament's type
+    chart (chart: a type_charts name, None for type_effectiveness.csv).
+    run() publishes them once in shared memory and workers attach to them
+    instead of rebuilding them.
+    """
+
+    TABLES = ("level", "hp", "stage", "combo", "team_start", "type_mult")
+
+    def __init__(
+        self, teams_config, pokemon_stages, profile=None, seed=0, chart=None
+    ):
+        self._settings(profile, seed)
+        level, hp, stage = array("d"), array("d"), array("d")
+        combo, team_start = array("q"), array("q", [0])
+        combos = {}
+        for team in teams_config:
+            for poke in team["pokemon"]:
+                if poke.get("level", 0) <= 0:
+                    continue
+                info = pokemon_stages[poke["name"]][str(poke["stage"])]
+                entry_stage, bonus = scoring.stage_and_bonus(
+                    info["name"], poke["stage"]
+                )
+                types = tuple(info.get("type", ["Normal"]))
+                level.append(poke["level"])
+                hp.append(self.profile.max_hp(poke["level"], entry_stage, bonus))
+                stage.append(entry_stage)
+                combo.append(combos.setdefault(types, len(combos)))
+            team_start.append(len(level))
+        type_mult = type_charts.get(chart).combo_matrix(list(combos))
+        self.arrays = {
+            "level": level,
+            "hp": hp,
+            "stage": stage,
+            "combo": combo,
+            "team_start": team_start,
+            "type_mult": (type_mult, (len(combos), len(combos))),
+        }
+        views = {}
+        for name, value in self.arrays.items():
+            if isinstance(value, tuple):
+                value, shape = value
+                views[name] = memoryview(value).cast("B").cast("d", shape)
+            else:
+                views[name] = memoryview(value)
+        self._use(views)
+
+    def _settings(self, profile, seed):
+        self.profile = profile or scoring.DEFAULT_PROFILE
+        self.params = self.profile.params()
+        self.seed = seed
+
+    def _use(self, tables):
+        for name in self.TABLES:
+            setattr(self, name, tables[name])
+
+    def share(self, path=None):
+        """
+        Publishes the tables (in shared memory, or in a file to mmap) and
+        returns them; close() them once the workers are done.
+        """
+        return shared_tables.publish(self.arrays, path)
+
+    @classmethod
+    def attach(cls, handle, profile=None, seed=0):
+        """
+        An engine reading tables published by share(), without copying them.
+        """
+        engine = cls.__new__(cls)
+        engine._settings(profile, seed)
+        engine.arrays = None
+        engine.tables = shared_tables.attach(handle)
+        engine._use(engine.tables)
+        return engine
+
+    def play(self, a, b, key=""):
+        """
+        Returns a, b, or None for a draw.
+        """
+        sa, ea = self.team_start[a], self.team_start[a + 1]
+        sb, eb = self.team_start[b], self.team_start[b + 1]
+        if sa == ea or sb == eb:
+            return a if sa < ea else (b if sb < eb else None)
+        rng = random.Random(f"{self.seed}:{key}:{a}:{b}")
+        coins = [rng.random() < 0.5 for _ in range(ea - sa + eb - sb)]
+        ca, cb = self.combo[sa:ea].tolist(), self.combo[sb:eb].tolist()
+        mult = self.type_mult
+        winner, _, _, _ = kernels.team_battle(
+            self.level[sa:ea].tolist(),
+            self.hp[sa:ea].tolist(),
+            self.stage[sa:ea].tolist(),
+            self.level[sb:eb].tolist(),
+            self.hp[sb:eb].tolist(),
+            self.stage[sb:eb].tolist(),
+            [[mult[i, j] for j in cb] for i in ca],
+            [[mult[j, i] for i in ca] for j in cb],
+            coins,
+            self.params,
+        )
+        if winner == kernels.A_WINS:
+            return a
+        if winner == kernels.B_WINS:
+            return b
+        return None
+
+    def play_many(self, matches):
+        """
+        Plays a batch of (a, b, key) matches in one call.
+        """
+        return [self.play(a, b, key) for a, b, key in matches]
+
+
+_worker = {}
+
+
+def _init_worker(handle, profile, seed):
+    _worker["engine"] = MatchEngine.attach(handle, profile, seed)
+
+
+def _play(match):
+    a, b, key = match
+    return _worker["engine"].play(a, b, key)
+
+
+def run(tournament, engine, workers=1, on_round=None):
+    """
+    Plays the tournament to the end. Matches of a round are spread over
+    `workers` processes; on_round(tournament) is called after every round.
+    """
+    pool = tables = None
+    if workers > 1:
+        # Workers attach to one shared copy of the tables; tasks carry
+        # only (a, b, key)
+        tables = engine.share()
+        pool = multiprocessing.Pool(
+            workers,
+            initializer=_init_worker,
+            initargs=(tables.handle, engine.profile, engine.seed),
+        )
+    else:
+        _worker["engine"] = engine
+    try:
+        while True:
+            pairings = tournament.pending()
+            if not pairings:
+                break
+            matches = [(a, b, tournament.match_key(a, b)) for a, b in pairings]
+            if pool is None:
+                results = [_play(m) for m in matches]
+            else:
+                chunk = max(1, len(matches) // (workers * 4))
+                results = pool.map(_play, matches, chunksize=chunk)
+            for (a, b), winner in zip(pairings, results):
+                tournament.record(a, b, winner)
+            if on_round and not tournament.pending():
+                on_round(tournament)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        else:
+            # Do not keep the last engine's tables alive between runs
+            _worker.pop("engine", None)
+        if tables is not None:
+            tables.close()
+    return tournament
+
+
+# --- CLI ---
+
+
+def random_teams_config(num_teams, pokemon_stages, team_size=8, seed=0):
+    """
+    Random rosters for trying out large events.
+    """
+    rng = random.Random(seed)
+    species = sorted(pokemon_stages)
+    config = []
+    for t in range(num_teams):
+        pokemon = []
+        for name in rng.sample(species, min(team_size, len(species))):
+            stage = rng.choice(sorted(pokemon_stages[name], key=int))
+            pokemon.append(
+                {"name": name, "stage": int(stage), "level": rng.randint(5, 50)}
+            )
+        config.append({"trainer": f"Trainer {t + 1}", "pokemon": pokemon})
+    return config
+
+
+def format_standings(tournament, limit=None):
+    rows = tournament.standings.rows(tournament.players)[:limit]
+    width = max(len(r[0]) for r in rows) if rows else 7
+    lines = [f"{'#':>3} {'Trainer':<{width}} {'Pts':>5} {'W':>3} {'D':>3} {'L':>3}"]
+    for k, (trainer, points, wins, draws, losses) in enumerate(rows, 1):
+        lines.append(
+            f"{k:>3} {trainer:<{width}} {points:>5g} {wins:>3} {draws:>3} {losses:>3}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import batch_engine
+    import species_db
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("format", choices=list(FORMATS))
+    parser.add_argument(
+        "--config", help="teams config JSON (default: teams_config.json)"
+    )
+    parser.add_argument(
+        "--random-teams", type=int, help="use this many random teams instead"
+    )
+    parser.add_argument(
+        "--species", help="species store or stages JSON (default: species.db)"
+    )
+    parser.add_argument("--profile", help="ScoringProfile JSON file")
+    parser.add_argument(
+        "--type-chart",
+        choices=list(type_charts.CHARTS),
+        help="type chart (default: type_effectiveness.csv)",
+    )
+    parser.add_argument("--rounds", type=int, help="Swiss rounds")
+    parser.add_argument("--group-size", type=int, default=4)
+    parser.add_argument("--advance", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top", type=int, default=16, help="standings rows shown")
+    parser.add_argument(
+        "--ratings", help="rating file: seeds the event and is updated with results"
+    )
+    args = parser.parse_args(argv)
+
+    pokemon_stages = species_db.load_stages(args.species)
+    if args.random_teams:
+        config = random_teams_config(args.random_teams, pokemon_stages, seed=args.seed)
+    else:
+        config = batch_engine.load_json(args.config or batch_engine.CONFIG_PATH)
+    profile = scoring.ScoringProfile.load(args.profile) if args.profile else None
+
+    options = {}
+    if args.format == "swiss":
+        options["rounds"] = args.rounds
+    elif args.format == "groups":
+        options.update(group_size=args.group_size, advance=args.advance)
+    trainers = [team["trainer"] for team in config]
+    ratings = None
+    if args.ratings:
+        import ratings as rating_tables
+
+        ratings = rating_tables.Ratings(args.ratings)
+        options["players"] = ratings.trainers.seed_order(trainers)
+    tournament = make_tournament(args.format, trainers, **options)
+    engine = MatchEngine(config, pokemon_stages, profile, args.seed, args.type_chart)
+
+    start = time.perf_counter()
+    run(tournament, engine, args.workers)
+    elapsed = time.perf_counter() - start
+    if ratings is not None:
+        for _, a, b, winner in tournament.history:
+            ratings.record_battle(
+                trainers[a], trainers[b], None if winner is None else trainers[winner]
+            )
+        ratings.save()
+
+    print(format_standings(tournament, args.top))
+    champion = tournament.champion()
+    print()
+    print(f"Champion: {trainers[champion] if champion is not None else '-'}")
+    print(
+        f"{len(tournament.history)} matches in {tournament.round} rounds, "
+        f"{elapsed:.2f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
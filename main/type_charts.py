@@ -0,0 +1,275 @@
+"""
+Named type charts compiled to dense matrices.
+
+Every chart is compiled once, on first use, into a (T + 1, T + 1) matrix of
+multipliers (attacking type by defending type) over one shared type index,
+TYPES. The extra last row and column, NONE, are neutral: they pad
+single-typed Pokémon and stand in for types a chart does not know, such as
+Steel in gen1. Engines take a chart name per call or per tournament and
+only look the matrix up, so rulesets can be compared side by side.
+
+    gen1     the original chart: no Dark, Steel or Fairy, Ghost does not
+             affect Psychic, Bug and Poison hit each other super effectively
+    gen2-5   adds Dark and Steel (the chart of type_effectiveness.csv)
+    gen6+    adds Fairy, Steel no longer resists Ghost and Dark
+
+The chart in type_effectiveness.csv stays the default (chart None). It is
+compiled once too; whoever reloads the CSV (incremental.py edits it in
+place) calls reload_file_chart() so the next get() compiles it again.
+
+Example:
+    python main/type_charts.py fire grass/poison --chart gen1
+"""
+
+import argparse
+import sys
+from array import array
+
+TYPES = (
+    "normal",
+    "fire",
+    "water",
+    "electric",
+    "grass",
+    "ice",
+    "fighting",
+    "poison",
+    "ground",
+    "flying",
+    "psychic",
+    "bug",
+    "rock",
+    "ghost",
+    "dragon",
+    "dark",
+    "steel",
+    "fairy",
+)
+INDEX = {t: i for i, t in enumerate(TYPES)}
+NONE = len(TYPES)
+SIZE = len(TYPES) + 1
+
+# Non-neutral matchups of the gen2-5 chart: attacker -> {multiplier: defenders}
+GEN2_5 = {
+    "normal": {0.5: "rock steel", 0: "ghost"},
+    "fire": {2: "grass ice bug steel", 0.5: "fire water rock dragon"},
+    "water": {2: "fire ground rock", 0.5: "water grass dragon"},
+    "electric": {2: "water flying", 0.5: "electric grass dragon", 0: "ground"},
+    "grass": {
+        2: "water ground rock",
+        0.5: "fire grass poison flying bug dragon steel",
+    },
+    "ice": {2: "grass ground flying dragon", 0.5: "fire water ice steel"},
+    "fighting": {
+        2: "normal ice rock dark steel",
+        0.5: "poison flying psychic bug",
+        0: "ghost",
+    },
+    "poison": {2: "grass", 0.5: "poison ground rock ghost", 0: "steel"},
+    "ground": {2: "fire electric poison rock steel", 0.5: "grass bug", 0: "flying"},
+    "flying": {2: "grass fighting bug", 0.5: "electric rock steel"},
+    "psychic": {2: "fighting poison", 0.5: "psychic steel", 0: "dark"},
+    "bug": {2: "grass psychic dark", 0.5: "fire fighting poison flying ghost steel"},
+    "rock": {2: "fire ice flying bug", 0.5: "fighting ground steel"},
+    "ghost": {2: "psychic ghost", 0.5: "dark steel", 0: "normal"},
+    "dragon": {2: "dragon", 0.5: "steel"},
+    "dark": {2: "psychic ghost", 0.5: "fighting dark steel"},
+    "steel": {2: "ice rock", 0.5: "fire water electric steel"},
+}
+
+# Every chart: its types and its changes to gen2-5, (attacker, defender) -> multiplier
+CHARTS = {
+    "gen1": (
+        TYPES[:15],
+        {
+            ("ghost", "psychic"): 0,
+            ("bug", "poison"): 2,
+            ("poison", "bug"): 2,
+            ("ice", "fire"): 1,
+        },
+    ),
+    "gen2-5": (TYPES[:17], {}),
+    "gen6+": (
+        TYPES,
+        {
+            ("ghost", "steel"): 1,
+            ("dark", "steel"): 1,
+            ("fairy", "fighting"): 2,
+            ("fairy", "dragon"): 2,
+            ("fairy", "dark"): 2,
+            ("fairy", "fire"): 0.5,
+            ("fairy", "poison"): 0.5,
+            ("fairy", "steel"): 0.5,
+            ("fighting", "fairy"): 0.5,
+            ("bug", "fairy"): 0.5,
+            ("dark", "fairy"): 0.5,
+            ("poison", "fairy"): 2,
+            ("steel", "fairy"): 2,
+            ("dragon", "fairy"): 0,
+        },
+    ),
+}
+DEFAULT_CHART = None  # type_effectiveness.csv
+
+_compiled = {}
+
+
+class TypeChart:
+    """
+    A compiled chart. matrix[a, d] is the multiplier of attacking type
+    index a against defending type index d.
+    """
+
+    def __init__(self, name, multipliers):
+        # multipliers: (attacker, defender) -> multiplier, lowercase names
+        self.name = name
+        self.table = array("d", [1.0]) * (SIZE * SIZE)
+        for (atk, dft), mult in multipliers.items():
+            if atk in INDEX and dft in INDEX:
+                self.table[INDEX[atk] * SIZE + INDEX[dft]] = mult
+        self.matrix = memoryview(self.table).cast("B").cast("d", (SIZE, SIZE))
+
+    def numpy(self):
+        """
+        Zero-copy (T + 1, T + 1) NumPy view of the matrix.
+        """
+        import numpy as np
+
+        return np.frombuffer(self.table, dtype=np.float64).reshape(SIZE, SIZE)
+
+    def multiplier(self, attacker, defender):
+        """
+        Same rule as battle_simulator.get_type_multiplier: the best attacking
+        type, multiplied over the defending types, never below 1.
+        """
+        if not attacker or not defender:
+            return 1.0
+        defending = [INDEX.get(t.lower(), NONE) for t in _as_list(defender)]
+        best = 1.0
+        for atk in _as_list(attacker):
+            row = INDEX.get(atk.lower(), NONE)
+            mult = 1.0
+            for dft in defending:
+                mult *= self.matrix[row, dft]
+            best = max(best, mult)
+        return best
+
+    def cross(self, attackers, defenders):
+        """
+        (A, D) NumPy multipliers of every attacker type list against every
+        defender type list, by the rule of multiplier().
+        """
+        import numpy as np
+
+        a, d = type_indices(attackers), type_indices(defenders)
+        mult = self.numpy()[a[:, None, :, None], d[None, :, None, :]]
+        return np.maximum(mult.prod(axis=3).max(axis=2), 1.0)
+
+    def combo_matrix(self, combos):
+        """
+        Flat row-major multipliers of every type combination attacking every
+        other, e.g. for MatchEngine's type_mult table.
+        """
+        return array("d", [self.multiplier(a, d) for a in combos for d in combos])
+
+    def __repr__(self):
+        return f"TypeChart({self.name!r})"
+
+
+def _as_list(types):
+    return [types] if isinstance(types, str) else types
+
+
+def type_indices(types_list):
+    """
+    (N, 2) index array of type lists for NumPy lookups, padded with NONE.
+    """
+    import numpy as np
+
+    idx = np.full((len(types_list), 2), NONE, dtype=np.intp)
+    for i, types in enumerate(types_list):
+        for k, t in enumerate(_as_list(types)[:2]):
+            idx[i, k] = INDEX.get(t.lower(), NONE)
+    return idx
+
+
+def _expand(sparse):
+    return {
+        (atk, dft): float(mult)
+        for atk, row in sparse.items()
+        for mult, defenders in row.items()
+        for dft in defenders.split()
+    }
+
+
+def _build(name):
+    types, changes = CHARTS[name]
+    multipliers = _expand(GEN2_5)
+    multipliers.update({pair: float(mult) for pair, mult in changes.items()})
+    known = set(types)
+    return TypeChart(
+        name,
+        {
+            (atk, dft): mult
+            for (atk, dft), mult in multipliers.items()
+            if atk in known and dft in known
+        },
+    )
+
+
+def get(chart=DEFAULT_CHART):
+    """
+    A compiled chart by name; None for the chart of type_effectiveness.csv,
+    and a TypeChart is returned as it is.
+    """
+    if isinstance(chart, TypeChart):
+        return chart
+    if chart in _compiled:
+        return _compiled[chart]
+    if chart is None:
+        from battle_simulator import TYPE_EFFECTIVENESS
+
+        compiled = TypeChart(
+            "file",
+            {
+                (atk, dft): mult
+                for atk, row in TYPE_EFFECTIVENESS.items()
+                for dft, mult in row.items()
+            },
+        )
+    elif chart in CHARTS:
+        compiled = _build(chart)
+    else:
+        raise KeyError(f"Unknown type chart {chart!r}, expected one of {list(CHARTS)}")
+    _compiled[chart] = compiled
+    return compiled
+
+
+def reload_file_chart():
+    """
+    Drops the compiled chart of type_effectiveness.csv; call it after
+    battle_simulator.TYPE_EFFECTIVENESS changed.
+    """
+    _compiled.pop(DEFAULT_CHART, None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("attacker", help="attacking types, e.g. fire or fire/flying")
+    parser.add_argument("defender", help="defending types")
+    parser.add_argument(
+        "--chart",
+        action="append",
+        choices=list(CHARTS),
+        help="chart to use, repeatable (default: all)",
+    )
+    args = parser.parse_args(argv)
+
+    attacker, defender = args.attacker.split("/"), args.defender.split("/")
+    for name in args.chart or CHARTS:
+        print(f"{name:<7} {get(name).multiplier(attacker, defender):g}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+"""
+Distributed battle jobs over a shared directory.
+
+A job (e.g. a run_many_battles-style Monte Carlo matchup) is split into
+idempotent shards: shard k always runs the same simulations with the same
+seeds, so running a shard twice gives the same result. The job directory,
+on any filesystem all machines can reach, is the only broker:
+
+    job.json            job kind, parameters and shard count
+    todo/<shard>        shards waiting for a worker
+    claimed/<shard>     claimed shards, moved here with an atomic rename
+    heartbeat/<shard>   touched by the owning worker while it runs the shard
+    done/<shard>        shard results, written to a temp file and renamed
+
+A claimed shard whose heartbeat is older than the lease goes back to todo,
+so a crashed or disconnected worker only costs one shard. Start any number
+of workers on any number of machines; `reduce` merges the shard results.
+
+Example:
+    python main/work_queue.py submit jobs/gengar --a Gengar --b Charmander \\
+        --a-move shadow-ball --b-move flamethrower --a-level 50 --b-level 30 \\
+        --simulations 100000 --shard-size 1000
+    python main/work_queue.py work jobs/gengar      # on every machine
+    python main/work_queue.py reduce jobs/gengar
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+import example
+
+LEASE = 60.0  # seconds without a heartbeat before a shard is requeued
+HEARTBEAT = 5.0
+POLL = 1.0
+DEFAULT_SHARD_SIZE = 1000
+
+
+# --- Tasks: one run function and one merge function per job kind ---
+
+
+def run_battles(params, start, count):
+    """
+    Simulations start .. start + count - 1 of a matchup, simulation i seeded
+    with seed + i (as in run_many_battles).
+    """
+    result = {"n": 0, "a_wins": 0, "b_wins": 0, "a_hp": 0, "b_hp": 0}
+    for i in range(start, start + count):
+        with example.seeded(params["seed"] + i):
+            winner, hp = example.simulate_battle(
+                poke_a_id=params["a"],
+                poke_b_id=params["b"],
+                poke_a_moves=params["a_moves"],
+                poke_b_moves=params["b_moves"],
+                poke_a_gender=params["a_gender"],
+                poke_b_gender=params["b_gender"],
+                poke_a_level=params["a_level"],
+                poke_b_level=params["b_level"],
+                move_budget=None,
+            )
+        side = "a" if winner == params["a"] else "b"
+        result[f"{side}_wins"] += 1
+        result[f"{side}_hp"] += hp
+        result["n"] += 1
+    return result
+
+
+def merge_battles(params, results):
+    total = {"n": 0, "a_wins": 0, "b_wins": 0, "a_hp": 0, "b_hp": 0}
+    for result in results:
+        for key in total:
+            total[key] += result[key]
+    n = total["n"] or 1
+    total["a_win_rate"] = total["a_wins"] / n
+    total["a_avg_hp"] = total["a_hp"] / total["a_wins"] if total["a_wins"] else 0
+    total["b_avg_hp"] = total["b_hp"] / total["b_wins"] if total["b_wins"] else 0
+    return total
+
+
+TASKS = {"battles": (run_battles, merge_battles)}
+
+
+# --- Job directory ---
+
+
+def _write_json(path, data):
+    # Readers never see a half-written file
+    tmp = f"{path}.{socket.gethostname()}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _shards(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+class JobDir:
+    def __init__(self, path):
+        self.path = path
+        self.todo = os.path.join(path, "todo")
+        self.claimed = os.path.join(path, "claimed")
+        self.heartbeat = os.path.join(path, "heartbeat")
+        self.done = os.path.join(path, "done")
+
+    @property
+    def job(self):
+        return _read_json(os.path.join(self.path, "job.json"))
+
+    def submit(self, kind, params, total, shard_size=DEFAULT_SHARD_SIZE):
+        """
+        Creates the job directory with one todo file per shard.
+        """
+        if kind not in TASKS:
+            raise ValueError(f"unknown job kind {kind!r}")
+        if os.path.exists(os.path.join(self.path, "job.json")):
+            raise FileExistsError(f"{self.path} already holds a job")
+        for directory in (self.todo, self.claimed, self.heartbeat, self.done):
+            os.makedirs(directory, exist_ok=True)
+        shards = -(-total // shard_size)
+        for k in range(shards):
+            start = k * shard_size
+            shard = {
+                "shard": k,
+                "start": start,
+                "count": min(shard_size, total - start),
+            }
+            _write_json(os.path.join(self.todo, f"shard-{k:06d}.json"), shard)
+        # Written last: workers only start on a complete job
+        _write_json(
+            os.path.join(self.path, "job.json"),
+            {"kind": kind, "params": params, "total": total, "shards": shards},
+        )
+
+    def status(self):
+        return {
+            "todo": len(_shards(self.todo)),
+            "claimed": len(_shards(self.claimed)),
+            "done": len(_shards(self.done)),
+            "shards": self.job["shards"],
+        }
+
+    def requeue_expired(self, lease=LEASE):
+        """
+        Moves shards whose owner stopped heartbeating back to todo.
+        """
+        now = time.time()
+        requeued = 0
+        for name in _shards(self.claimed):
+            claimed = os.path.join(self.claimed, name)
+            if os.path.exists(os.path.join(self.done, name)):
+                # Finished, but the owner died before cleaning up
+                self._release(name)
+                continue
+            beats = [
+                _mtime(claimed),
+                _mtime(os.path.join(self.heartbeat, name)),
+            ]
+            beats = [t for t in beats if t is not None]
+            if beats and now - max(beats) > lease:
+                try:
+                    os.rename(claimed, os.path.join(self.todo, name))
+                    requeued += 1
+                except FileNotFoundError:
+                    pass  # finished or requeued meanwhile
+        return requeued
+
+    def claim(self):
+        """
+        Claims one todo shard; returns its name, or None when todo is empty.
+        Only one worker's rename of a given file can succeed.
+        """
+        names = _shards(self.todo)
+        random.shuffle(names)  # fewer collisions between workers
+        for name in names:
+            claimed = os.path.join(self.claimed, name)
+            try:
+                os.rename(os.path.join(self.todo, name), claimed)
+            except FileNotFoundError:
+                continue  # another worker was faster
+            if os.path.exists(os.path.join(self.done, name)):
+                self._release(name)
+                continue
+            try:
+                os.utime(claimed)  # the lease starts now
+            except FileNotFoundError:
+                continue
+            return name
+        return None
+
+    def _release(self, name):
+        for directory in (self.claimed, self.heartbeat):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+    def complete(self, name, worker, result):
+        _write_json(
+            os.path.join(self.done, name),
+            {"worker": worker, "result": result},
+        )
+        self._release(name)
+
+    def reduce(self):
+        """
+        Merges the results of all finished shards. Returns (merged, missing
+        shard count).
+        """
+        job = self.job
+        _, merge = TASKS[job["kind"]]
+        names = _shards(self.done)
+        results = [_read_json(os.path.join(self.done, n))["result"] for n in names]
+        return merge(job["params"], results), job["shards"] - len(names)
+
+
+class _Heartbeat(threading.Thread):
+    def __init__(self, path, worker, interval):
+        super().__init__(daemon=True)
+        self.path = path
+        self.worker = worker
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while True:
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(f"{self.worker} {time.time():.3f}\n")
+            if self.stopped.wait(self.interval):
+                return
+
+
+def work(path, worker=None, lease=LEASE, heartbeat=HEARTBEAT, poll=POLL):
+    """
+    Runs shards until the job is done. Waits while other workers hold
+    shards, since their leases may still expire. Returns the shards run.
+    """
+    jobdir = JobDir(path)
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    while not os.path.exists(os.path.join(path, "job.json")):
+        time.sleep(poll)
+    job = jobdir.job
+    run_task, _ = TASKS[job["kind"]]
+    count = 0
+    while True:
+        jobdir.requeue_expired(lease)
+        name = jobdir.claim()
+        if name is None:
+            if not _shards(jobdir.claimed):
+                return count
+            time.sleep(poll)
+            continue
+        shard = _read_json(os.path.join(jobdir.claimed, name))
+        beat = _Heartbeat(os.path.join(jobdir.heartbeat, name), worker, heartbeat)
+        beat.start()
+        try:
+            result = run_task(job["params"], shard["start"], shard["count"])
+        finally:
+            beat.stopped.set()
+            beat.join()
+        jobdir.complete(name, worker, result)
+        count += 1
+
+
+# --- CLI ---
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("\n\n", 1)[1],
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    submit = sub.add_parser("submit", help="create a battles job")
+    submit.add_argument("--a", required=True, help="species A")
+    submit.add_argument("--b", required=True, help="species B")
+    submit.add_argument("--a-move", default="thunderbolt")
+    submit.add_argument("--b-move", default="water-gun")
+    submit.add_argument("--a-gender", default="genderless")
+    submit.add_argument("--b-gender", default="genderless")
+    submit.add_argument("--a-level", type=int, default=10)
+    submit.add_argument("--b-level", type=int, default=10)
+    submit.add_argument("--simulations", type=int, default=10000)
+    submit.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    submit.add_argument("--seed", type=int, default=0)
+    worker = sub.add_parser("work", help="run shards until the job is done")
+    worker.add_argument("--id", help="worker name (default: host-pid)")
+    worker.add_argument("--lease", type=float, default=LEASE)
+    worker.add_argument("--heartbeat", type=float, default=HEARTBEAT)
+    sub.add_parser("status", help="count shards per state")
+    sub.add_parser("reduce", help="merge the finished shards")
+    for cmd in sub.choices.values():
+        cmd.add_argument("job", help="job directory")
+    args = parser.parse_args(argv)
+
+    jobdir = JobDir(args.job)
+    if args.command == "submit":
+        params = {
+            "a": args.a,
+            "b": args.b,
+            "a_moves": [args.a_move],
+            "b_moves": [args.b_move],
+            "a_gender": args.a_gender,
+            "b_gender": args.b_gender,
+            "a_level": args.a_level,
+            "b_level": args.b_level,
+            "seed": args.seed,
+        }
+        jobdir.submit("battles", params, args.simulations, args.shard_size)
+        print(json.dumps(jobdir.status()))
+    elif args.command == "work":
+        start = time.perf_counter()
+        count = work(args.job, args.id, args.lease, args.heartbeat)
+        print(f"Ran {count} shards in {time.perf_counter() - start:.1f}s")
+    elif args.command == "status":
+        print(json.dumps(jobdir.status()))
+    else:
+        merged, missing = jobdir.reduce()
+        print(json.dumps(merged, indent=2))
+        if missing:
+            print(f"{missing} shards not finished yet", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())